@@ -0,0 +1,109 @@
+"""
+Бенчмарк рендера подписей к уведомлениям о заказах.
+
+Сравнивает прежний путь (TranslatorRunner.get на каждый заказ и очистка
+через цепочку replace) с пакетным OrderCaptionRenderer и проверяет,
+что тексты совпадают. База и сеть не нужны.
+
+Запуск из корня проекта:
+    python -m benchmarks.captions --orders 10000 --repeat 3
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from bot.schemas.wb import NotifOrder
+from bot.utils.captions import OrderCaptionRenderer
+from bot.utils.i18n import create_translator_hub
+
+
+def make_orders(count: int) -> list[NotifOrder]:
+    now = datetime.now()
+    orders = []
+    for i in range(count):
+        date = now - timedelta(minutes=count - i)
+        orders.append(NotifOrder(
+            id=i,
+            user_id=1,
+            date=date,
+            last_change_date=date,
+            supplier_article=f"ART-{i % 500}",
+            tech_size="0",
+            barcode=f"{2000000000000 + i}",
+            total_price=Decimal(random.randint(500, 25_000)),
+            discount_percent=Decimal(random.randint(0, 70)),
+            warehouse_name=random.choice(["Коледино", "Казань", "Электросталь"]),
+            region_name="Московская",
+            nm_id=100_000 + i % 500,
+            subject="Футболки",
+            category="Одежда",
+            brand="Brand",
+            is_cancel=False,
+            g_number=f"G{i}",
+            sticker="",
+            counter=i % 50 + 1,
+            amount=random.randint(1_000, 150_000),
+            total_today=random.randint(1_000, 150_000),
+            total_yesterday=random.randint(1_000, 150_000),
+            stocks=f"Остаток для {100_000 + i % 500}: {i % 40}",
+        ))
+    return orders
+
+
+def render_legacy(i18n, orders: list[NotifOrder]) -> list[str]:
+    texts = []
+    for order in orders:
+        total_price = round(order.total_price *
+                            (1 - order.discount_percent / 100))
+        text = i18n.get(
+            "order-text",
+            date=order.date.strftime("%Y-%m-%d %H:%M"),
+            counter=order.counter,
+            total_price=total_price,
+            amount=order.amount,
+            nm_id=order.nm_id,
+            discount=order.discount_percent,
+            category=order.category,
+            subject=order.subject,
+            brand=order.brand,
+            article=order.supplier_article,
+            total_today=order.total_today,
+            total_yesterday=order.total_yesterday,
+            logistic=f"{order.warehouse_name}➡{order.region_name}",
+            warehouse_text=order.stocks,
+        )
+        texts.append(text.replace('\u2068', '').replace('\u2069', '').replace('\xa0', ''))
+    return texts
+
+
+def measure(label: str, count: int, func) -> list[str]:
+    start = time.perf_counter()
+    texts = func()
+    duration = time.perf_counter() - start
+    print(f"{label:>8}: {count} captions in {duration:.3f}s ({count / duration:.0f}/s)")
+    return texts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders)
+    i18n = create_translator_hub().get_translator_by_locale("ru")
+    renderer = OrderCaptionRenderer()
+    renderer.warm_up("ru")
+
+    for attempt in range(1, args.repeat + 1):
+        print(f"#{attempt}")
+        legacy = measure("legacy", args.orders, lambda: render_legacy(i18n, orders))
+        batch = measure("batch", args.orders, lambda: renderer.render_batch(orders, "ru"))
+        if legacy != batch:
+            raise SystemExit("Rendered captions differ from the legacy path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Нагрузочный тест диалогового слоя бота.
+
+Синтетические апдейты подаются в Dispatcher из main.py (те же
+middleware: UoW, i18n, активность; FSM в Redis из настроек) через
+dp.feed_update, без поллинга. Bot API заменен сессией-заглушкой:
+она отвечает минимальными объектами с задержкой --bot-latency и
+запоминает последнее окно диалога в каждом чате, по которой виртуальный
+пользователь нажимает кнопки диалогов.
+
+Сценарий пары пользователей (владелец и сотрудник):
+/start, /lk, окно API ключа, ввод невалидного ключа, возврат в меню,
+сотрудники, ссылка-приглашение; сотрудник переходит по ссылке
+(/start addstaff_...), владелец удаляет его и закрывает диалог.
+
+Отчет: апдейты в секунду, p50/p95/p99 времени обработки апдейта по
+шагам и в целом, SQL-запросов на апдейт, ошибки. Пользователи,
+приглашения, сотрудники и ключи FSM удаляются после прогона.
+
+Нужны Postgres (миграции применены) и Redis. NATS не нужен: шаги
+сценария не ставят задачи в брокер.
+
+Запуск из корня проекта:
+    python -m benchmarks.dialog_load --pairs 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import re
+import statistics
+import time
+from collections import Counter, defaultdict
+from typing import Any, get_args, get_origin
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response
+from aiogram.types import InlineKeyboardMarkup, Message, Update, User
+
+from benchmarks.orders_pipeline import histograms, snapshot
+
+# Токен с отдельным id бота: ключи FSM не пересекаются с настоящим ботом
+BOT_TOKEN = "4242424242:dialog-load-benchmark"
+BOT_USER = {"id": 4242424242, "is_bot": True, "first_name": "Load", "username": "load_bot"}
+# Разделитель intent id и id виджета в callback_data aiogram_dialog
+CALLBACK_SEPARATOR = "\x1d"
+INVITE_RE = re.compile(r"addstaff_(\d+)_([0-9a-f]+)")
+
+
+class StubBotSession(BaseSession):
+    """Сессия Bot API без сети: минимальный ответ на каждый метод."""
+
+    def __init__(self, latency: float) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        # Последнее сообщение с inline-клавиатурой в чате — окно диалога
+        self.dialog_messages: dict[int, dict] = {}
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        self.calls[method.__api_method__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = Response[method.__returning__].model_validate(  # type: ignore[name-defined]
+            {"ok": True, "result": self._result(method)}, context={"bot": bot})
+        return response.result
+
+    def _result(self, method: TelegramMethod) -> Any:
+        returning = method.__returning__
+        types = get_args(returning) or (returning,)
+        if Message in types:
+            chat_id = int(getattr(method, "chat_id", 0) or 0)
+            message = {
+                "message_id": getattr(method, "message_id", None) or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+            }
+            text = getattr(method, "text", None) or getattr(method, "caption", None)
+            if isinstance(text, str):
+                message["text"] = text
+            markup = getattr(method, "reply_markup", None)
+            if isinstance(markup, InlineKeyboardMarkup):
+                message["reply_markup"] = markup.model_dump(mode="json", exclude_none=True)
+                self.dialog_messages[chat_id] = message
+            return message
+        if returning is User:
+            return BOT_USER
+        if get_origin(returning) is list:
+            return []
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+
+class FlowError(Exception):
+    """Шаг сценария невозможен: нет нужной кнопки или текста."""
+
+
+class VirtualUser:
+    """Пользователь Telegram: шлет сообщения и нажимает кнопки последнего сообщения бота."""
+
+    update_ids = itertools.count(1)
+    message_ids = itertools.count(1)
+
+    def __init__(self, load: "DialogLoad", telegram_id: int) -> None:
+        self.load = load
+        self.id = telegram_id
+        self.user = {
+            "id": telegram_id, "is_bot": False, "first_name": "Load",
+            "username": f"load_{telegram_id}", "language_code": "ru",
+        }
+
+    @property
+    def dialog_message(self) -> dict:
+        message = self.load.session.dialog_messages.get(self.id)
+        if message is None:
+            raise FlowError("bot has not sent a keyboard to this chat")
+        return message
+
+    async def send(self, step: str, text: str) -> None:
+        message = {
+            "message_id": next(self.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": self.id, "type": "private"},
+            "from": self.user,
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        await self.load.feed(step, {"update_id": next(self.update_ids), "message": message})
+
+    async def click(self, step: str, widget_id: str) -> None:
+        message = self.dialog_message
+        for row in message.get("reply_markup", {}).get("inline_keyboard", []):
+            for button in row:
+                data = button.get("callback_data", "")
+                widget = data.rsplit(CALLBACK_SEPARATOR, 1)[-1]
+                if widget == widget_id or widget.startswith(widget_id + ":"):
+                    await self.load.feed(step, {
+                        "update_id": next(self.update_ids),
+                        "callback_query": {
+                            "id": str(next(self.message_ids)),
+                            "from": self.user,
+                            "chat_instance": str(self.id),
+                            "data": data,
+                            "message": message,
+                        },
+                    })
+                    return
+        raise FlowError(f"{step}: no button {widget_id!r}")
+
+
+class DialogLoad:
+    def __init__(self, args: argparse.Namespace, dp, translator_hub) -> None:
+        self.args = args
+        self.dp = dp
+        self.translator_hub = translator_hub
+        self.session = StubBotSession(args.bot_latency)
+        self.bot = Bot(
+            token=BOT_TOKEN,
+            session=self.session,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.telegram_ids: list[int] = []
+
+    async def feed(self, step: str, data: dict) -> None:
+        update = Update.model_validate(data, context={"bot": self.bot})
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update, _translator_hub=self.translator_hub)
+        except Exception as e:
+            self.errors[f"{step}: {type(e).__name__}"] += 1
+            raise FlowError(f"{step}: {e}") from e
+        finally:
+            self.latencies[step].append(time.perf_counter() - started)
+        if self.args.think:
+            await asyncio.sleep(random.uniform(0, 2 * self.args.think))
+
+    async def pair_flow(self, owner: VirtualUser, staff: VirtualUser) -> None:
+        await owner.send("start", "/start")
+        await owner.send("lk", "/lk")
+
+        # API ключ: окно, ввод (невалидный ключ отсекается без запроса к WB), назад
+        await owner.click("api_key", "lk_api_key")
+        await owner.click("api_key_input", "next")
+        await owner.send("api_key_submit", "not-a-wb-key")
+        await owner.click("api_key_back", "back_to_menu")
+        await owner.click("api_key_close", "back_to_menu")
+
+        # Сотрудники: ссылка-приглашение, сотрудник по ней, удаление
+        await owner.click("employee", "employee")
+        await owner.click("employee_link", "next")
+        invite = INVITE_RE.search(owner.dialog_message.get("text", ""))
+        if invite is None:
+            raise FlowError("employee_link: no invite link in the message")
+        await owner.click("employee_back", "back")
+
+        await staff.send("staff_invite", f"/start addstaff_{invite[1]}_{invite[2]}")
+
+        await owner.send("lk", "/lk")
+        await owner.click("employee", "employee")
+        await owner.click("employee_delete_menu", "delete_key")
+        await owner.click("employee_delete", "employee_select")
+        await owner.click("employee_delete_back", "back")
+        await owner.click("employee_close", "back_to_menu")
+
+    async def run_pair(self, semaphore: asyncio.Semaphore, owner: VirtualUser, staff: VirtualUser) -> None:
+        async with semaphore:
+            try:
+                await self.pair_flow(owner, staff)
+            except FlowError as e:
+                self.errors[f"flow aborted: {str(e).split(':')[0]}"] += 1
+
+    async def run(self) -> float:
+        base = random.randint(9 * 10**12, 10**13)
+        self.telegram_ids = [base + i for i in range(2 * self.args.pairs)]
+        users = [VirtualUser(self, telegram_id) for telegram_id in self.telegram_ids]
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self.run_pair(semaphore, users[i], users[i + 1])
+            for i in range(0, len(users), 2)
+        ))
+        return time.perf_counter() - started
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def report(load: DialogLoad, wall: float, delta: dict[tuple, float]) -> None:
+    all_latencies = [value for values in load.latencies.values() for value in values]
+    updates = len(all_latencies)
+    print(f"\npairs {load.args.pairs}, concurrency {load.args.concurrency}, "
+          f"bot latency {load.args.bot_latency * 1e3:.0f} ms, wall {wall:.2f}s")
+    print(f"updates: {updates}, {updates / wall:.1f}/s")
+
+    print(f"\n{'step':>22} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = list(load.latencies.items()) + [("all", all_latencies)]
+    for step, values in rows:
+        if not values:
+            continue
+        print(f"{step:>22} {len(values):>6} {statistics.median(values) * 1e3:>8.1f} "
+              f"{percentile(values, 0.95) * 1e3:>8.1f} {percentile(values, 0.99) * 1e3:>8.1f}")
+
+    queries = histograms(delta, "db_query_duration_seconds", "source")
+    total = sum(entry["count"] for entry in queries.values())
+    print(f"\nSQL statements: {total:.0f} ({total / max(updates, 1):.1f} per update)")
+    top = sorted(queries.items(), key=lambda item: item[1]["count"], reverse=True)[:load.args.top]
+    for source, entry in top:
+        print(f"{entry['count']:>8.0f} {entry['sum'] * 1e3:>9.0f} ms  {source}")
+
+    print("\nBot API calls:", ", ".join(f"{k}={v}" for k, v in sorted(load.session.calls.items())))
+    if load.errors:
+        print("errors:", ", ".join(f"{k}={v}" for k, v in load.errors.most_common()))
+
+
+async def cleanup(container, storage, telegram_ids: list[int]) -> None:
+    from sqlalchemy import delete, select
+
+    from bot.database.models import Employee, EmployeeInvite, User
+
+    async with container.session_maker() as session:
+        user_ids = select(User.id).where(User.telegram_id.in_(telegram_ids))
+        await session.execute(delete(Employee).where(Employee.owner_id.in_(user_ids)))
+        await session.execute(delete(EmployeeInvite).where(EmployeeInvite.owner_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.telegram_id.in_(telegram_ids)))
+        await session.commit()
+
+    redis = getattr(storage, "redis", None)
+    if redis is not None:
+        bot_id = BOT_TOKEN.split(":")[0]
+        async for key in redis.scan_iter(match=f"*:{bot_id}:*", count=1000):
+            await redis.delete(key)
+        # Отметки активности виртуальных пользователей (их выгружает воркер)
+        from bot.core.activity import ACTIVITY_KEY
+        if telegram_ids:
+            await redis.zrem(ACTIVITY_KEY, *telegram_ids)
+    await storage.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    import main
+
+    await main.setup_bot(main.dp)
+    load = DialogLoad(args, main.dp, main.container.translators.hub)
+
+    before = snapshot()
+    try:
+        wall = await load.run()
+        delta = {key: value - before.get(key, 0.0) for key, value in snapshot().items()}
+        report(load, wall, delta)
+    finally:
+        if not args.keep:
+            await cleanup(main.container, main.storage, load.telegram_ids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=100, help="пар владелец + сотрудник")
+    parser.add_argument("--concurrency", type=int, default=50, help="сценариев одновременно")
+    parser.add_argument("--bot-latency", type=float, default=0.05, help="секунды на вызов Bot API")
+    parser.add_argument("--think", type=float, default=0.0, help="средняя пауза между шагами, с")
+    parser.add_argument("--top", type=int, default=10, help="методов репозиториев в отчете")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--keep", action="store_true", help="не удалять пользователей после прогона")
+    args = parser.parse_args()
+
+    # До импорта main: настройки читаются при импорте
+    os.environ["POSTGRES__QUERY_TIMING"] = "true"
+    os.environ.setdefault("LOG__LEVEL", args.log_level)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
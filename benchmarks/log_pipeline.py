@@ -0,0 +1,79 @@
+"""
+Стоимость вызова логгера для цикла событий.
+
+Сравнивает прежнюю настройку (рендеринг и запись в stdout в вызывающем
+потоке) с записью через очередь (setup_logging). Меряется только время
+в вызывающем потоке — именно оно попадает в лаг цикла событий.
+Вывод уходит в /dev/null.
+
+Запуск из корня проекта:
+    python -m benchmarks.log_pipeline --events 20000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import structlog
+
+from bot.core import logging as app_logging
+from bot.core.config import LogSettings
+
+# Конфигурация structlog, которую ставит bot.core.logging при импорте
+PIPELINE_CONFIG = structlog.get_config()
+
+
+def configure_legacy(renderer) -> None:
+    logging.basicConfig(format="%(message)s", stream=sys.stdout, level=logging.INFO, force=True)
+    structlog.configure(
+        processors=[
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            renderer,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+        cache_logger_on_first_use=False,
+    )
+
+
+def measure(events: int) -> float:
+    logger = structlog.get_logger("app").bind(event_type="application")
+    start = time.perf_counter()
+    for i in range(events):
+        logger.info("Sending notification", user_id=i, texts=3)
+    return (time.perf_counter() - start) / events * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+
+    sys.stdout = open(os.devnull, "w")
+    results = {}
+
+    configure_legacy(structlog.dev.ConsoleRenderer())
+    results["legacy console"] = measure(args.events)
+    configure_legacy(structlog.processors.JSONRenderer())
+    results["legacy json"] = measure(args.events)
+
+    # Новый конвейер: конфигурация structlog из bot.core.logging + очередь
+    structlog.configure(**PIPELINE_CONFIG)
+    app_logging.setup_logging(
+        LogSettings(renderer="json", sample={}, queue_size=args.events + 1))
+    results["queue json"] = measure(args.events)
+    app_logging.shutdown_logging()
+
+    sys.stdout = sys.__stdout__
+    for name, per_call in results.items():
+        print(f"{name:>15}: {per_call:6.1f} us per call in the event loop thread")
+
+
+if __name__ == "__main__":
+    main()
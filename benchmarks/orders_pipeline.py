@@ -0,0 +1,314 @@
+"""
+Сквозной бенчмарк пайплайна уведомлений о заказах без WB и Telegram.
+
+Поднимает заглушки (benchmarks.wb_stub) отдельным процессом, создает
+N синтетических продавцов в базе из настроек (.env) и в этом же
+процессе запускает воркер taskiq на NATS из настроек. Каждый раунд —
+один вызов start_orders_notif для всех продавцов; раунд заканчивается,
+когда все пайплайны завершены (TaskStatus). В конце печатает
+пропускную способность, задержки этапов (order_pipeline_stage_seconds),
+число SQL-запросов по методам репозиториев и лаг цикла событий.
+Продавцы и их данные удаляются после прогона.
+
+Нужны локальные Postgres (миграции применены) и NATS без работающего
+воркера: он разберет задачи бенчмарка. Используйте отдельную базу:
+старт воркера помечает зависшие задачи failed, а start_orders_notif
+берет все активные ключи базы.
+
+Уведомления одного продавца отправляются не чаще раза в 5 секунд
+(NotificationService), поэтому этап send растет с --orders-per-poll.
+Ответы 429/5xx от заглушки повторяются клиентом через 30 с и больше.
+
+Запуск из корня проекта:
+    python -m benchmarks.orders_pipeline --sellers 200 --rounds 3 --latency 0.2
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import aiohttp
+
+from benchmarks.wb_stub import add_arguments, stub_argv
+
+# Метрики, по которым строится отчет
+STAGE_METRIC = "order_pipeline_stage_seconds"
+QUERY_METRIC = "db_query_duration_seconds"
+LAG_METRIC = "event_loop_lag_seconds"
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Настройки бота для прогона; задаются до импорта bot.core.config."""
+    base = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        "WB__STATISTICS_URL": base,
+        "WB__BASKET_URL": base + "/basket-{basket}",
+        "BOT__API_SERVER": base,
+        # Все продавцы в каждом раунде: без сдвига и адаптивного интервала
+        "SCHEDULER__SPREAD": "false",
+        "SCHEDULER__ADAPTIVE": "false",
+        "SCHEDULER__NOTIF_INTERVAL": "1",
+        "POSTGRES__QUERY_TIMING": "true",
+    })
+    os.environ.setdefault("LOG__LEVEL", args.log_level)
+
+
+def snapshot() -> dict[tuple, float]:
+    """Текущие значения всех метрик процесса: (имя, метки) -> значение."""
+    from prometheus_client import REGISTRY
+
+    values = {}
+    for family in REGISTRY.collect():
+        for sample in family.samples:
+            values[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return values
+
+
+def histograms(delta: dict[tuple, float], metric: str, label: str) -> dict[str, dict]:
+    """Разбор гистограммы по значению метки: count, sum и кумулятивные бакеты."""
+    result: dict[str, dict] = defaultdict(lambda: {"count": 0.0, "sum": 0.0, "buckets": {}})
+    for (name, labels), value in delta.items():
+        labels = dict(labels)
+        if label not in labels:
+            continue
+        entry = result[labels[label]]
+        if name == f"{metric}_count":
+            entry["count"] += value
+        elif name == f"{metric}_sum":
+            entry["sum"] += value
+        elif name == f"{metric}_bucket":
+            le = float(labels["le"])
+            entry["buckets"][le] = entry["buckets"].get(le, 0.0) + value
+    return result
+
+
+def quantile(q: float, buckets: dict[float, float]) -> float | None:
+    """Квантиль по кумулятивным бакетам с линейной интерполяцией (как histogram_quantile)."""
+    points = sorted(buckets.items())
+    if not points or not points[-1][1]:
+        return None
+    rank = q * points[-1][1]
+    prev_le, prev_count = 0.0, 0.0
+    for le, count in points:
+        if count >= rank:
+            if math.isinf(le):
+                return prev_le
+            return prev_le + (le - prev_le) * (rank - prev_count) / max(count - prev_count, 1e-9)
+        prev_le, prev_count = le, count
+    return prev_le
+
+
+async def start_stub(args: argparse.Namespace) -> asyncio.subprocess.Process:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.wb_stub", *stub_argv(args))
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(f"http://127.0.0.1:{args.port}/_stats"):
+                    return process
+            except aiohttp.ClientConnectionError:
+                await asyncio.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("WB stub did not start")
+
+
+async def stub_stats(port: int) -> dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/_stats") as response:
+            return await response.json()
+
+
+async def seed_sellers(session_maker, count: int) -> list[int]:
+    from bot.core.security import encrypt_api_key
+    from bot.database.models import ApiKey, User
+
+    async with session_maker() as session:
+        users = [
+            User(telegram_id=-random.randint(10**9, 10**10), username=f"pipeline_benchmark_{i}")
+            for i in range(count)
+        ]
+        session.add_all(users)
+        await session.flush()
+        session.add_all([
+            ApiKey(user_id=user.id, title="benchmark",
+                   key_encrypted=encrypt_api_key(f"benchmark-{user.id}"))
+            for user in users
+        ])
+        await session.commit()
+        return [user.id for user in users]
+
+
+async def remove_sellers(session_maker, user_ids: list[int]) -> None:
+    from sqlalchemy import delete
+
+    from bot.database.models import ApiKey, User
+
+    async with session_maker() as session:
+        # Заказы, остатки и TaskStatus удаляются каскадом
+        await session.execute(delete(ApiKey).where(ApiKey.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def finished_pipelines(session_maker, user_ids: list[int]) -> dict[str, int]:
+    from sqlalchemy import func, select
+
+    from bot.database.models import TaskStatus
+    from bot.services.task_control import TaskName
+
+    async with session_maker() as session:
+        result = await session.execute(
+            select(TaskStatus.status, func.count())
+            .where(
+                TaskStatus.user_id.in_(user_ids),
+                TaskStatus.task_name == TaskName.START_NOTIF_PIPELINE.value,
+            )
+            .group_by(TaskStatus.status)
+        )
+        return dict(result.all())
+
+
+async def count_orders(session_maker, user_ids: list[int]) -> int:
+    from sqlalchemy import func, select
+
+    from bot.database.models import OrdersWB
+
+    async with session_maker() as session:
+        result = await session.execute(
+            select(func.count()).select_from(OrdersWB).where(OrdersWB.user_id.in_(user_ids)))
+        return result.scalar_one()
+
+
+async def run_rounds(args: argparse.Namespace, session_maker, user_ids: list[int]) -> list[float]:
+    from broker import start_orders_notif
+
+    durations = []
+    for round_number in range(1, args.rounds + 1):
+        expected = round_number * len(user_ids)
+        started = time.perf_counter()
+        await start_orders_notif.kiq()
+        while True:
+            statuses = await finished_pipelines(session_maker, user_ids)
+            finished = statuses.get("completed", 0) + statuses.get("failed", 0)
+            if finished >= expected:
+                break
+            if time.perf_counter() - started > args.timeout:
+                raise TimeoutError(
+                    f"Round {round_number}: {finished}/{expected} pipelines after {args.timeout}s")
+            await asyncio.sleep(0.25)
+        durations.append(time.perf_counter() - started)
+        print(f"round {round_number}: {durations[-1]:.2f}s", flush=True)
+    return durations
+
+
+def report(
+    args: argparse.Namespace,
+    durations: list[float],
+    delta: dict[tuple, float],
+    statuses: dict[str, int],
+    orders: int,
+    stub: dict[str, int],
+) -> None:
+    wall = sum(durations)
+    pipelines = statuses.get("completed", 0) + statuses.get("failed", 0)
+    messages = sum(v for k, v in stub.items() if k.startswith("bot.send") and k.count(".") == 1)
+    print(f"\nsellers {args.sellers}, rounds {args.rounds}, wall {wall:.2f}s")
+    print(f"pipelines: {statuses.get('completed', 0)} completed, {statuses.get('failed', 0)} failed, "
+          f"{pipelines / wall:.1f}/s")
+    print(f"orders saved: {orders}, messages sent: {messages} ({messages / wall:.1f}/s)")
+
+    from bot.core.metrics import ORDER_PIPELINE_STAGES
+
+    stages = histograms(delta, STAGE_METRIC, "stage")
+    print(f"\n{'stage':>10} {'count':>7} {'mean ms':>9} {'p95 ms':>9}")
+    for stage in ORDER_PIPELINE_STAGES:
+        entry = stages.get(stage)
+        if not entry or not entry["count"]:
+            continue
+        p95 = quantile(0.95, entry["buckets"])
+        print(f"{stage:>10} {entry['count']:>7.0f} {entry['sum'] / entry['count'] * 1e3:>9.1f} "
+              f"{p95 * 1e3 if p95 is not None else float('nan'):>9.1f}")
+
+    queries = histograms(delta, QUERY_METRIC, "source")
+    total = sum(entry["count"] for entry in queries.values())
+    print(f"\nSQL statements: {total:.0f} ({total / max(pipelines, 1):.1f} per pipeline)")
+    top = sorted(queries.items(), key=lambda item: item[1]["count"], reverse=True)[:args.top]
+    for source, entry in top:
+        print(f"{entry['count']:>8.0f} {entry['sum'] * 1e3:>9.0f} ms  {source}")
+
+    lag = histograms(delta, LAG_METRIC, "process").get("worker")
+    if lag and lag["count"]:
+        p99 = quantile(0.99, lag["buckets"])
+        print(f"\nevent loop lag p99: {p99 * 1e3:.1f} ms")
+    print("\nstub:", ", ".join(f"{k}={v}" for k, v in sorted(stub.items())))
+
+
+async def run(args: argparse.Namespace) -> None:
+    from taskiq.receiver import Receiver
+
+    from broker import broker
+    from bot.core.dependency.container_init import init_container
+    from bot.database.engine import ProcessRole
+
+    stub = await start_stub(args)
+    user_ids: list[int] = []
+    container = None
+    worker = None
+    finish = asyncio.Event()
+    try:
+        # Воркер в этом процессе: метрики этапов и запросов видны напрямую
+        broker.is_worker_process = True
+        await broker.startup()
+        receiver = Receiver(broker, max_async_tasks=args.concurrency, run_startup=False)
+        worker = asyncio.create_task(receiver.listen(finish))
+
+        container = init_container(ProcessRole.WORKER)
+        user_ids = await seed_sellers(container.session_maker, args.sellers)
+
+        before = snapshot()
+        durations = await run_rounds(args, container.session_maker, user_ids)
+        after = snapshot()
+        delta = {key: value - before.get(key, 0.0) for key, value in after.items()}
+
+        report(
+            args,
+            durations,
+            delta,
+            await finished_pipelines(container.session_maker, user_ids),
+            await count_orders(container.session_maker, user_ids),
+            await stub_stats(args.port),
+        )
+    finally:
+        finish.set()
+        if worker is not None:
+            await asyncio.wait({worker}, timeout=10)
+        if user_ids and container is not None and not args.keep:
+            await remove_sellers(container.session_maker, user_ids)
+        await broker.shutdown()
+        stub.terminate()
+        await stub.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="задач воркера одновременно (max_async_tasks)")
+    parser.add_argument("--timeout", type=float, default=600, help="секунды на раунд")
+    parser.add_argument("--top", type=int, default=10, help="методов репозиториев в отчете")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--keep", action="store_true", help="не удалять продавцов после прогона")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    configure_environment(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Бенчмарк пропускной способности загрузки продаж.
+
+Генерирует синтетические продажи и прогоняет WBRepository.add_sales_bulk
+на базе из настроек (.env). Все изменения выполняются в одной транзакции
+и откатываются в конце, в базе ничего не остается.
+
+Запуск из корня проекта:
+    python -m benchmarks.sales_upsert --rows 50000 --repeat 3
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from bot.database.engine import create_engine, create_session_maker
+from bot.database.models import SalesWB
+from bot.database.repositories.user import UserRepository
+from bot.database.repositories.wb_repo import WBRepository
+from bot.schemas.wb import SalesWBCreate
+
+
+def make_sales(user_id: int, rows: int) -> list[SalesWBCreate]:
+    now = datetime.now()
+    sales = []
+    for i in range(rows):
+        date = now - timedelta(minutes=rows - i)
+        sales.append(SalesWBCreate(
+            user_id=user_id,
+            date=date,
+            last_change_date=date,
+            warehouse_name=random.choice(["Коледино", "Казань", "Электросталь"]),
+            region_name="Московская",
+            supplier_article=f"ART-{i % 500}",
+            nm_id=100_000 + i % 500,
+            barcode=f"{2000000000000 + i}",
+            category="Одежда",
+            subject="Футболки",
+            brand="Brand",
+            tech_size="0",
+            is_supply=False,
+            is_realization=True,
+            total_price=Decimal("1500.00"),
+            discount_percent=Decimal("30"),
+            for_pay=Decimal("900.00"),
+            price_with_disc=Decimal("1050.00"),
+            sale_id=f"S{i}",
+            sticker="",
+            g_number=f"G{i}",
+            srid=f"srid-{i}",
+        ))
+    return sales
+
+
+async def run(rows: int, repeat: int) -> None:
+    engine = create_engine()
+    async with create_session_maker(engine)() as session:
+        user = await UserRepository(session).add_one({
+            "telegram_id": -random.randint(10**9, 10**10),
+            "username": "sales_benchmark",
+        })
+        repo = WBRepository(session, SalesWB)
+        sales = make_sales(user.id, rows)
+
+        for attempt in range(1, repeat + 1):
+            start = time.perf_counter()
+            processed = await repo.add_sales_bulk(sales)
+            duration = time.perf_counter() - start
+            # Первый проход — вставка, последующие — обновление по конфликту
+            mode = "insert" if attempt == 1 else "update"
+            print(f"#{attempt} {mode}: {processed} rows in {duration:.2f}s "
+                  f"({processed / duration:.0f} rows/s)")
+
+        await session.rollback()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
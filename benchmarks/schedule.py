@@ -0,0 +1,84 @@
+"""
+Моделирование нагрузки диспетчеров периодических задач.
+
+Считает, сколько пайплайнов уведомлений и загрузок остатков стартует
+в каждую минуту часа: обычный cron (*/10 и */30 для всех сразу) против
+стабильного сдвига пользователей внутри интервала. Проверяет, что
+каждый пользователь в обоих режимах запускается с тем же периодом.
+
+Затем сравнивает число опросов API заказов в час и среднюю задержку
+уведомления при фиксированном интервале и адаптивном (AdaptivePollingPolicy)
+на синтетическом распределении продавцов: большинство с редкими заказами,
+немного — с сотнями заказов в день.
+
+Запуск из корня проекта:
+    python -m benchmarks.schedule --users 5000
+"""
+import argparse
+import random
+from collections import Counter
+
+from bot.tasks.schedule import AdaptivePollingPolicy, PhaseScheduler
+
+PERIODS = {"start_notif_pipeline": 10, "load_stocks": 30}
+MINUTES = 60
+
+
+def simulate(scheduler: PhaseScheduler, users: int) -> tuple[Counter, dict]:
+    per_minute: Counter = Counter()
+    runs: dict[tuple[str, int], list[int]] = {}
+    for slot in range(MINUTES):
+        for task, period in PERIODS.items():
+            for user_id in range(users):
+                if scheduler.is_due(user_id, period, task, slot):
+                    per_minute[slot] += 1
+                    runs.setdefault((task, user_id), []).append(slot)
+    return per_minute, runs
+
+
+def check_cadence(runs: dict) -> None:
+    for (task, _), slots in runs.items():
+        gaps = {b - a for a, b in zip(slots, slots[1:])}
+        assert gaps == {PERIODS[task]}, (task, slots)
+        assert len(slots) == MINUTES // PERIODS[task]
+
+
+def adaptive_polls(users: int, fixed_interval: int = 10) -> None:
+    rnd = random.Random(42)
+    # Заказов за неделю: логнормальное распределение, у многих почти ноль
+    counts = {user_id: int(rnd.lognormvariate(2.0, 2.0)) for user_id in range(users)}
+    policy = AdaptivePollingPolicy()
+    policy.set_order_counts(counts)
+
+    for name, interval_for in (
+        ("fixed", lambda _: fixed_interval),
+        ("adaptive", policy.interval_for),
+    ):
+        polls = sum(60 / interval_for(user_id) for user_id in range(users))
+        # Средняя задержка заказа — половина интервала, взвешенная числом заказов
+        total_orders = sum(counts.values()) or 1
+        latency = sum(
+            count * interval_for(user_id) / 2 for user_id, count in counts.items()
+        ) / total_orders
+        print(f"{name:>8}: {polls:8.0f} polls/hour, mean order latency {latency:5.1f} min")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    args = parser.parse_args()
+
+    for name, spread in (("cron", False), ("spread", True)):
+        per_minute, runs = simulate(PhaseScheduler(spread=spread), args.users)
+        check_cadence(runs)
+        counts = [per_minute[slot] for slot in range(MINUTES)]
+        print(
+            f"{name:>6}: peak {max(counts):6d}/min, "
+            f"idle minutes {counts.count(0):2d}, "
+            f"total {sum(counts)} starts/hour"
+        )
+    adaptive_polls(args.users)
+
+
+if __name__ == "__main__":
+    main()
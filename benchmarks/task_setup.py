@@ -0,0 +1,102 @@
+"""
+Микро-бенчмарк накладных расходов на подготовку задачи брокера.
+
+Повторяет то, что делает типичная задача (load_stocks, пайплайн
+уведомлений) до первого запроса: UoW и 3–4 вызова get_*_service.
+Сравнивает прежнюю сборку (новые сервисы на каждый вызов, репозитории
+и сессия создаются в конструкторах) с привязкой сервисов к UoW.
+Соединение с БД не открывается: AsyncSession подключается при первом запросе.
+
+Запуск из корня проекта:
+    python -m benchmarks.task_setup --tasks 20000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from bot.core.dependency.container import DependencyContainer
+from bot.core.dependency.container_init import init_container
+from bot.database.uow import UnitOfWork
+from bot.services.api_key import ApiKeyService
+from bot.services.notifications import NotificationService
+from bot.services.task_control import TaskControlService
+from bot.services.wb_service import WBService
+
+
+class LegacyContainer(DependencyContainer):
+    """Сборка сервисов как до привязки к UoW."""
+
+    def get_notification_service(self, uow: UnitOfWork) -> NotificationService:
+        return NotificationService(uow=uow, translators=self._translators, bot=self.bot)
+
+    def get_api_key_service(self, uow: UnitOfWork) -> ApiKeyService:
+        # Конструктор раньше сразу брал репозитории (и тем самым сессию)
+        uow.api_keys, uow.users, uow.employee, uow.task_status
+        return ApiKeyService(uow=uow, fernet=self._fernet)
+
+    def get_wb_service(self, uow: UnitOfWork) -> WBService:
+        return WBService(
+            uow=uow,
+            translators=self._translators,
+            notification_service=self.get_notification_service(uow),
+            api_key_service=self.get_api_key_service(uow),
+        )
+
+    def get_task_control_service(self, uow: UnitOfWork) -> TaskControlService:
+        return TaskControlService(uow=uow)
+
+
+async def setup_task(container: DependencyContainer) -> None:
+    # Как в load_stocks: wb_service + task_control + api_key_service для ссылки на ключ
+    async with await container.create_uow() as uow:
+        container.get_wb_service(uow)
+        container.get_task_control_service(uow)
+        container.get_api_key_service(uow)
+    # Вторая транзакция — завершение задачи
+    async with await container.create_uow() as uow:
+        container.get_task_control_service(uow)
+
+
+async def measure(label: str, container: DependencyContainer, tasks: int) -> None:
+    await setup_task(container)  # прогрев
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(tasks):
+        await setup_task(container)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Время отдельно, без tracemalloc: он сильно замедляет выделения
+    start = time.perf_counter()
+    for _ in range(tasks):
+        await setup_task(container)
+    clean = time.perf_counter() - start
+
+    print(f"{label:>7}: {clean / tasks * 1e6:.1f} us/task "
+          f"(traced {duration / tasks * 1e6:.1f} us), peak {peak / 1024:.0f} KiB")
+
+
+async def run(tasks: int) -> None:
+    container = init_container()
+    legacy = LegacyContainer(
+        bot_token=container._bot_token,
+        i18n=container.translators.hub,
+        fernet=container._fernet,
+        session_maker=container.session_maker,
+    )
+    await measure("legacy", legacy, tasks)
+    await measure("bound", container, tasks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.tasks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Заглушки внешних сервисов для офлайн-бенчмарков.
+
+Один aiohttp-сервер отвечает за три API:
+
+- statistics-api WB (/api/v1/supplier/orders, stocks, sales, /ping):
+  синтетические заказы продавца по заголовку Authorization. Каждый
+  запрос добавляет новые заказы и, как настоящий API с flag=0, отдает
+  все заказы за период, включая уже отданные;
+- wbbasket (/basket-NN/vol.../images/big/1.webp): фото находится в
+  предполагаемой корзине или на несколько корзин дальше;
+- Bot API (/bot<token>/<method>): принимает sendPhoto/sendMessage и
+  отвечает минимальным Message.
+
+Задержки, 5xx и 429 настраиваются. Счетчики запросов — GET /_stats.
+Бот и воркер направляются сюда настройками:
+    WB__STATISTICS_URL=http://127.0.0.1:8089
+    WB__BASKET_URL=http://127.0.0.1:8089/basket-{basket}
+    BOT__API_SERVER=http://127.0.0.1:8089
+
+Запуск из корня проекта (обычно его поднимает benchmarks.orders_pipeline):
+    python -m benchmarks.wb_stub --port 8089 --latency 0.2 --orders-per-poll 2
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+# Зона времени заказов в API статистики WB
+WB_TIMEZONE = ZoneInfo("Europe/Moscow")
+
+
+def estimated_basket(nm_id: int) -> int:
+    # Пороги корзин как в WBService: заглушка знает, с какой корзины начнется поиск.
+    # Импорт здесь: модуль импортируется бенчмарком до настройки окружения бота
+    from bot.services.wb_service import BASKET_THRESHOLDS
+
+    s = nm_id // 100000
+    for i, max_val in enumerate(BASKET_THRESHOLDS, start=1):
+        if s <= max_val:
+            return i
+    return 26
+
+
+class StubState:
+    """Заказы продавцов и счетчики запросов."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.orders: dict[str, list[dict]] = {}
+        self.catalogs: dict[str, list[int]] = {}
+        self.stats: Counter = Counter()
+        self.message_ids = itertools.count(1)
+
+    async def delay(self, latency: float) -> None:
+        if latency or self.args.jitter:
+            await asyncio.sleep(latency + self.random.uniform(0, self.args.jitter))
+
+    def failure(self, route: str) -> web.Response | None:
+        """Случайный 429 или 5xx по настройкам."""
+        roll = self.random.random()
+        if roll < self.args.rate_limit_rate:
+            self.stats[f"{route}.429"] += 1
+            return web.json_response({"title": "too many requests"}, status=429)
+        if roll < self.args.rate_limit_rate + self.args.error_rate:
+            self.stats[f"{route}.500"] += 1
+            return web.json_response({"title": "internal error"}, status=500)
+        return None
+
+    def catalog(self, token: str) -> list[int]:
+        if token not in self.catalogs:
+            self.catalogs[token] = [
+                self.random.randint(10_000_000, 450_000_000)
+                for _ in range(self.args.products)
+            ]
+        return self.catalogs[token]
+
+    def make_order(self, token: str, moment: datetime) -> dict:
+        number = self.stats["orders.generated"]
+        self.stats["orders.generated"] += 1
+        price = self.random.randint(300, 5000)
+        return {
+            "date": moment.isoformat(timespec="seconds"),
+            "lastChangeDate": moment.isoformat(timespec="seconds"),
+            "supplierArticle": f"ART-{number % 100}",
+            "techSize": "0",
+            "barcode": f"46{number:011d}",
+            "totalPrice": price,
+            "finishedPrice": round(price * 0.7, 2),
+            "discountPercent": 30,
+            "spp": 10,
+            "warehouseName": self.random.choice(["Коледино", "Электросталь", "Казань"]),
+            "regionName": "Московская",
+            "oblastOkrugName": "Центральный федеральный округ",
+            "countryName": "Россия",
+            "incomeID": 1,
+            "nmId": self.random.choice(self.catalog(token)),
+            "subject": "Футболки",
+            "category": "Одежда",
+            "brand": "Brand",
+            "isCancel": False,
+            "cancelDate": "0001-01-01T00:00:00",
+            "gNumber": f"G{number}",
+            "sticker": "",
+            "srid": f"stub-{number}",
+            "priceWithDisc": round(price * 0.7, 2),
+            "isSupply": False,
+            "isRealization": True,
+            "warehouseType": "Склад WB",
+        }
+
+    def poll_orders(self, token: str) -> list[dict]:
+        # Как в WB: московское время без зоны
+        now = datetime.now(WB_TIMEZONE).replace(tzinfo=None, microsecond=0)
+        orders = self.orders.get(token)
+        if orders is None:
+            # История дня: эти заказы уже есть у продавца до первого опроса
+            orders = self.orders[token] = [
+                self.make_order(token, now - timedelta(minutes=5 * (i + 1)))
+                for i in range(self.args.history)
+            ]
+        # Пуассоновский поток новых заказов между опросами
+        new = 0
+        limit = self.random.expovariate(1.0)
+        while limit < self.args.orders_per_poll:
+            new += 1
+            limit += self.random.expovariate(1.0)
+        orders.extend(self.make_order(token, now - timedelta(seconds=30)) for _ in range(new))
+        return orders
+
+
+routes = web.RouteTableDef()
+
+
+@routes.get("/api/v1/supplier/orders")
+async def supplier_orders(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    await state.delay(state.args.latency)
+    failure = state.failure("orders")
+    if failure is not None:
+        return failure
+    token = request.headers.get("Authorization", "")
+    state.stats["orders.200"] += 1
+    if request.query.get("flag") == "1":
+        # Первичная загрузка по дням: в заглушке истории нет
+        return web.json_response([])
+    return web.json_response(state.poll_orders(token))
+
+
+@routes.get("/api/v1/supplier/stocks")
+@routes.get("/api/v1/supplier/sales")
+async def supplier_empty(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    await state.delay(state.args.latency)
+    state.stats[f"{request.path.rsplit('/', 1)[-1]}.200"] += 1
+    return web.json_response([])
+
+
+@routes.get("/ping")
+async def ping(request: web.Request) -> web.Response:
+    return web.json_response({"TS": datetime.now().isoformat(), "Status": "OK"})
+
+
+@routes.route("*", "/basket-{basket}/vol{vol}/part{part}/{nm_id}/images/big/1.webp")
+async def basket_photo(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    await state.delay(state.args.basket_latency)
+    nm_id = int(request.match_info["nm_id"])
+    # Фото лежит в предполагаемой корзине или до basket_offset корзин дальше
+    actual = estimated_basket(nm_id) + nm_id % (state.args.basket_offset + 1)
+    if int(request.match_info["basket"]) == actual:
+        state.stats["basket.200"] += 1
+        return web.Response(body=b"", content_type="image/webp")
+    state.stats["basket.404"] += 1
+    return web.Response(status=404)
+
+
+@routes.post("/bot{token}/{method}")
+async def bot_api(request: web.Request) -> web.Response:
+    state: StubState = request.app["state"]
+    method = request.match_info["method"]
+    await state.delay(state.args.bot_latency)
+    if state.random.random() < state.args.bot_flood_rate:
+        state.stats[f"bot.{method}.429"] += 1
+        return web.json_response({
+            "ok": False, "error_code": 429,
+            "description": "Too Many Requests: retry after 1",
+            "parameters": {"retry_after": 1},
+        })
+    state.stats[f"bot.{method}"] += 1
+
+    if method == "getMe":
+        return web.json_response({"ok": True, "result": {
+            "id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}})
+    if method.startswith("send"):
+        data = await request.post()
+        chat_id = int(data.get("chat_id", 0))
+        return web.json_response({"ok": True, "result": {
+            "message_id": next(state.message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+        }})
+    return web.json_response({"ok": True, "result": True})
+
+
+@routes.get("/_stats")
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response(dict(request.app["state"].stats))
+
+
+def create_app(args: argparse.Namespace) -> web.Application:
+    app = web.Application()
+    app["state"] = StubState(args)
+    app.add_routes(routes)
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Параметры заглушки (общие с benchmarks.orders_pipeline)."""
+    group = parser.add_argument_group("stub")
+    group.add_argument("--port", type=int, default=8089)
+    group.add_argument("--latency", type=float, default=0.2, help="секунды, statistics-api")
+    group.add_argument("--basket-latency", type=float, default=0.02, help="секунды, wbbasket")
+    group.add_argument("--bot-latency", type=float, default=0.05, help="секунды, Bot API")
+    group.add_argument("--jitter", type=float, default=0.0, help="секунды, добавка к задержке")
+    group.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    group.add_argument("--rate-limit-rate", type=float, default=0.0, help="доля ответов 429")
+    group.add_argument("--bot-flood-rate", type=float, default=0.0, help="доля 429 от Bot API")
+    group.add_argument("--orders-per-poll", type=float, default=2.0,
+                       help="среднее число новых заказов за опрос")
+    group.add_argument("--history", type=int, default=20,
+                       help="заказов за день до первого опроса")
+    group.add_argument("--products", type=int, default=30, help="товаров у продавца")
+    group.add_argument("--basket-offset", type=int, default=1,
+                       help="на сколько корзин фото может быть дальше предполагаемой")
+    group.add_argument("--seed", type=int, default=1)
+
+
+def stub_argv(args: argparse.Namespace) -> list[str]:
+    """Аргументы командной строки заглушки из разобранных параметров."""
+    argv = []
+    for name in (
+        "port", "latency", "basket_latency", "bot_latency", "jitter", "error_rate",
+        "rate_limit_rate", "bot_flood_rate", "orders_per_poll", "history",
+        "products", "basket_offset", "seed",
+    ):
+        argv += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    return argv
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(create_app(args), host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,24 @@ import json
 import time
 import aiohttp
 import asyncio
-import inspect
 
 from typing import Optional, Any
 from cachetools import TTLCache
 from collections import deque
+from aiohttp.client import DEFAULT_TIMEOUT
 from .auth.strategy import AuthStrategy
+from .tracing import create_trace_config, endpoint_template, status_class
+from ..core.config import settings
 from ..core.logging import api_logger
+from ..core.metrics import (
+    http_client_request_duration,
+    http_client_requests_total,
+    http_client_retries_total,
+)
+
+
+# Трассировка фаз соединения включается настройкой (лишние колбэки на каждый запрос)
+TRACE_CONFIGS = [create_trace_config()] if settings.http_trace else None
 
 
 class UnauthorizedUser(Exception):
@@ -131,7 +142,9 @@ class BaseAPIClient:
             params: Optional[dict[str, Any]] = None,
             json: Optional[dict[str, Any]] = None,
             headers: Optional[dict[str, Any]] = None,
-            max_retries: int = 5
+            max_retries: int = 5,
+            caller: str = "unknown",
+            timeout: Optional[float] = None
     ) -> Optional[dict[str, Any]]:
         """
         Базовый метод для выполнения запросов с логированием и обработкой ошибок.
@@ -142,58 +155,89 @@ class BaseAPIClient:
         :param json: Тело запроса (для POST/PUT).
         :param max_retries: Количество повторных попыток.
         :param headers: Произвольные заголовки.
+        :param caller: Имя вызывающего метода (метка метрик и логов).
+        :param timeout: Общий таймаут одной попытки в секундах (None — по умолчанию aiohttp).
         :return: JSON-ответ сервера или None в случае ошибки.
         """
         request_headers = headers or {}
         if self.auth_headers:
             request_headers.update(self.auth_headers)
         retries = 0
-        # Заголовки из стратегии
-        caller = inspect.stack()[1].function
+        host, endpoint = endpoint_template(url)
+        labels = {"host": host, "endpoint": endpoint, "caller": caller}
+        status: Optional[int] = None
+
+        def finish(result):
+            http_client_requests_total.labels(
+                **labels, status_class=status_class(status),
+                retries=str(retries) if retries < 3 else "3+").inc()
+            return result
+
+        def retry(reason: str) -> None:
+            http_client_retries_total.labels(**labels, reason=reason).inc()
+
+        client_timeout = aiohttp.ClientTimeout(
+            total=timeout) if timeout is not None else DEFAULT_TIMEOUT
+
         while retries <= max_retries:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=TRACE_CONFIGS, timeout=client_timeout) as session:
+                start_time = time.perf_counter()
+                status = None
                 try:
-                    start_time = time.time()
                     async with session.request(
                             method, url, params=params, json=json, headers=request_headers) as response:
-                        duration = time.time() - start_time
+                        status = response.status
+                        duration = time.perf_counter() - start_time
+                        http_client_request_duration.labels(
+                            **labels, status_class=status_class(status)).observe(duration)
                         response.raise_for_status()
-                        if response.status == 200:
-                            self.api_logger.info(
-                                f"Response {response.status} ({caller}) Duration: {
-                                    duration:.2f}s : {method} {url}"
-                            )
+                        self.api_logger.debug(
+                            "http.response", method=method, endpoint=endpoint,
+                            caller=caller, status=status, duration=round(duration, 3))
                         # Проверяем Content-Type для выбора метода обработки
                         if response.content_type == 'application/json':
-                            return await response.json()
+                            return finish(await response.json())
                         elif response.content_type == 'application/xml':
-                            return await response.text()
+                            return finish(await response.text())
                         else:
                             self.api_logger.error(
-                                f"Неподдерживаемый формат ответа: {response.content_type}")
-                            return None
+                                "Unsupported response content type",
+                                content_type=response.content_type, caller=caller, url=url)
+                            return finish(None)
                 except aiohttp.ClientResponseError as error:
-                    result = await self._handle_error(error, response, method, url, caller)
+                    try:
+                        result = await self._handle_error(error, response, method, url, caller)
+                    except UnauthorizedUser:
+                        finish(None)
+                        raise
                     if result == "RETRY":
+                        retry(str(status))
                         retries += 1
+                        if retries > max_retries:
+                            break
                         await asyncio.sleep(30 * retries)
                         continue
-                    return result
+                    return finish(result)
                 except aiohttp.ClientPayloadError as error:
                     self.api_logger.error(
                         f"Transfer error {url} (Caller: {caller}): {str(error)}")
+                    retry("payload")
                     retries += 1
+                    if retries > max_retries:
+                        break
                     await asyncio.sleep(3 * retries)
                     continue
                 except Exception as error:
+                    if status is None:
+                        http_client_request_duration.labels(
+                            **labels, status_class="error").observe(
+                            time.perf_counter() - start_time)
                     self.api_logger.error(
-                        f"Unexpected error {url} (Caller: {caller}) {response.status}: {
-                            str(error)}"
-                    )
-                    return None
+                        f"Unexpected error {url} (Caller: {caller}) {status}: {str(error)}")
+                    return finish(None)
         self.api_logger.error(
             f"Failed after retries: {method} {url} (Caller: {caller})")
-        return None
+        return finish(None)
 
     async def _download(self, file_url: str):
         async with aiohttp.ClientSession() as session:
@@ -202,8 +246,18 @@ class BaseAPIClient:
                     return None
                 return await resp.read()
 
-    async def head_request(self, url: str) -> bool:
-        async with aiohttp.ClientSession() as session:
-            resp = await session.head(url)
-            if resp.status == 200:
-                return True
+    async def head_request(self, url: str, caller: str = "head_request") -> bool:
+        host, endpoint = endpoint_template(url)
+        status: Optional[int] = None
+        start_time = time.perf_counter()
+        try:
+            async with aiohttp.ClientSession(trace_configs=TRACE_CONFIGS) as session:
+                async with session.head(url) as resp:
+                    status = resp.status
+                    return resp.status == 200
+        finally:
+            labels = {"host": host, "endpoint": endpoint, "caller": caller,
+                      "status_class": status_class(status)}
+            http_client_request_duration.labels(**labels).observe(
+                time.perf_counter() - start_time)
+            http_client_requests_total.labels(**labels, retries="0").inc()
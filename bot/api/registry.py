@@ -0,0 +1,52 @@
+from cachetools import TTLCache
+
+from bot.core.security import decrypted_keys
+from bot.schemas.wb import ApiKeyWithTelegramDTO
+from .wb import WBAPIClient
+
+
+class WBClientRegistry:
+    """
+    Реестр WBAPIClient: один клиент на пользователя в процессе.
+
+    Клиент пересоздается, только если у пользователя сменился ключ
+    (id или version), ключ расшифровывается через DecryptedKeyCache.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 60 * 60):
+        # user_id -> (key_id, version, client)
+        self._clients: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._public: WBAPIClient | None = None
+
+    def get(self, api_key: ApiKeyWithTelegramDTO) -> WBAPIClient:
+        entry = self._clients.get(api_key.user_id)
+        if entry is not None:
+            key_id, version, client = entry
+            if key_id == api_key.id and version == api_key.version:
+                return client
+
+        plain_token = decrypted_keys.get(
+            api_key.id, api_key.version, api_key.key_encrypted)
+        client = WBAPIClient(plain_token=plain_token)
+        self._clients[api_key.user_id] = (api_key.id, api_key.version, client)
+        return client
+
+    @property
+    def public(self) -> WBAPIClient:
+        """Клиент без авторизации (фото товаров и т.п.)."""
+        if self._public is None:
+            self._public = WBAPIClient()
+        return self._public
+
+    def invalidate(self, user_id: int, key_ids: list[int] | None = None) -> None:
+        """Сбросить клиента пользователя и расшифрованные ключи."""
+        entry = self._clients.pop(user_id, None)
+        ids = set(key_ids or [])
+        if entry is not None:
+            ids.add(entry[0])
+        for key_id in ids:
+            decrypted_keys.invalidate(key_id)
+
+
+# Один реестр на процесс
+wb_clients = WBClientRegistry()
@@ -0,0 +1,92 @@
+import re
+import time
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from bot.core.metrics import http_client_phase_duration
+
+
+# Идентификаторы (nm_id и т.п.); короткие числа вроде версии API /v1/ оставляем
+_NUMBER = re.compile(r"\d{3,}")
+
+
+def endpoint_template(url: str) -> tuple[str, str]:
+    """
+    (host, шаблон пути) для меток метрик.
+
+    Длинные числа в пути заменяются на {n}: у фото товаров в пути nm_id,
+    иначе каждая ссылка давала бы свой временной ряд.
+    """
+    parts = urlsplit(url)
+    return parts.hostname or "", _NUMBER.sub("{n}", parts.path) or "/"
+
+
+def status_class(status: int | None) -> str:
+    if status is None:
+        return "error"
+    return f"{status // 100}xx"
+
+
+def _host(params: object) -> str:
+    url = getattr(params, "url", None)
+    if url is not None:
+        return url.host or ""
+    return getattr(params, "host", "") or ""
+
+
+async def _on_dns_start(session, context: SimpleNamespace, params) -> None:
+    context.dns_start = time.perf_counter()
+
+
+async def _on_dns_end(session, context: SimpleNamespace, params) -> None:
+    start = getattr(context, "dns_start", None)
+    if start is not None:
+        http_client_phase_duration.labels(host=_host(params), phase="dns").observe(
+            time.perf_counter() - start)
+
+
+async def _on_request_start(session, context: SimpleNamespace, params) -> None:
+    context.host = _host(params)
+
+
+async def _on_connect_start(session, context: SimpleNamespace, params) -> None:
+    context.connect_start = time.perf_counter()
+
+
+async def _on_connect_end(session, context: SimpleNamespace, params) -> None:
+    start = getattr(context, "connect_start", None)
+    if start is not None:
+        http_client_phase_duration.labels(
+            host=getattr(context, "host", ""), phase="connect").observe(
+            time.perf_counter() - start)
+
+
+async def _on_queued_start(session, context: SimpleNamespace, params) -> None:
+    context.queued_start = time.perf_counter()
+
+
+async def _on_queued_end(session, context: SimpleNamespace, params) -> None:
+    start = getattr(context, "queued_start", None)
+    if start is not None:
+        http_client_phase_duration.labels(
+            host=getattr(context, "host", ""), phase="pool_wait").observe(
+            time.perf_counter() - start)
+
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """
+    TraceConfig с метриками фаз соединения.
+
+    aiohttp не выделяет TLS в отдельный сигнал: рукопожатие входит в connect.
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_dns_resolvehost_start.append(_on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_end)
+    trace_config.on_connection_create_start.append(_on_connect_start)
+    trace_config.on_connection_create_end.append(_on_connect_end)
+    trace_config.on_connection_queued_start.append(_on_queued_start)
+    trace_config.on_connection_queued_end.append(_on_queued_end)
+    return trace_config
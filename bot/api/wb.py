@@ -1,8 +1,9 @@
 from typing import Optional
 
 from bot.api.auth.strategy import APIKeyAuthStrategy
+from bot.core.config import settings
 from bot.core.security import decrypt_api_key
-from bot.schemas.wb import OrderWBCreate, StockWBCreate
+from bot.schemas.wb import OrderWBCreate, SalesWBCreate, StockWBCreate
 from .base_api_client import BaseAPIClient
 
 
@@ -25,49 +26,64 @@ class WBAPIClient(BaseAPIClient):
     # Продажи
     async def get_sales(
             self,
-            date_from: Optional[str] = '2025-01-01'
-    ) -> Optional[dict]:
+            user_id: int,
+            date_from: str = '2025-01-01'
+    ) -> list[SalesWBCreate]:
         """
-        Получение данных о продажах начиная с указанной даты.
+        Получение продаж, измененных начиная с указанной даты.
 
-        Если дата не указана, берется последняя доступная дата из базы данных.
+        API отдает строки с lastChangeDate >= dateFrom (flag=0), поэтому
+        в date_from передается курсор — последняя загруженная дата изменения.
 
-        :param db_manager: Объект DatabaseManager для взаимодействия с базой данных.
-        :param date_from: Дата начала периода в формате YYYY-MM-DD (опционально).
-        :return: JSON с данными о продажах или None в случае ошибки.
+        :param user_id: ID пользователя, которому принадлежат продажи.
+        :param date_from: Дата/время в формате RFC3339 (YYYY-MM-DDTHH:MM:SS).
+        :return: list[SalesWBCreate] или пустой список в случае ошибки.
         """
-
-        url = f"https://statistics-api.wildberries.ru/api/v1/supplier/sales?dateFrom={
-            date_from}"
-        return await self._request("GET", url)
+        url = f"{settings.wb.statistics_url}/api/v1/supplier/sales"
+        sales_data = await self._request(
+            "GET", url, params={"dateFrom": date_from, "flag": 0}, caller="get_sales")
+        if not sales_data:
+            return []
+        return [SalesWBCreate(**sale, user_id=user_id) for sale in sales_data]
 
     # Заказы
     async def get_orders(
             self,
             user_id: int,
-            date_from: str = '2025-05-19'
+            date_from: str = '2025-05-19',
+            flag: int = 0
     ) -> list[OrderWBCreate]:
         """
         Получение данных о заказах начиная с указанной даты.
 
         :param date_from: Дата начала периода в формате YYYY-MM-DD.
-        :param db_manager: Объект DatabaseManager для взаимодействия с базой данных.
+        :param flag: 0 — все изменения начиная с даты, 1 — заказы за один день date_from.
         :return: list[OrderWBCreate] с данными о заказах или None в случае ошибки.
         """
-        url = f"https://statistics-api.wildberries.ru/api/v1/supplier/orders?dateFrom={
-            date_from}"
-        orders_data = await self._request("GET", url)
+        orders_data = await self.get_orders_raw(date_from, flag)
+        return self.parse_orders(user_id, orders_data)
+
+    async def get_orders_raw(self, date_from: str, flag: int = 0) -> list[dict] | None:
+        """Заказы как их вернул API, без валидации."""
+        url = f"{settings.wb.statistics_url}/api/v1/supplier/orders"
+        return await self._request(
+            "GET", url, params={"dateFrom": str(date_from), "flag": flag}, caller="get_orders")
+
+    @staticmethod
+    def parse_orders(user_id: int, orders_data: list[dict]) -> list[OrderWBCreate]:
         return [OrderWBCreate(**order, user_id=user_id) for order in orders_data]
 
-    async def ping_wb(self):
-        url = "https://statistics-api.wildberries.ru/ping"
-        response = await self._request("GET", url)
+    async def ping_wb(self, max_retries: int = 0, timeout: float = 10):
+        """Проверка ключа: одна попытка с коротким таймаутом, без ожидания на 429/5xx."""
+        url = f"{settings.wb.statistics_url}/ping"
+        response = await self._request(
+            "GET", url, max_retries=max_retries, caller="ping_wb", timeout=timeout)
         return response
 
     async def get_stocks(self, user_id: int, date_from: str = '2025-05-19'):
-        url = f"https://statistics-api.wildberries.ru/api/v1/supplier/stocks?dateFrom={
-            date_from}"
-        stocks_data = await self._request("GET", url)
+        url = f"{settings.wb.statistics_url}/api/v1/supplier/stocks"
+        stocks_data = await self._request(
+            "GET", url, params={"dateFrom": date_from}, caller="get_stocks")
         return [StockWBCreate(**stock, user_id=user_id) for stock in stocks_data]
 
 
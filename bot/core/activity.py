@@ -0,0 +1,45 @@
+import time
+from datetime import datetime
+
+from redis.asyncio.client import Redis
+
+from bot.core.config import settings
+
+
+# Sorted set: telegram_id -> unix-время последнего обращения
+ACTIVITY_KEY = "user_activity"
+
+
+class ActivityBuffer:
+    """
+    Буфер обращений пользователей к боту в Redis.
+
+    Бот только добавляет отметки (одна команда Redis, без БД), воркер
+    периодически забирает накопленное и пишет в users.last_interaction_at
+    одним пакетом. Повторное обращение до выгрузки перезаписывает время.
+    """
+
+    def __init__(self, redis: Redis, key: str = ACTIVITY_KEY) -> None:
+        self._redis = redis
+        self._key = key
+
+    async def touch(self, telegram_id: int) -> None:
+        await self._redis.zadd(self._key, {telegram_id: time.time()})
+
+    async def drain(self) -> dict[int, datetime]:
+        """Забрать и очистить накопленные отметки (атомарно)."""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrange(self._key, 0, -1, withscores=True)
+            pipe.delete(self._key)
+            items, _ = await pipe.execute()
+        return {int(member): datetime.fromtimestamp(score) for member, score in items}
+
+    async def restore(self, items: dict[int, datetime]) -> None:
+        """Вернуть невыгруженные отметки; более свежие не перезаписываются."""
+        if items:
+            await self._redis.zadd(
+                self._key, {telegram_id: at.timestamp() for telegram_id, at in items.items()}, gt=True)
+
+
+# Один буфер на процесс (бот пишет, воркер выгружает); соединение — при первой команде
+activity_buffer = ActivityBuffer(Redis.from_url(settings.redis.url))
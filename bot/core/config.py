@@ -1,5 +1,22 @@
 from pydantic_settings import BaseSettings
-from pydantic import SecretStr
+from pydantic import BaseModel, SecretStr
+
+
+class PoolSettings(BaseModel):
+    """Параметры пула соединений для одной роли процесса (по умолчанию — бот)."""
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 1800  # секунды, до закрытия долгоживущих соединений
+    pool_pre_ping: bool = True
+    # Кэш подготовленных выражений asyncpg на соединение (0 — выключен)
+    prepared_statement_cache_size: int = 100
+
+
+class WorkerPoolSettings(PoolSettings):
+    # Конкурентность воркера ограничена max_ack_pending брокера
+    pool_size: int = 5
+    max_overflow: int = 5
 
 
 class PostgresSettings(BaseSettings):
@@ -8,11 +25,34 @@ class PostgresSettings(BaseSettings):
     db: str
     host: str = "db"
     port: int = 5432
+    echo: bool = False
+
+    bot_pool: PoolSettings = PoolSettings()
+    worker_pool: WorkerPoolSettings = WorkerPoolSettings()
+
+    # Реплика для read-only запросов (опционально, та же БД и учетные данные)
+    replica_host: str | None = None
+    replica_port: int = 5432
+    replica_max_lag: float = 5.0  # секунды; при большем отставании читаем с primary
+    replica_check_interval: float = 5.0  # как часто перепроверять отставание
+
+    # Тайминги запросов по методам репозиториев
+    query_timing: bool = True
+    slow_query_threshold: float = 0.5  # секунды; медленные запросы пишутся в лог
+
+    def pool_for(self, role: str) -> PoolSettings:
+        return self.worker_pool if role == "worker" else self.bot_pool
 
     @property
     def async_url(self) -> str:
         return f"postgresql+asyncpg://{self.user}:{self.password.get_secret_value()}@{self.host}:{self.port}/{self.db}"
 
+    @property
+    def replica_async_url(self) -> str | None:
+        if not self.replica_host:
+            return None
+        return f"postgresql+asyncpg://{self.user}:{self.password.get_secret_value()}@{self.replica_host}:{self.replica_port}/{self.db}"
+
 
 class RedisSettings(BaseSettings):
     url: str = "redis://redis:6379/0"
@@ -20,6 +60,65 @@ class RedisSettings(BaseSettings):
 
 class NatsSettings(BaseSettings):
     url: str = "nats://nats:4222"
+    # Хранение результатов задач в object store
+    result_ttl: int = 60 * 60  # секунды
+    result_max_size: int = 256 * 1024  # байты
+
+
+class WBSettings(BaseSettings):
+    # Базовые адреса API WB; переопределяются для локальных заглушек (benchmarks/wb_stub.py)
+    statistics_url: str = "https://statistics-api.wildberries.ru"
+    basket_url: str = "https://basket-{basket}.wbbasket.ru"
+
+
+class LogSettings(BaseSettings):
+    # console — цветной вывод для разработки, json — для прода; по умолчанию по APP debug
+    renderer: str | None = None
+    level: str = "INFO"
+    # Уровни отдельных логгеров: LOG__LEVELS='{"db": "WARNING", "aiogram.event": "WARNING"}'
+    levels: dict[str, str] = {}
+    # Доля событий INFO/DEBUG, которые пишутся для шумных логгеров (1 — все)
+    sample: dict[str, float] = {"db": 0.1}
+    queue_size: int = 10_000  # записи сверх очереди отбрасываются, а не блокируют цикл
+
+
+class LoopMonitorSettings(BaseSettings):
+    enabled: bool = True
+    interval: float = 0.5  # секунды между замерами лага
+    slow_threshold: float = 0.1  # секунды; лаг или колбэк дольше — предупреждение в лог
+    # Режим отладки asyncio называет медленные колбэки, но заметно дорог
+    # (стек при создании каждой задачи) — включать на время разбора
+    debug: bool = False
+
+
+class ProfilingSettings(BaseSettings):
+    # Выключено — middleware не подключается к брокеру, накладных расходов нет
+    enabled: bool = False
+    sample_rate: float = 0.0  # доля задач, профилируемых случайно
+    # Всегда профилировать эти задачи и/или пользователей:
+    # PROFILING__TASKS='["fetch_and_save_orders_for_key"]', PROFILING__USER_IDS='[42]'
+    tasks: list[str] = []
+    user_ids: list[int] = []
+    output_dir: str = "/tmp/task_profiles"
+    top: int = 20  # функций профиля в логе
+
+
+class SchedulerSettings(BaseSettings):
+    # Размазывать периодические задачи по интервалу (стабильный сдвиг на пользователя);
+    # False — все пользователи в начале интервала, как в обычном cron
+    spread: bool = True
+    notif_interval: int = 10  # минуты, пайплайн уведомлений о заказах
+    stocks_interval: int = 30  # минуты, загрузка остатков
+
+    # Адаптивный интервал уведомлений по частоте заказов продавца;
+    # False — все опрашиваются раз в notif_interval
+    adaptive: bool = True
+    notif_min_interval: int = 2  # минуты, для самых активных продавцов
+    notif_max_interval: int = 60  # минуты, для продавцов без заказов
+    notif_base_interval: float = 8  # минуты при частоте один заказ в час
+    velocity_window_days: int = 7  # окно подсчета частоты заказов
+    velocity_refresh: int = 15  # минуты между пересчетами частоты
+    boost_minutes: int = 30  # минимальный интервал после обращения к боту
 
 
 class BotSettings(BaseSettings):
@@ -27,17 +126,37 @@ class BotSettings(BaseSettings):
     admin_id: int
     username: str
     locale_path: str = "./locales"
+    # Свой сервер Bot API (локальный telegram-bot-api или заглушка), None — api.telegram.org
+    api_server: str | None = None
+
+    # polling — один процесс (разработка), webhook — HTTP-прием апдейтов,
+    # несколько реплик за балансировщиком с общим FSM в Redis
+    mode: str = "polling"
+    webhook_url: str | None = None  # публичный адрес без пути, например https://bot.example.com
+    webhook_path: str = "/webhook"
+    # Сверяется с заголовком X-Telegram-Bot-Api-Secret-Token: 1-256 символов A-Z, a-z, 0-9, _ и -
+    webhook_secret: SecretStr | None = None
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_max_connections: int = 40  # одновременных запросов Telegram к вебхуку
 
 
 class AppSettings(BaseSettings):
     fernet_secret: SecretStr
     trial_days: int = 360  # длительность пробного периода в днях
     debug: bool = False
-    
+    metrics_port: int = 9001  # Prometheus-метрики процесса бота
+    http_trace: bool = False  # фазы DNS/connect/TLS исходящих запросов (aiohttp TraceConfig)
+
     postgres: PostgresSettings
     redis: RedisSettings
     nats: NatsSettings
     bot: BotSettings
+    scheduler: SchedulerSettings = SchedulerSettings()
+    wb: WBSettings = WBSettings()
+    log: LogSettings = LogSettings()
+    loop_monitor: LoopMonitorSettings = LoopMonitorSettings()
+    profiling: ProfilingSettings = ProfilingSettings()
 
     class Config:
         env_file = ".env"
@@ -1,70 +1,122 @@
-from typing import Callable
+from typing import Callable, TypeVar
 from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from cryptography.fernet import Fernet
-from fluentogram import TranslatorRunner
+from fluentogram import TranslatorHub
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.database.uow import UnitOfWork
+from bot.database.routing import ReadReplicaRouter
+from bot.database.uow import ReadOnlyUnitOfWork, UnitOfWork
 from bot.services.api_key import ApiKeyService
 from bot.services.subscription import SubscriptionService
 from bot.services.notifications import NotificationService
 from bot.services.users import UserService
 from bot.services.wb_service import WBService
 from bot.services.task_control import TaskControlService
+from bot.utils.i18n import TranslatorRegistry
+
+
+ServiceT = TypeVar("ServiceT")
 
 
 class DependencyContainer:
+    """
+    Граф зависимостей процесса.
+
+    Без состояния и общие на процесс: переводчик, бот, fernet, пулы БД.
+    HTTP-клиенты WB, кэши и лимитеры — синглтоны своих модулей.
+    Сервисы привязаны к UoW: в пределах одного UoW каждый создается
+    один раз, повторные get_*_service(uow) возвращают тот же объект.
+    """
+
     def __init__(
         self,
         bot_token: str,
-        i18n: TranslatorRunner,
+        i18n: TranslatorHub,
         fernet: Fernet,
         session_maker: Callable[[], AsyncSession],
+        read_router: ReadReplicaRouter | None = None,
+        bot_api_server: str | None = None,
     ) -> None:
         self._bot_token = bot_token
+        self._bot_api_server = bot_api_server
         self._fernet = fernet
         self._session_maker = session_maker
-        self._i18n = i18n
+        self._read_router = read_router or ReadReplicaRouter(session_maker)
+        # Раннеры переводчика по локалям — одни на процесс
+        self._translators = TranslatorRegistry(i18n)
 
         self._bot: Bot | None = None
 
+    @property
+    def session_maker(self) -> Callable[[], AsyncSession]:
+        return self._session_maker
+
+    @property
+    def translators(self) -> TranslatorRegistry:
+        return self._translators
+
     @property
     def bot(self) -> Bot:
         if self._bot is None:
-            self._bot = Bot(token=self._bot_token)
+            session = None
+            if self._bot_api_server:
+                session = AiohttpSession(
+                    api=TelegramAPIServer.from_base(self._bot_api_server))
+            self._bot = Bot(token=self._bot_token, session=session)
         return self._bot
 
     async def create_uow(self) -> UnitOfWork:
         """Создает новый UoW для использования вне middleware (например, в брокерах)."""
-        return UnitOfWork(self._session_maker())
+        return UnitOfWork(self._session_maker)
+
+    async def create_read_uow(self) -> ReadOnlyUnitOfWork:
+        """
+        Создает read-only UoW: через реплику, если она настроена и не отстала.
+        Не использовать для чтения сразу после записи в том же сценарии.
+        """
+        session_maker = await self._read_router.read_session_maker()
+        return ReadOnlyUnitOfWork(session_maker)
+
+    def _bind(
+        self,
+        uow: UnitOfWork,
+        service_cls: type[ServiceT],
+        factory: Callable[[], ServiceT]
+    ) -> ServiceT:
+        service = uow.services.get(service_cls)
+        if service is None:
+            service = uow.services[service_cls] = factory()
+        return service
 
     def get_notification_service(self, uow: UnitOfWork) -> NotificationService:
-        """Создает NotificationService с переданным UoW."""
-        return NotificationService(uow=uow, i18n=self._i18n, bot=self.bot)
+        """NotificationService, привязанный к UoW."""
+        return self._bind(uow, NotificationService, lambda: NotificationService(
+            uow=uow, translators=self._translators, bot=self.bot))
 
     def get_api_key_service(self, uow: UnitOfWork) -> ApiKeyService:
-        """Создает ApiKeyService с переданным UoW."""
-        return ApiKeyService(uow=uow, fernet=self._fernet)
+        """ApiKeyService, привязанный к UoW."""
+        return self._bind(uow, ApiKeyService, lambda: ApiKeyService(
+            uow=uow, fernet=self._fernet))
 
     def get_subscription_service(self, uow: UnitOfWork) -> SubscriptionService:
-        """Создает SubscriptionService с переданным UoW."""
-        return SubscriptionService(uow=uow)
+        """SubscriptionService, привязанный к UoW."""
+        return self._bind(uow, SubscriptionService, lambda: SubscriptionService(uow=uow))
 
     def get_wb_service(self, uow: UnitOfWork) -> WBService:
-        """Создает WBService с переданным UoW."""
-        notification_service = self.get_notification_service(uow)
-        api_key_service = self.get_api_key_service(uow)
-        return WBService(
+        """WBService, привязанный к UoW (делит с ним Notification/ApiKey сервисы)."""
+        return self._bind(uow, WBService, lambda: WBService(
             uow=uow,
-            i18n=self._i18n,
-            notification_service=notification_service,
-            api_key_service=api_key_service,
-        )
+            translators=self._translators,
+            notification_service=self.get_notification_service(uow),
+            api_key_service=self.get_api_key_service(uow),
+        ))
 
     def get_user_service(self, uow: UnitOfWork) -> UserService:
-        """Создает UserService с переданным UoW."""
-        return UserService(uow=uow)
+        """UserService, привязанный к UoW."""
+        return self._bind(uow, UserService, lambda: UserService(uow=uow))
 
     def get_task_control_service(self, uow: UnitOfWork) -> TaskControlService:
-        """Создает TaskControlService с переданным UoW."""
-        return TaskControlService(uow=uow)
+        """TaskControlService, привязанный к UoW."""
+        return self._bind(uow, TaskControlService, lambda: TaskControlService(uow=uow))
@@ -1,9 +1,10 @@
 from cryptography.fernet import Fernet
 from fluentogram import TranslatorHub
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from bot.core.config import settings
 from bot.core.dependency.container import DependencyContainer
+from bot.database.engine import ProcessRole, create_engine, create_session_maker
+from bot.database.routing import ReadReplicaRouter
 from bot.utils.i18n import create_translator_hub
 
 
@@ -11,19 +12,29 @@ from bot.utils.i18n import create_translator_hub
 _container: DependencyContainer | None = None
 
 
-def init_container(reuse: bool = True) -> DependencyContainer:
+def init_container(
+    role: ProcessRole = ProcessRole.BOT,
+    reuse: bool = True
+) -> DependencyContainer:
     global _container
     if _container is not None and reuse:
         return _container
 
-    # 1. Создание движка и session_maker
-    engine = create_async_engine(
-        settings.postgres.async_url,
-        echo=settings.debug,
-        pool_size=5,
-        max_overflow=10,
+    # 1. Создание движка и session_maker с пулом под роль процесса
+    engine = create_engine(role)
+    session_maker = create_session_maker(engine)
+
+    # Реплика для read-only запросов, если настроена
+    replica_session_maker = None
+    if settings.postgres.replica_host:
+        replica_session_maker = create_session_maker(
+            create_engine(role, replica=True))
+    read_router = ReadReplicaRouter(
+        primary=session_maker,
+        replica=replica_session_maker,
+        max_lag=settings.postgres.replica_max_lag,
+        check_interval=settings.postgres.replica_check_interval,
     )
-    session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
     # 2. Шифрование
     fernet = Fernet(settings.fernet_secret.get_secret_value())
@@ -37,5 +48,7 @@ def init_container(reuse: bool = True) -> DependencyContainer:
         i18n=translator_hub,
         fernet=fernet,
         session_maker=session_maker,
+        read_router=read_router,
+        bot_api_server=settings.bot.api_server,
     )
     return _container
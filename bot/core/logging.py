@@ -1,41 +1,257 @@
+import atexit
 import logging
+import queue
+import random
 import sys
+import threading
+from logging.handlers import QueueHandler
+
 import structlog
 from prometheus_client import Counter, Histogram
 
-# Можно переключать режим логирования через переменные окружения, если хочешь
-DEBUG = True  # В проде — False, тогда лог будет в JSON
 
+log_records_dropped = Counter(
+    'log_records_dropped_total',
+    'Log records not written: sampled out or the log queue was full',
+    ['reason']
+)
+
+_NAME_TO_LEVEL = {
+    "debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING,
+    "warn": logging.WARNING, "error": logging.ERROR, "exception": logging.ERROR,
+    "critical": logging.CRITICAL, "fatal": logging.CRITICAL, "msg": logging.INFO,
+}
+_STOP = object()
+
+
+class LogFilter:
+    """
+    Первый процессор structlog: уровни по логгерам и сэмплирование INFO.
+
+    levels — минимальный уровень по имени логгера ("db": WARNING), иначе default;
+    sample — доля событий INFO/DEBUG шумных логгеров ("db": 0.1),
+    WARNING и выше проходят всегда.
+    """
+
+    def __init__(self) -> None:
+        self.default = logging.INFO
+        self.levels: dict[str, int] = {}
+        self.sample: dict[str, float] = {}
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        name = logger.name
+        level = _NAME_TO_LEVEL.get(method_name, logging.INFO)
+        if level < self.levels.get(name, self.default):
+            raise structlog.DropEvent
+        if level <= logging.INFO:
+            rate = self.sample.get(name)
+            if rate is not None and random.random() >= rate:
+                log_records_dropped.labels(reason="sampled").inc()
+                raise structlog.DropEvent
+        return event_dict
+
+
+def _capture_exc_info(logger, method_name: str, event_dict: dict) -> dict:
+    # Исключение форматируется в потоке записи, где sys.exc_info() уже пуст
+    if method_name == "exception" or event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
+
+
+def _to_queue(logger, method_name: str, event_dict: dict):
+    # Последний процессор: logger.<method>(method_name, event_dict)
+    return (method_name, event_dict), {}
+
+
+class QueueLogger:
+    """
+    Логгер structlog: кладет собранное событие в очередь, без LogRecord stdlib.
+
+    Рендеринг и запись в stdout выполняет поток LogWriter. Пока он не
+    запущен (скрипты без setup_logging), событие пишется сразу.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def _log(self, method_name: str, event_dict: dict) -> None:
+        if _writer is None:
+            sys.stdout.write(_fallback_render(self, method_name, event_dict) + "\n")
+            return
+        try:
+            _queue.put_nowait((self, method_name, event_dict))
+        except queue.Full:
+            log_records_dropped.labels(reason="queue_full").inc()
+
+    debug = info = warning = warn = error = critical = fatal = exception = msg = _log
+
+
+def _create_renderer(renderer: str) -> list:
+    if renderer == "console":
+        return [structlog.processors.UnicodeDecoder(), structlog.dev.ConsoleRenderer()]
+    return [
+        structlog.processors.UnicodeDecoder(),     # Обработка Unicode
+        structlog.processors.format_exc_info,      # Подробности исключений
+        structlog.processors.JSONRenderer(),
+    ]
+
+
+def _render(processors: list, logger, method_name: str, event_dict: dict) -> str:
+    for processor in processors:
+        event_dict = processor(logger, method_name, event_dict)
+    return event_dict
 
-def setup_logging():
-    """Настройка базового логгирования через structlog."""
-    # Настройка стандартного логгера Python
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=logging.INFO,
-    )
 
-    # Список процессоров логирования
-    processors = [
-        structlog.processors.TimeStamper(fmt="iso"),  # Время в ISO формате
+_fallback_processors = _create_renderer("json")
+
+
+def _fallback_render(logger, method_name: str, event_dict: dict) -> str:
+    return _render(_fallback_processors, logger, method_name, event_dict)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Записи stdlib-логгеров (aiogram, taskiq, sqlalchemy) — в ту же очередь."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляем сразу, пока они не изменились; форматирование — в LogWriter
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.labels(reason="queue_full").inc()
+
+
+class LogWriter(threading.Thread):
+    """Поток записи: рендерит события из очереди и пишет их в stdout пачками."""
+
+    def __init__(self, log_queue: queue.Queue, renderer: str) -> None:
+        super().__init__(name="log-writer", daemon=True)
+        self._queue = log_queue
+        self._processors = _create_renderer(renderer)
+        self._formatter = structlog.stdlib.ProcessorFormatter(
+            # Записи stdlib приводятся к тем же полям
+            foreign_pre_chain=[
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.stdlib.add_log_level,
+                structlog.stdlib.add_logger_name,
+            ],
+            processors=[
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                *self._processors,
+            ],
+        )
+        self._stream = sys.stdout
+
+    def _format(self, item) -> str:
+        try:
+            if isinstance(item, logging.LogRecord):
+                return self._formatter.format(item)
+            logger, method_name, event_dict = item
+            return _render(self._processors, logger, method_name, event_dict)
+        except Exception as e:
+            return f"Log rendering failed: {e!r}: {item!r}"
+
+    def run(self) -> None:
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            lines = [] if stop else [self._format(item)]
+            # Дозабираем накопившееся и пишем одним вызовом
+            while not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    lines.append(self._format(item))
+            if lines:
+                self._stream.write("\n".join(lines) + "\n")
+                self._stream.flush()
+            if stop:
+                return
+
+
+log_filter = LogFilter()
+_queue: queue.Queue = queue.Queue()
+_writer: LogWriter | None = None
+
+# В вызывающем потоке — только фильтрация и сбор полей события;
+# рендеринг (JSON/консоль) и запись выполняет поток LogWriter
+structlog.configure(
+    processors=[
+        log_filter,                                    # Уровни и сэмплирование (LOG__*)
+        structlog.processors.TimeStamper(fmt="iso"),   # Время в ISO формате
         # Добавляет уровень (info, error и т.д.)
-        structlog.stdlib.add_log_level,
+        structlog.processors.add_log_level,
         # Добавляет имя логгера ("app", "db" и т.п.)
         structlog.stdlib.add_logger_name,
-        structlog.processors.StackInfoRenderer(),     # Отображение стека при ошибках
-        structlog.processors.format_exc_info,         # Подробности исключений
-        structlog.processors.UnicodeDecoder(),        # Обработка Unicode
-        structlog.dev.ConsoleRenderer() if DEBUG else structlog.processors.JSONRenderer(),
-    ]
+        structlog.processors.StackInfoRenderer(),      # Отображение стека при ошибках
+        _capture_exc_info,
+        _to_queue,
+    ],
+    logger_factory=QueueLogger,
+    wrapper_class=structlog.make_filtering_bound_logger(logging.DEBUG),
+    cache_logger_on_first_use=True,
+)
 
-    # Конфигурация structlog
-    structlog.configure(
-        processors=processors,
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
-        cache_logger_on_first_use=True,
-    )
+
+def setup_logging(log_settings=None) -> None:
+    """
+    Настройка логирования процесса (бот или воркер).
+
+    Логи structlog и stdlib пишутся через очередь: цикл событий только
+    собирает поля события и кладет его в очередь, рендеринг и вывод в
+    stdout выполняет поток LogWriter. Повторный вызов ничего не делает.
+    """
+    global _writer
+    if _writer is not None:
+        return
+
+    if log_settings is None:
+        from bot.core.config import settings
+        log_settings = settings.log
+        debug = settings.debug
+    else:
+        debug = False
+    renderer = log_settings.renderer or ("console" if debug else "json")
+
+    log_filter.default = logging.getLevelName(log_settings.level.upper())
+    log_filter.levels = {
+        name: logging.getLevelName(level.upper())
+        for name, level in log_settings.levels.items()
+    }
+    log_filter.sample = dict(log_settings.sample)
+    _queue.maxsize = log_settings.queue_size
+
+    root = logging.getLogger()
+    # Обработчики basicConfig (например, taskiq worker) заменяем очередью
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_NonBlockingQueueHandler(_queue))
+    root.setLevel(log_filter.default)
+    for name, level in log_filter.levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _writer = LogWriter(_queue, renderer)
+    _writer.start()
+    # Дописываем очередь при выходе из процесса
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Дописать накопленные записи и остановить поток записи."""
+    global _writer
+    if _writer is not None:
+        writer, _writer = _writer, None
+        # Блокирующий put: при полной очереди ждем, пока поток ее разберет
+        _queue.put(_STOP)
+        writer.join()
 
 
 # Метрики Prometheus для ошибок
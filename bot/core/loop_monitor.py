@@ -0,0 +1,109 @@
+import asyncio
+import logging
+
+from bot.core.logging import app_logger
+from bot.core.metrics import (
+    event_loop_lag,
+    event_loop_lag_last,
+    event_loop_slow_callback_duration,
+    event_loop_slow_callbacks_total,
+    event_loop_tasks,
+)
+
+
+class _SlowCallbackFilter(logging.Filter):
+    """
+    Считает отчеты asyncio о медленных колбэках.
+
+    В режиме отладки цикл сам замеряет каждый колбэк и пишет в логгер
+    asyncio "Executing <Handle ...> took 0.250 seconds"; запись
+    пропускается дальше как есть — это и есть отчет с именем колбэка.
+    """
+
+    def __init__(self, process: str) -> None:
+        super().__init__()
+        self._process = process
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if (isinstance(record.msg, str) and record.msg.startswith("Executing")
+                and isinstance(record.args, tuple)):
+            duration = record.args[-1]
+            if isinstance(duration, float):
+                event_loop_slow_callbacks_total.labels(process=self._process).inc()
+                event_loop_slow_callback_duration.labels(
+                    process=self._process).observe(duration)
+        return True
+
+
+class LoopMonitor:
+    """
+    Лаг цикла событий и число задач процесса (бот или воркер).
+
+    Фоновая задача засыпает на interval и замеряет, насколько позже она
+    проснулась: все это время цикл был занят синхронным кодом (расшифровка
+    Fernet, валидация больших ответов, запись логов). Замер дешевый и
+    включен всегда. Имена виновных колбэков дает только режим отладки
+    asyncio (debug=True), он дорог и включается на время разбора.
+    """
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+        self._filter: _SlowCallbackFilter | None = None
+
+    def start(
+        self,
+        process: str,
+        interval: float = 0.5,
+        slow_threshold: float = 0.1,
+        debug: bool = False,
+    ) -> None:
+        """Запустить мониторинг в текущем цикле событий; повторный вызов ничего не делает."""
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        if debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = slow_threshold
+            self._filter = _SlowCallbackFilter(process)
+            logging.getLogger("asyncio").addFilter(self._filter)
+        self._task = loop.create_task(
+            self._run(process, interval, slow_threshold), name="loop-monitor")
+        app_logger.info(
+            f"Event loop monitor started for {process}",
+            interval=interval, slow_threshold=slow_threshold, debug=debug)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        if self._filter is not None:
+            logging.getLogger("asyncio").removeFilter(self._filter)
+            self._filter = None
+
+    @staticmethod
+    async def _run(process: str, interval: float, slow_threshold: float) -> None:
+        loop = asyncio.get_running_loop()
+        lag_histogram = event_loop_lag.labels(process=process)
+        lag_gauge = event_loop_lag_last.labels(process=process)
+        tasks_gauge = event_loop_tasks.labels(process=process)
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(loop.time() - started - interval, 0.0)
+            lag_histogram.observe(lag)
+            lag_gauge.set(lag)
+            tasks = len(asyncio.all_tasks(loop))
+            tasks_gauge.set(tasks)
+            if lag >= slow_threshold:
+                app_logger.warning(
+                    f"Event loop of {process} was blocked for {lag:.3f}s",
+                    lag=round(lag, 3), tasks=tasks)
+
+
+# Один монитор на процесс (бот или воркер)
+loop_monitor = LoopMonitor()
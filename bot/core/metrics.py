@@ -0,0 +1,168 @@
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from bot.core.logging import app_logger
+
+
+# Пул соединений с БД
+db_pool_checkout_wait = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled database connection',
+    ['role'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+db_pool_in_use = Gauge(
+    'db_pool_connections_in_use',
+    'Database connections currently checked out from the pool',
+    ['role'],
+    multiprocess_mode='livesum'
+)
+
+db_pool_overflow_total = Counter(
+    'db_pool_overflow_total',
+    'Connections opened beyond pool_size (overflow)',
+    ['role']
+)
+
+db_pool_timeouts_total = Counter(
+    'db_pool_checkout_timeouts_total',
+    'Pool checkouts that failed with a timeout',
+    ['role']
+)
+
+db_replica_lag = Gauge(
+    'db_replica_lag_seconds',
+    'Replication lag of the read replica at the last freshness check',
+    multiprocess_mode='max'
+)
+
+db_replica_fallback_total = Counter(
+    'db_replica_fallback_total',
+    'Read-only sessions routed to the primary because the replica was stale or unavailable'
+)
+
+# Запросы к БД по методу репозитория (см. bot/database/instrumentation.py)
+db_query_duration = Histogram(
+    'db_query_duration_seconds',
+    'SQL statement execution time by repository method',
+    ['role', 'source', 'operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+db_query_rows_total = Counter(
+    'db_query_rows_total',
+    'Rows returned or affected by SQL statements by repository method',
+    ['role', 'source', 'operation']
+)
+
+db_slow_queries_total = Counter(
+    'db_slow_queries_total',
+    'SQL statements slower than the slow query threshold',
+    ['role', 'source']
+)
+
+# Очереди задач брокера
+task_queue_wait = Histogram(
+    'task_queue_wait_seconds',
+    'Time between publishing a task and handing it to the worker',
+    ['priority'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+
+# Пайплайн уведомлений о заказах: этапы и сквозная задержка (без меток пользователя)
+ORDER_PIPELINE_STAGES = (
+    "fetch", "validate", "upsert", "stats", "photo", "render", "queue_wait", "send",
+)
+
+order_pipeline_stage = Histogram(
+    'order_pipeline_stage_seconds',
+    'Duration of a stage of the order notification pipeline (one pass for a user)',
+    ['stage'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+# От OrdersWB.date до сохранения нового заказа: в основном интервал опроса и задержка WB
+order_detect_latency = Histogram(
+    'order_detect_latency_seconds',
+    'Time from the order timestamp to the order being saved as new',
+    buckets=(30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 43200, 86400)
+)
+
+# От OrdersWB.date до доставки сообщения в Telegram
+order_delivery_latency = Histogram(
+    'order_delivery_latency_seconds',
+    'Time from the order timestamp to the Telegram message being delivered',
+    buckets=(30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 43200, 86400)
+)
+
+# HTTP-клиент внешних API (WB статистика, wbbasket)
+http_client_request_duration = Histogram(
+    'http_client_request_duration_seconds',
+    'Duration of a single outgoing HTTP attempt',
+    ['host', 'endpoint', 'caller', 'status_class'],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+http_client_requests_total = Counter(
+    'http_client_requests_total',
+    'Outgoing HTTP requests by final status and number of retries',
+    ['host', 'endpoint', 'caller', 'status_class', 'retries']
+)
+
+http_client_retries_total = Counter(
+    'http_client_retries_total',
+    'Retried outgoing HTTP attempts',
+    ['host', 'endpoint', 'caller', 'reason']
+)
+
+# Фазы соединения (aiohttp TraceConfig, включается настройкой http_trace)
+http_client_phase_duration = Histogram(
+    'http_client_phase_duration_seconds',
+    'Outgoing HTTP connection phases: dns, connect (TCP + TLS), pool_wait',
+    ['host', 'phase'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+
+# Здоровье цикла событий (см. bot/core/loop_monitor.py)
+event_loop_lag = Histogram(
+    'event_loop_lag_seconds',
+    'Delay of a scheduled wakeup of the event loop beyond the requested time',
+    ['process'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+event_loop_lag_last = Gauge(
+    'event_loop_lag_last_seconds',
+    'Event loop lag at the last check',
+    ['process'],
+    multiprocess_mode='max'
+)
+
+event_loop_tasks = Gauge(
+    'event_loop_tasks',
+    'asyncio tasks not yet finished in the event loop',
+    ['process'],
+    multiprocess_mode='livesum'
+)
+
+event_loop_slow_callbacks_total = Counter(
+    'event_loop_slow_callbacks_total',
+    'Callbacks that blocked the event loop longer than the threshold (asyncio debug mode)',
+    ['process']
+)
+
+event_loop_slow_callback_duration = Histogram(
+    'event_loop_slow_callback_duration_seconds',
+    'Duration of callbacks that blocked the event loop (asyncio debug mode)',
+    ['process'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> None:
+    """Поднимает HTTP-эндпоинт /metrics для процесса (бот)."""
+    try:
+        start_http_server(port=port, addr=addr)
+        app_logger.info(f"Prometheus metrics server started on {addr}:{port}")
+    except OSError as e:
+        app_logger.warning(f"Cannot start metrics server on {addr}:{port}: {e}")
@@ -1,3 +1,4 @@
+from cachetools import TTLCache
 from cryptography.fernet import Fernet
 from bot.core.config import settings
 
@@ -11,3 +12,35 @@ def encrypt_api_key(api_key: str) -> str:
 
 def decrypt_api_key(token: str) -> str:
     return fernet.decrypt(token.encode()).decode()
+
+
+class DecryptedKeyCache:
+    """
+    Ограниченный TTL-кэш расшифрованных API ключей: (key_id, version) -> ключ.
+
+    Смена ключа увеличивает ApiKey.version, поэтому старая запись
+    просто перестает запрашиваться и вытесняется по TTL.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 10 * 60):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key_id: int, version: int, key_encrypted: str) -> str:
+        cache_key = (key_id, version)
+        plain = self._cache.get(cache_key)
+        if plain is None:
+            plain = decrypt_api_key(key_encrypted)
+            self._cache[cache_key] = plain
+        return plain
+
+    def invalidate(self, key_id: int) -> None:
+        """Удалить все версии ключа."""
+        for cache_key in [k for k in self._cache.keys() if k[0] == key_id]:
+            self._cache.pop(cache_key, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+# Один кэш на процесс
+decrypted_keys = DecryptedKeyCache()
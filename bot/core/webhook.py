@@ -0,0 +1,101 @@
+import asyncio
+import re
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from bot.core.config import BotSettings
+from bot.core.logging import app_logger
+
+
+# Ограничения Telegram на secret_token в setWebhook
+_SECRET_RE = re.compile(r"^[A-Za-z0-9_-]{1,256}$")
+
+
+async def healthz(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, path: str, secret: str, **data: Any) -> web.Application:
+    """
+    aiohttp-приложение приема апдейтов.
+
+    Запрос без верного X-Telegram-Bot-Api-Secret-Token получает 401.
+    Апдейт обрабатывается фоновой задачей, Telegram сразу получает
+    ответ 200 и не ждет обработчиков. data передается в feed_update
+    (как аргументы start_polling); startup и shutdown диспетчера
+    вызываются при старте и остановке приложения.
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret,
+        handle_in_background=True,
+        **data,
+    ).register(app, path=path)
+    # Проверка живости реплики для балансировщика
+    app.router.add_get("/healthz", healthz)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def ensure_webhook(bot: Bot, url: str, secret: str, allowed_updates: list[str], max_connections: int) -> None:
+    """
+    Регистрирует вебхук, если он еще не указывает на url.
+
+    Реплики стартуют одновременно; setWebhook вызывает только первая,
+    увидевшая чужой адрес, остальные его не трогают (лимит запросов Bot
+    API). Секрет getWebhookInfo не возвращает: после смены секрета
+    достаточно сменить и путь, или удалить вебхук перед выкаткой.
+    """
+    info = await bot.get_webhook_info()
+    if info.url == url and sorted(info.allowed_updates or []) == sorted(allowed_updates):
+        app_logger.info("Webhook already set", url=url, pending=info.pending_update_count)
+        return
+    await bot.set_webhook(
+        url,
+        secret_token=secret,
+        allowed_updates=allowed_updates,
+        max_connections=max_connections,
+    )
+    app_logger.info("Webhook set", url=url, allowed_updates=allowed_updates)
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, config: BotSettings, **data: Any) -> None:
+    """
+    Прием апдейтов через вебхук вместо поллинга; работает до отмены.
+
+    Вебхук при остановке не удаляется: апдейты принимают другие реплики.
+    Переход обратно на поллинг удаляет его сам (delete_webhook в main).
+    """
+    if not config.webhook_url:
+        raise ValueError("BOT__WEBHOOK_URL is required in webhook mode")
+    if config.webhook_secret is None:
+        raise ValueError("BOT__WEBHOOK_SECRET is required in webhook mode")
+    secret = config.webhook_secret.get_secret_value()
+    if not _SECRET_RE.match(secret):
+        raise ValueError("BOT__WEBHOOK_SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ and -")
+
+    app = create_webhook_app(dp, bot, config.webhook_path, secret, **data)
+    runner = web.AppRunner(app)
+    # Здесь же вызывается startup диспетчера (брокер, команды бота)
+    await runner.setup()
+    try:
+        await ensure_webhook(
+            bot,
+            config.webhook_url.rstrip("/") + config.webhook_path,
+            secret,
+            dp.resolve_used_update_types(),
+            config.webhook_max_connections,
+        )
+        site = web.TCPSite(runner, config.webhook_host, config.webhook_port)
+        await site.start()
+        app_logger.info(
+            "Webhook server started",
+            host=config.webhook_host, port=config.webhook_port, path=config.webhook_path)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
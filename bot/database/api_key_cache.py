@@ -0,0 +1,44 @@
+from bot.schemas.wb import ApiKeyWithTelegramDTO
+
+
+class ActiveApiKeyCache:
+    """
+    Снимок активных API ключей в памяти процесса: {key_id: ApiKeyWithTelegramDTO}.
+
+    Задачи брокера получают только ссылку (api_key_id, version) и
+    разрешают ее через этот снимок. Снимок целиком заменяется запросом
+    всех активных ключей, который cron и так выполняет за тик; ключ,
+    которого в снимке нет или чья версия устарела, дочитывается одной
+    строкой (put). Активность ключа снимок не гарантирует — ее
+    перепроверяет репозиторий.
+    """
+
+    def __init__(self):
+        self._keys: dict[int, ApiKeyWithTelegramDTO] = {}
+
+    def get(self, key_id: int) -> ApiKeyWithTelegramDTO | None:
+        return self._keys.get(key_id)
+
+    def put(self, key: ApiKeyWithTelegramDTO) -> None:
+        self._keys[key.id] = key
+
+    def discard(self, key_id: int) -> None:
+        self._keys.pop(key_id, None)
+
+    def set_all(self, keys: list[ApiKeyWithTelegramDTO]) -> None:
+        """Заменить снимок целиком."""
+        self._keys = {key.id: key for key in keys}
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Убрать ключи пользователя (деактивация, удаление, смена ключа)."""
+        self._keys = {
+            key_id: key for key_id, key in self._keys.items()
+            if key.user_id != user_id
+        }
+
+    def clear(self) -> None:
+        self._keys = {}
+
+
+# Один кэш на процесс (бот или воркер)
+active_api_keys = ActiveApiKeyCache()
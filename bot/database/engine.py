@@ -1,21 +1,100 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import time
+from enum import Enum
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
 from bot.core.config import settings
+from bot.core.metrics import (
+    db_pool_checkout_wait, db_pool_in_use,
+    db_pool_overflow_total, db_pool_timeouts_total,
+)
+from .instrumentation import install_query_timing
 from .models import Base
 
 
-engine = create_async_engine(settings.postgres.async_url, echo=True)
+class ProcessRole(str, Enum):
+    """Роль процесса, от нее зависят параметры пула соединений."""
+    BOT = "bot"
+    WORKER = "worker"
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который отдает в Prometheus ожидание выдачи, занятость и overflow."""
+
+    role: str = ProcessRole.BOT.value
+
+    def _do_get(self):
+        overflow_before = self.overflow()
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            db_pool_timeouts_total.labels(role=self.role).inc()
+            raise
+        finally:
+            db_pool_checkout_wait.labels(role=self.role).observe(
+                time.perf_counter() - start)
+
+        overflow_after = self.overflow()
+        if overflow_after > overflow_before and overflow_after > 0:
+            db_pool_overflow_total.labels(role=self.role).inc()
+        db_pool_in_use.labels(role=self.role).set(self.checkedout())
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        db_pool_in_use.labels(role=self.role).set(self.checkedout())
+
+    def recreate(self):
+        # dispose() пересоздает пул — сохраняем метку роли
+        pool = super().recreate()
+        pool.role = self.role
+        return pool
+
+
+def create_engine(
+    role: ProcessRole = ProcessRole.BOT,
+    replica: bool = False
+) -> AsyncEngine:
+    """Создает движок с параметрами пула для роли процесса из AppSettings."""
+    pool = settings.postgres.pool_for(role.value)
+    url = settings.postgres.replica_async_url if replica else settings.postgres.async_url
+    engine = create_async_engine(
+        url,
+        echo=settings.postgres.echo,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool.pool_size,
+        max_overflow=pool.max_overflow,
+        pool_timeout=pool.pool_timeout,
+        pool_recycle=pool.pool_recycle,
+        pool_pre_ping=pool.pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": pool.prepared_statement_cache_size,
+        },
+    )
+    pool_role = f"{role.value}_replica" if replica else role.value
+    engine.sync_engine.pool.role = pool_role
+    if settings.postgres.query_timing:
+        install_query_timing(
+            engine.sync_engine, pool_role, settings.postgres.slow_query_threshold)
+    return engine
 
 
-async_session_maker = async_sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False)
+def create_session_maker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 
-async def create_db():
+async def create_db(engine: AsyncEngine):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 
-async def drop_db():
+async def drop_db(engine: AsyncEngine):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
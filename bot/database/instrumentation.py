@@ -0,0 +1,105 @@
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from bot.core.logging import db_logger
+from bot.core.metrics import db_query_duration, db_query_rows_total, db_slow_queries_total
+
+
+# Метод репозитория, который сейчас выполняет запрос ("WBRepository.add_orders_bulk").
+# Контекст доходит до курсора: гринлет SQLAlchemy наследует contextvars задачи
+query_source: ContextVar[str] = ContextVar("query_source", default="other")
+
+_START_KEY = "query_start_time"
+_STATEMENT_PREVIEW = 1000
+
+
+def tag_repository_methods(cls: type) -> None:
+    """
+    Оборачивает публичные async-методы класса: на время вызова
+    query_source = "<Класс>.<метод>". Имя класса берется у экземпляра,
+    поэтому унаследованные методы (get_one и т.п.) подписаны наследником.
+    """
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        if getattr(method, "__query_tagged__", False):
+            continue
+        setattr(cls, name, _tagged(name, method))
+
+
+def _tagged(name: str, method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        token = query_source.set(f"{type(self).__name__}.{name}")
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            query_source.reset(token)
+
+    wrapper.__query_tagged__ = True
+    return wrapper
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Значения параметров заменяются их типами: в логах не будет ключей, токенов и ПД."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: только форма первой строки и число строк
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[:1]
+    return keyword[0].upper() if keyword else "UNKNOWN"
+
+
+def install_query_timing(engine: Engine, role: str, slow_threshold: float) -> None:
+    """Вешает на движок метрики времени и строк запросов и лог медленных запросов."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get(_START_KEY)
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+        source = query_source.get()
+        operation = _operation(statement)
+
+        db_query_duration.labels(
+            role=role, source=source, operation=operation).observe(duration)
+        rowcount = getattr(cursor, "rowcount", -1)
+        if rowcount and rowcount > 0:
+            db_query_rows_total.labels(
+                role=role, source=source, operation=operation).inc(rowcount)
+
+        if duration >= slow_threshold:
+            db_slow_queries_total.labels(role=role, source=source).inc()
+            db_logger.warning(
+                "Slow query",
+                source=source,
+                duration=round(duration, 3),
+                rows=rowcount,
+                statement=statement[:_STATEMENT_PREVIEW],
+                params=redact_parameters(parameters),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # Ошибка запроса: убираем незакрытую отметку времени
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_START_KEY):
+            conn.info[_START_KEY].pop()
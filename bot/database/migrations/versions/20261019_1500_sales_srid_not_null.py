@@ -0,0 +1,33 @@
+"""sales srid not null
+
+Revision ID: 5d1a7c3e9b24
+Revises: 2b9c4e8f7a61
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1a7c3e9b24'
+down_revision: Union[str, None] = '2b9c4e8f7a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULL в unique_sale не конфликтуют: такие строки дублировались при
+    # каждой дельта-загрузке, ключ по ним не восстановить
+    op.execute("DELETE FROM wb_sales WHERE srid IS NULL")
+    op.alter_column('wb_sales', 'srid',
+               existing_type=sa.String(length=255),
+               nullable=False)
+
+
+def downgrade() -> None:
+    op.alter_column('wb_sales', 'srid',
+               existing_type=sa.String(length=255),
+               nullable=True)
@@ -1,11 +1,11 @@
 from sqlalchemy import (
     Numeric, String, ForeignKey, Boolean,
-    DateTime, BigInteger, Integer, UniqueConstraint,
+    DateTime, BigInteger, Integer, UniqueConstraint, Date,
 )
 from sqlalchemy.orm import DeclarativeBase
 from decimal import Decimal
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import datetime
+from datetime import date, datetime
 
 
 class Base(DeclarativeBase):
@@ -25,6 +25,9 @@ class User(Base):
     locale: Mapped[str] = mapped_column(String(10), default="ru")
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Последнее обращение к боту (для ускоренного опроса заказов)
+    last_interaction_at: Mapped[datetime] = mapped_column(
+        DateTime(), nullable=True, index=True)
 
     api_keys: Mapped[list["ApiKey"]] = relationship(back_populates="user")
     subscriptions: Mapped[list["Subscription"]
@@ -48,6 +51,9 @@ class ApiKey(Base):
     title: Mapped[str] = mapped_column(String(100), default="API Key")
     key_encrypted: Mapped[str] = mapped_column(String, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Увеличивается при смене ключа — инвалидирует кэши расшифрованных ключей
+    version: Mapped[int] = mapped_column(
+        Integer, default=1, server_default="1", nullable=False)
 
     user: Mapped["User"] = relationship(back_populates="api_keys")
 
@@ -220,7 +226,7 @@ class SalesWB(Base):
     sale_id: Mapped[str] = mapped_column(String(255), nullable=True)
     sticker: Mapped[str] = mapped_column(String(255), nullable=False)
     g_number: Mapped[str] = mapped_column(String(255), nullable=False)
-    srid: Mapped[str] = mapped_column(String(255), nullable=True, index=True)
+    srid: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
     warehouse_type: Mapped[str] = mapped_column(String(255), nullable=True)
 
     __table_args__ = (UniqueConstraint(
@@ -288,6 +294,31 @@ class TaskStatus(Base):
     user: Mapped["User"] = relationship(back_populates="task_statuses")
 
 
+class PreloadChunk(Base):
+    """Чекпоинт первичной загрузки заказов: один день периода."""
+    __tablename__ = 'preload_chunks'
+
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[str] = mapped_column(
+        # pending, loading (взят задачей), done, failed
+        String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error_message: Mapped[str] = mapped_column(
+        String(500), nullable=True)
+
+    __table_args__ = (UniqueConstraint(
+        'user_id', 'day',
+        name='unique_preload_chunk'),)
+
+
 if __name__ == '__main__':
     print(f'{__name__} Запущен самостоятельно')
 else:
@@ -5,6 +5,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from bot.schemas.wb import ApiKeyWithTelegramDTO
 
+from ..api_key_cache import active_api_keys
 from ..models import ApiKey, User
 from .base import SQLAlchemyRepository
 from ...core.logging import db_logger
@@ -38,6 +39,8 @@ class WbApiKeyRepository(SQLAlchemyRepository[ApiKey]):
             key_encrypted=key.key_encrypted,
             is_active=key.is_active,
             telegram_id=key.user.telegram_id if key.user else None,
+            version=key.version,
+            locale=key.user.locale if key.user else "ru",
         )
 
     async def get_by_title(self, user_id: int, title: str) -> ApiKey | None:
@@ -50,10 +53,13 @@ class WbApiKeyRepository(SQLAlchemyRepository[ApiKey]):
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def delete_user_keys(self, user_id: int):
-        """Удалить все ключи пользователя."""
-        stmt = delete(ApiKey).where(ApiKey.user_id == user_id)
-        await self.session.execute(stmt)
+    async def delete_user_keys(self, user_id: int) -> list[int]:
+        """Удалить все ключи пользователя. Возвращает id удаленных ключей."""
+        stmt = delete(ApiKey).where(
+            ApiKey.user_id == user_id).returning(ApiKey.id)
+        result = await self.session.execute(stmt)
+        active_api_keys.invalidate_user(user_id)
+        return list(result.scalars().all())
 
     async def add_key(self, user_id: int, key: str, title: str = "API Key") -> ApiKey:
         """Добавить ключ с шифрованием (если используешь напрямую)."""
@@ -76,7 +82,7 @@ class WbApiKeyRepository(SQLAlchemyRepository[ApiKey]):
         title: str,
         encrypted_key: str,
         is_active: bool,
-    ) -> None:
+    ) -> ApiKey:
         """Upsert (insert or update) an API key.
 
         Args:
@@ -86,7 +92,7 @@ class WbApiKeyRepository(SQLAlchemyRepository[ApiKey]):
             is_active (bool): Whether the API key is active.
 
         Returns:
-            None
+            ApiKey: The saved key (flushed, id and version are set).
         """
         try:
             stmt = select(ApiKey).where(
@@ -97,15 +103,22 @@ class WbApiKeyRepository(SQLAlchemyRepository[ApiKey]):
             existing = result.scalar_one_or_none()
 
             if existing:
+                if existing.key_encrypted != encrypted_key:
+                    existing.version += 1
+                    active_api_keys.invalidate_user(user_id)
                 existing.key_encrypted = encrypted_key
                 existing.is_active = is_active
+                key = existing
             else:
-                self.session.add(ApiKey(
+                key = ApiKey(
                     user_id=user_id,
                     title=title,
                     key_encrypted=encrypted_key,
                     is_active=is_active,
-                ))
+                )
+                self.session.add(key)
+            await self.session.flush()
+            return key
         except SQLAlchemyError as e:
             raise e
 
@@ -126,20 +139,108 @@ class WbApiKeyRepository(SQLAlchemyRepository[ApiKey]):
             db_logger.error(e)
             return []
 
-        return [
-            ApiKeyWithTelegramDTO(
-                id=key.id,
-                user_id=key.user_id,
-                title=key.title,
-                key_encrypted=key.key_encrypted,
-                is_active=key.is_active,
-                telegram_id=key.user.telegram_id,
+        keys = [self._to_dto(key) for key in api_keys]
+        # Полный список активных ключей — заодно обновляем снимок процесса
+        active_api_keys.set_all(keys)
+        return keys
+
+    async def get_active_key(self, key_id: int) -> ApiKeyWithTelegramDTO | None:
+        """Активный ключ активного пользователя по id (одна строка)."""
+        stmt = (
+            select(ApiKey)
+            .join(User)
+            .options(joinedload(ApiKey.user))
+            .where(
+                ApiKey.id == key_id,
+                ApiKey.is_active == True,
+                User.is_active == True
             )
-            for key in api_keys
-        ]
+        )
+        result = await self.session.execute(stmt)
+        key = result.scalar_one_or_none()
+        return self._to_dto(key) if key else None
 
-    async def deactivate_key_by_user_id(self, user_id: int) -> bool:
-        """Деактивировать API ключ пользователя при 401 ошибке."""
+    async def get_with_user(self, key_id: int) -> ApiKeyWithTelegramDTO | None:
+        """Ключ по id вместе с telegram_id и локалью владельца, в любом статусе."""
+        stmt = (
+            select(ApiKey)
+            .join(User)
+            .options(joinedload(ApiKey.user))
+            .where(ApiKey.id == key_id)
+        )
+        result = await self.session.execute(stmt)
+        key = result.scalar_one_or_none()
+        return self._to_dto(key) if key else None
+
+    async def delete_version(self, key_id: int, version: int) -> bool:
+        """Удалить ключ, если он не сменился с версии version."""
+        stmt = delete(ApiKey).where(
+            ApiKey.id == key_id, ApiKey.version == version).returning(ApiKey.user_id)
+        result = await self.session.execute(stmt)
+        user_id = result.scalar_one_or_none()
+        if user_id is None:
+            return False
+        active_api_keys.invalidate_user(user_id)
+        return True
+
+    async def resolve_active_key(
+        self,
+        key_id: int,
+        version: int
+    ) -> ApiKeyWithTelegramDTO | None:
+        """
+        Разрешить ссылку (key_id, version) из задачи брокера в активный ключ.
+
+        Активность и текущая версия каждый раз сверяются с БД по первичному
+        ключу: ключ могли отключить, удалить или сменить в другом процессе
+        (бот, другой воркер), и его снимок об этом не знает. Сам ключ
+        берется из снимка; если его там нет или версия устарела, он
+        дочитывается одной строкой и кладется в снимок. Если ключ с тех
+        пор сменился, возвращается более новая версия; None — ключ
+        деактивирован или удален.
+        """
+        stmt = (
+            select(ApiKey.version)
+            .join(User)
+            .where(
+                ApiKey.id == key_id,
+                ApiKey.is_active == True,
+                User.is_active == True
+            )
+        )
+        result = await self.session.execute(stmt)
+        current = result.scalar_one_or_none()
+        if current is None:
+            active_api_keys.discard(key_id)
+            return None
+
+        key = active_api_keys.get(key_id)
+        if key is None or key.version != current:
+            key = await self.get_active_key(key_id)
+            if key is None:
+                active_api_keys.discard(key_id)
+                return None
+            active_api_keys.put(key)
+        return key
+
+    @staticmethod
+    def _to_dto(key: ApiKey) -> ApiKeyWithTelegramDTO:
+        return ApiKeyWithTelegramDTO(
+            id=key.id,
+            user_id=key.user_id,
+            title=key.title,
+            key_encrypted=key.key_encrypted,
+            is_active=key.is_active,
+            telegram_id=key.user.telegram_id,
+            version=key.version,
+            locale=key.user.locale,
+        )
+
+    async def deactivate_key_by_user_id(self, user_id: int) -> list[int]:
+        """
+        Деактивировать API ключ пользователя при 401 ошибке.
+        Возвращает id деактивированных ключей (пустой список, если их не было).
+        """
         try:
             stmt = select(ApiKey).where(
                 ApiKey.user_id == user_id,
@@ -151,15 +252,16 @@ class WbApiKeyRepository(SQLAlchemyRepository[ApiKey]):
             if not keys:
                 db_logger.warning(
                     f"No active API keys found for user {user_id}")
-                return False
+                return []
 
+            active_api_keys.invalidate_user(user_id)
             # Деактивируем все активные ключи пользователя
             for key in keys:
                 key.is_active = False
                 db_logger.info(
                     f"Deactivated API key {key.id} for user {user_id}")
 
-            return True
+            return [key.id for key in keys]
         except SQLAlchemyError as e:
             db_logger.error(
                 f"Failed to deactivate API key for user {user_id}: {e}")
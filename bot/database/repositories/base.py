@@ -6,6 +6,8 @@ from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import select, insert, update, delete
 from sqlalchemy.exc import IntegrityError, NoResultFound, MultipleResultsFound
 
+from bot.database.instrumentation import tag_repository_methods
+
 T = TypeVar("T", bound="DeclarativeBase")
 
 
@@ -33,6 +35,11 @@ class AbstractRepository(ABC):
 
 
 class SQLAlchemyRepository(AbstractRepository, Generic[T]):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Запросы метода подписываются в метриках именем репозитория и метода
+        tag_repository_methods(cls)
+
     def __init__(self, session: AsyncSession, model: Type[T]):
         self.session = session
         self.model = model
@@ -75,3 +82,6 @@ class SQLAlchemyRepository(AbstractRepository, Generic[T]):
         stmt = select(self.model)
         result = await self.session.execute(stmt)
         return result.scalars().all()
+
+
+tag_repository_methods(SQLAlchemyRepository)
@@ -0,0 +1,161 @@
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Type
+
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.database.models import PreloadChunk
+from .base import SQLAlchemyRepository, T
+from bot.core.logging import db_logger
+
+
+class PreloadProgress(NamedTuple):
+    """Состояние первичной загрузки пользователя."""
+    done: int
+    failed: int
+    total: int
+
+    @property
+    def percent(self) -> int:
+        if not self.total:
+            return 0
+        return int(self.done * 100 / self.total)
+
+    @property
+    def finished(self) -> bool:
+        """Все чанки обработаны (успешно или исчерпали попытки)."""
+        return self.done + self.failed >= self.total
+
+
+class PreloadChunkRepository(SQLAlchemyRepository[PreloadChunk]):
+    def __init__(self, session: AsyncSession, model: Type[T] = PreloadChunk):
+        super().__init__(session, model)
+
+    async def plan(self, user_id: int, days: list[date]) -> None:
+        """
+        Создать недостающие чанки периода и убрать вышедшие из него.
+
+        Уже загруженные дни не трогаем, поэтому повторный запуск
+        продолжает загрузку с места остановки. Исчерпавшие попытки
+        и брошенные (loading) чанки получают новый шанс.
+        """
+        if not days:
+            return
+        await self.session.execute(
+            delete(PreloadChunk).where(
+                PreloadChunk.user_id == user_id,
+                PreloadChunk.day < min(days)
+            )
+        )
+        await self.session.execute(
+            insert(PreloadChunk)
+            .values([
+                {"user_id": user_id, "day": day, "status": "pending"}
+                for day in days
+            ])
+            .on_conflict_do_nothing(index_elements=["user_id", "day"])
+        )
+        await self.session.execute(
+            update(PreloadChunk)
+            .where(
+                PreloadChunk.user_id == user_id,
+                PreloadChunk.status.in_(("failed", "loading"))
+            )
+            .values(status="pending", attempts=0)
+        )
+        db_logger.info(
+            f"Preload planned for user {user_id}", user_id=user_id, days=len(days))
+
+    async def claim_next(self, user_id: int, lease: timedelta) -> PreloadChunk | None:
+        """
+        Взять следующий необработанный чанк (свежие дни первыми).
+
+        Чанк помечается loading; после коммита загрузка дня идет вне
+        транзакции, а повторно доставленная задача той же цепочки этот
+        день не возьмет. Чанк, взятый дольше lease назад, считается
+        брошенным (воркер упал) и достается снова.
+        """
+        now = datetime.now()
+        next_id = (
+            select(PreloadChunk.id)
+            .where(
+                PreloadChunk.user_id == user_id,
+                self._unfinished(now - lease, claimable=True)
+            )
+            .order_by(PreloadChunk.attempts, PreloadChunk.day.desc())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(PreloadChunk)
+            .where(PreloadChunk.id == next_id)
+            .values(status="loading", updated=now)
+            .returning(PreloadChunk)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def _unfinished(stale_before: datetime, claimable: bool):
+        """
+        Условие на незагруженный день: pending или loading.
+
+        claimable=True — loading только брошенный (взят до stale_before),
+        False — только тот, что еще грузится.
+        """
+        loading_age = (PreloadChunk.updated < stale_before if claimable
+                       else PreloadChunk.updated >= stale_before)
+        return or_(
+            PreloadChunk.status == "pending",
+            and_(PreloadChunk.status == "loading", loading_age),
+        )
+
+    async def mark_done(self, chunk_id: int, rows: int) -> None:
+        await self.session.execute(
+            update(PreloadChunk)
+            .where(PreloadChunk.id == chunk_id, PreloadChunk.status == "loading")
+            .values(status="done", rows=rows, error_message=None)
+        )
+
+    async def mark_failed(self, chunk_id: int, error_message: str, max_attempts: int) -> None:
+        """Засчитать неудачную попытку; после max_attempts чанк считается failed."""
+        attempts = PreloadChunk.attempts + 1
+        await self.session.execute(
+            update(PreloadChunk)
+            .where(PreloadChunk.id == chunk_id, PreloadChunk.status == "loading")
+            .values(
+                attempts=attempts,
+                status=case((attempts >= max_attempts, "failed"), else_="pending"),
+                error_message=error_message[:500]
+            )
+        )
+
+    async def users_with_pending_days(self, user_ids: list[int], since: date, lease: timedelta) -> set[int]:
+        """
+        Пользователи из user_ids, у которых не загружен какой-либо день начиная с since.
+
+        Брошенный чанк (loading дольше lease) не в счет: его догрузит цепочка
+        или следующий plan, а уведомления ждать его не должны.
+        """
+        if not user_ids:
+            return set()
+        stmt = select(PreloadChunk.user_id).where(
+            PreloadChunk.user_id.in_(user_ids),
+            PreloadChunk.day >= since,
+            self._unfinished(datetime.now() - lease, claimable=False)
+        ).distinct()
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
+
+    async def get_progress(self, user_id: int) -> PreloadProgress:
+        stmt = select(
+            func.count().filter(PreloadChunk.status == "done"),
+            func.count().filter(PreloadChunk.status == "failed"),
+            func.count()
+        ).where(PreloadChunk.user_id == user_id)
+        result = await self.session.execute(stmt)
+        done, failed, total = result.one()
+        return PreloadProgress(done=done, failed=failed, total=total)
@@ -1,6 +1,6 @@
 from typing import Type, Optional
 from datetime import datetime, timedelta
-from sqlalchemy import delete, select, or_
+from sqlalchemy import delete, select, update, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -63,6 +63,51 @@ class TaskStatusRepository(SQLAlchemyRepository[TaskStatus]):
             )
             raise
 
+    async def get_busy_users(self, user_ids: list[int], task_names: list[str]) -> set[int]:
+        """Пользователи из user_ids, у которых выполняется любая из task_names (один запрос)."""
+        if not user_ids:
+            return set()
+        stmt = select(TaskStatus.user_id).where(
+            TaskStatus.user_id.in_(user_ids),
+            TaskStatus.task_name.in_(task_names),
+            TaskStatus.status == "running"
+        ).distinct()
+
+        try:
+            result = await self.session.execute(stmt)
+            return set(result.scalars().all())
+        except SQLAlchemyError as e:
+            db_logger.error(
+                f"Error checking busy users: {e}",
+                task_names=task_names,
+                error=str(e)
+            )
+            # В случае ошибки считаем, что задачи активны у всех (безопасность)
+            return set(user_ids)
+
+    async def create_tasks_bulk(self, user_ids: list[int], task_name: str) -> None:
+        """Создать записи о запущенной задаче сразу для нескольких пользователей."""
+        if not user_ids:
+            return
+        try:
+            self.session.add_all([
+                TaskStatus(user_id=user_id, task_name=task_name, status="running")
+                for user_id in user_ids
+            ])
+            await self.session.flush()
+            db_logger.info(
+                f"Tasks created: {task_name} for {len(user_ids)} users",
+                task_name=task_name,
+                count=len(user_ids)
+            )
+        except SQLAlchemyError as e:
+            db_logger.error(
+                f"Error creating tasks: {e}",
+                task_name=task_name,
+                error=str(e)
+            )
+            raise
+
     async def get_active_tasks(self, user_id: int, task_names: Optional[list[str]] = None) -> list[TaskStatus]:
         """Получить активные задачи пользователя."""
         stmt = select(TaskStatus).where(
@@ -239,9 +284,10 @@ class TaskStatusRepository(SQLAlchemyRepository[TaskStatus]):
         """Очистить задачи в статусе running, которые работают дольше указанного времени."""
         cutoff_date = datetime.now() - timedelta(hours=hours_old)
 
+        # Долгие задачи продлевают себя через touch_task
         stmt = select(TaskStatus).where(
             TaskStatus.status == "running",
-            TaskStatus.created < cutoff_date
+            TaskStatus.updated < cutoff_date
         )
 
         try:
@@ -302,11 +348,22 @@ class TaskStatusRepository(SQLAlchemyRepository[TaskStatus]):
             task_cleanup_metrics.labels(cleanup_type="hanging_tasks", status="error").inc()
             return 0
 
-    async def get_all_running_tasks(self) -> list[TaskStatus]:
+    async def touch_task(self, user_id: int, task_name: str) -> None:
+        """Отметить, что выполняющаяся задача жива (обновляет updated)."""
+        stmt = update(TaskStatus).where(
+            TaskStatus.user_id == user_id,
+            TaskStatus.task_name == task_name,
+            TaskStatus.status == "running"
+        ).values(updated=datetime.now())
+        await self.session.execute(stmt)
+
+    async def get_all_running_tasks(self, exclude: Optional[list[str]] = None) -> list[TaskStatus]:
         """Получить все задачи в статусе running."""
         stmt = select(TaskStatus).where(
             TaskStatus.status == "running"
         )
+        if exclude:
+            stmt = stmt.where(TaskStatus.task_name.not_in(exclude))
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
@@ -2,7 +2,9 @@ from ..models import User
 from .base import SQLAlchemyRepository
 
 
-from sqlalchemy import select
+from datetime import datetime
+
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from bot.core.logging import db_logger
@@ -74,3 +76,21 @@ class UserRepository(SQLAlchemyRepository[User]):
             db_logger.error("user.block.failed",
                             telegram_id=telegram_id, error=str(e))
             raise
+
+    async def set_interactions(self, interactions: dict[int, datetime]) -> None:
+        """Время последнего обращения к боту пачкой: telegram_id -> время."""
+        if not interactions:
+            return
+        table = User.__table__
+        stmt = update(table).where(
+            table.c.telegram_id == bindparam("tg_id")
+        ).values(last_interaction_at=bindparam("at"))
+        await self.session.execute(stmt, [
+            {"tg_id": telegram_id, "at": at} for telegram_id, at in interactions.items()
+        ])
+
+    async def get_recently_active_ids(self, since: datetime) -> set[int]:
+        """id пользователей, обращавшихся к боту после since."""
+        stmt = select(User.id).where(User.last_interaction_at >= since)
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
@@ -10,10 +10,17 @@ from bot.core.logging import db_logger
 from bot.schemas.wb import NotifOrder, OrderWBCreate, SalesWBCreate, StockWBCreate
 from bot.utils.utils import chunked_list
 from ..models import OrdersWB, StocksWB, SalesWB
+from ..stock_cache import stock_summary_cache
 from ..repositories.base import SQLAlchemyRepository
 from .base import T
 
 
+# Ключ уникальности unique_sale
+SALES_CONFLICT_KEYS = ['date', 'user_id', 'srid', 'nm_id', 'tech_size']
+# ~30 колонок на строку, держимся далеко от лимита в 32767 параметров
+SALES_CHUNK_SIZE = 500
+
+
 class WBRepository(SQLAlchemyRepository[OrdersWB]):
     def __init__(self, session: AsyncSession, model: Type[T]):
         super().__init__(session, model)
@@ -46,19 +53,69 @@ class WBRepository(SQLAlchemyRepository[OrdersWB]):
 
         return [NotifOrder.model_validate(order) for order in new_orders]
 
-    async def add_sales_bulk(self, orders: list[SalesWBCreate]) -> None:
-        """Добавить продажи пачкой"""
-        if not orders:
-            return
+    async def count_orders_by_user(self, since: datetime) -> dict[int, int]:
+        """Число заказов каждого пользователя с даты since (один запрос)."""
+        stmt = (
+            select(OrdersWB.user_id, func.count())
+            .where(OrdersWB.date >= since)
+            .group_by(OrdersWB.user_id)
+        )
+        result = await self.session.execute(stmt)
+        return {user_id: count for user_id, count in result.all()}
 
-        data = [order.model_dump() for order in orders]
+    async def add_sales_bulk(self, sales: list[SalesWBCreate]) -> int:
+        """
+        Upsert продаж пачками.
 
-        stmt = insert(SalesWB).values(data)
-        stmt = stmt.on_conflict_do_nothing(
-            index_elements=['date', 'user_id',
-                            'srid', 'nm_id', 'isCancel', 'tech_size']
-        )
-        await self.session.execute(stmt)
+        Повторно пришедшие строки (дельта по lastChangeDate) обновляются.
+        Возвращает количество обработанных строк.
+        """
+        if not sales:
+            return 0
+
+        # Без srid строку нельзя сопоставить с уже загруженной (NULL в
+        # unique_sale не конфликтует) — такие строки пропускаем
+        without_srid = sum(1 for sale in sales if not sale.srid)
+        if without_srid:
+            db_logger.warning("add_sales_bulk: rows without srid skipped", count=without_srid)
+
+        # В одном INSERT ... ON CONFLICT DO UPDATE ключ не должен повторяться,
+        # поэтому оставляем последнюю версию строки по lastChangeDate
+        unique_sales: dict[tuple, SalesWBCreate] = {}
+        for sale in sales:
+            if not sale.srid:
+                continue
+            key = tuple(getattr(sale, column) for column in SALES_CONFLICT_KEYS)
+            current = unique_sales.get(key)
+            if current is None or sale.last_change_date >= current.last_change_date:
+                unique_sales[key] = sale
+
+        rows = list(unique_sales.values())
+        if not rows:
+            return 0
+        for chunk in chunked_list(rows, SALES_CHUNK_SIZE):
+            data = [sale.model_dump() for sale in chunk]
+
+            stmt = insert(SalesWB).values(data)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=SALES_CONFLICT_KEYS,
+                set_={
+                    column: stmt.excluded[column]
+                    for column in data[0]
+                    if column not in SALES_CONFLICT_KEYS
+                }
+            )
+            await self.session.execute(stmt)
+
+        db_logger.info("add_sales_bulk", count=len(rows))
+        return len(rows)
+
+    async def get_sales_cursor(self, user_id: int) -> Optional[datetime]:
+        """Последняя загруженная дата изменения продаж пользователя."""
+        stmt = select(func.max(SalesWB.last_change_date)).where(
+            SalesWB.user_id == user_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
 
     async def add_stocks_bulk(self, stocks: list[StockWBCreate]) -> None:
         if not stocks:
@@ -297,67 +354,100 @@ class WBRepository(SQLAlchemyRepository[OrdersWB]):
             db_logger.error(f"Error in get_totals_combined: {e}")
             return 0, 0
 
-    async def stock_stats(self, user_id: int, nm_id: str) -> Optional[str]:
+    async def stock_stats(self, user_id: int, nm_id: int) -> Optional[str]:
+        """
+        Сводка остатков по артикулу (nmId) для уведомления.
+
+        Читается из кэша процесса; при промахе одним запросом загружается
+        снимок остатков пользователя по всем артикулам.
+        """
+        summary = stock_summary_cache.get(user_id, nm_id)
+        if summary is not None:
+            return summary
+
+        summaries = await self.refresh_stock_summaries(user_id)
+        if summaries is None:
+            return None
+        return stock_summary_cache.get(user_id, nm_id)
+
+    async def refresh_stock_summaries(self, user_id: int) -> Optional[dict[int, str]]:
         """
-        Получает количество единиц товара на каждом складе по артикулу товара (nmId) 
-        с группировкой по складу и дате изменения.
+        Пересчитывает сводки остатков пользователя по всем артикулам
+        одним GROUP BY запросом и кладет снимок в кэш.
         """
         try:
-            # Используем запрос с группировкой по складу и дате, как в SQL
             stmt = (
                 select(
+                    StocksWB.nm_id,
                     StocksWB.warehouse_name,
                     func.sum(StocksWB.quantity).label("total_quantity"),
                     StocksWB.last_change_date
                 )
                 .where(
                     StocksWB.user_id == user_id,
-                    StocksWB.nm_id == nm_id,
                     StocksWB.quantity.is_not(None)
                 )
-                .group_by(StocksWB.warehouse_name, StocksWB.last_change_date)
+                .group_by(
+                    StocksWB.nm_id,
+                    StocksWB.warehouse_name,
+                    StocksWB.last_change_date
+                )
                 .having(func.sum(StocksWB.quantity) > 0)
             )
-            
+
             results = await self.session.execute(stmt)
-            stock_data = results.fetchall()
 
-            if not stock_data:
-                return f"Остаток для {nm_id}: 0"
+            rows_by_nm_id = defaultdict(list)
+            for nm_id, warehouse, quantity, change_date in results.fetchall():
+                rows_by_nm_id[nm_id].append((warehouse, quantity, change_date))
+
+            summaries = {
+                nm_id: self._format_stock_summary(nm_id, rows)
+                for nm_id, rows in rows_by_nm_id.items()
+            }
+            stock_summary_cache.set_user(user_id, summaries)
+            db_logger.debug("refresh_stock_summaries",
+                            user_id=user_id, count=len(summaries))
+            return summaries
 
-            # Группируем по складам и находим последнюю дату для каждого склада
-            warehouse_data = defaultdict(list)
-            for warehouse, quantity, change_date in stock_data:
-                warehouse_data[warehouse].append((quantity, change_date))
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            db_logger.error(f"Error in refresh_stock_summaries: {e}")
+            return None
 
-            # Для каждого склада берем данные с последней датой
-            warehouse_totals = {}
-            latest_dates = {}
-            
-            for warehouse, data_list in warehouse_data.items():
-                # Находим последнюю дату для этого склада
-                latest_entry = max(data_list, key=lambda x: x[1])
-                warehouse_totals[warehouse] = latest_entry[0]
-                latest_dates[warehouse] = latest_entry[1]
+    @staticmethod
+    def _format_stock_summary(nm_id: int, stock_data: list[tuple]) -> str:
+        """Формирует текст остатков по строкам (склад, количество, дата изменения)."""
+        if not stock_data:
+            return f"Остаток для {nm_id}: 0"
 
-            # Получаем общее количество
-            total_quantity = sum(warehouse_totals.values())
+        # Группируем по складам и находим последнюю дату для каждого склада
+        warehouse_data = defaultdict(list)
+        for warehouse, quantity, change_date in stock_data:
+            warehouse_data[warehouse].append((quantity, change_date))
 
-            if total_quantity == 0:
-                return f"Остаток для {nm_id}: 0"
+        # Для каждого склада берем данные с последней датой
+        warehouse_totals = {}
+        latest_dates = {}
 
-            # Находим самую позднюю дату среди всех складов
-            overall_latest_date = max(latest_dates.values())
+        for warehouse, data_list in warehouse_data.items():
+            latest_entry = max(data_list, key=lambda x: x[1])
+            warehouse_totals[warehouse] = latest_entry[0]
+            latest_dates[warehouse] = latest_entry[1]
 
-            # Формируем текст
-            output = f'Дата обновления: {overall_latest_date.strftime("%Y-%m-%d")}\n'
-            for warehouse, quantity in warehouse_totals.items():
-                output += f"📦 {warehouse} – {quantity} шт.\n"
+        # Получаем общее количество
+        total_quantity = sum(warehouse_totals.values())
 
-            output += f'\n📦 Всего: {total_quantity} шт.'
-            return output
+        if total_quantity == 0:
+            return f"Остаток для {nm_id}: 0"
 
-        except SQLAlchemyError as e:
-            await self.session.rollback()
-            db_logger.error(f"Error in stock_stats: {e}")
-            return None
+        # Находим самую позднюю дату среди всех складов
+        overall_latest_date = max(latest_dates.values())
+
+        # Формируем текст
+        output = f'Дата обновления: {overall_latest_date.strftime("%Y-%m-%d")}\n'
+        for warehouse, quantity in warehouse_totals.items():
+            output += f"📦 {warehouse} – {quantity} шт.\n"
+
+        output += f'\n📦 Всего: {total_quantity} шт.'
+        return output
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from bot.core.logging import db_logger
+from bot.core.metrics import db_replica_fallback_total, db_replica_lag
+
+
+# Отставание реплики в секундах. 0 — реплика получает WAL (процесс
+# walreceiver есть в pg_stat_wal_receiver) и применила все полученное:
+# иначе на простаивающем primary отставание бесконечно растет. Без
+# walreceiver (разрыв репликации) совпадение позиций ничего не значит,
+# отставание — возраст последней примененной транзакции; NULL —
+# неизвестно (ни одной транзакции еще не применено)
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver)
+             AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReadReplicaRouter:
+    """
+    Выбирает session_maker для read-only работы.
+
+    Реплика используется, пока ее отставание не превышает max_lag.
+    Отставание перепроверяется не чаще раза в check_interval секунд;
+    если реплика недоступна или отстала — чтение уходит на primary.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replica: async_sessionmaker[AsyncSession] | None = None,
+        max_lag: float = 5.0,
+        check_interval: float = 5.0,
+    ) -> None:
+        self._primary = primary
+        self._replica = replica
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+
+        self._replica_fresh = False
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def has_replica(self) -> bool:
+        return self._replica is not None
+
+    async def read_session_maker(self) -> async_sessionmaker[AsyncSession]:
+        if self._replica is None:
+            return self._primary
+
+        if time.monotonic() - self._checked_at > self._check_interval:
+            async with self._lock:
+                # Пока ждали блокировку, проверку мог выполнить другой вызов
+                if time.monotonic() - self._checked_at > self._check_interval:
+                    self._replica_fresh = await self._check_replica()
+                    self._checked_at = time.monotonic()
+
+        if self._replica_fresh:
+            return self._replica
+
+        db_replica_fallback_total.inc()
+        return self._primary
+
+    async def _check_replica(self) -> bool:
+        try:
+            async with self._replica() as session:
+                result = await session.execute(REPLICA_LAG_QUERY)
+                lag = result.scalar_one()
+        except Exception as e:
+            db_logger.warning(f"Read replica is unavailable, using primary: {e}")
+            return False
+
+        if lag is None:
+            db_logger.warning("Read replica lag is unknown, using primary")
+            return False
+        lag = float(lag)
+
+        db_replica_lag.set(lag)
+        if lag > self._max_lag:
+            db_logger.warning(
+                "Read replica is stale, using primary", lag=lag, max_lag=self._max_lag)
+            return False
+        return True
@@ -0,0 +1,45 @@
+from cachetools import TTLCache
+
+from bot.core.config import settings
+
+
+class StockSummaryCache:
+    """
+    Кэш готовых сводок по остаткам в памяти процесса.
+
+    Сводки хранятся снимком на пользователя: {user_id: {nm_id: text}}.
+    Снимок целиком заменяется после коммита каждой загрузки остатков,
+    поэтому отсутствие nm_id в загруженном снимке означает нулевой остаток.
+    TTL равен интервалу загрузки остатков: снимок, прочитанный процессом,
+    который сам остатки не грузил, не переживает следующую загрузку
+    больше чем на интервал.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: int | None = None):
+        if ttl is None:
+            ttl = settings.scheduler.stocks_interval * 60
+        self._snapshots: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def has_user(self, user_id: int) -> bool:
+        return user_id in self._snapshots
+
+    def get(self, user_id: int, nm_id: int) -> str | None:
+        """Сводка по (user_id, nm_id) или None, если снимка пользователя нет."""
+        snapshot = self._snapshots.get(user_id)
+        if snapshot is None:
+            return None
+        return snapshot.get(nm_id, f"Остаток для {nm_id}: 0")
+
+    def set_user(self, user_id: int, summaries: dict[int, str]) -> None:
+        """Заменить снимок пользователя целиком."""
+        self._snapshots[user_id] = summaries
+
+    def invalidate(self, user_id: int) -> None:
+        self._snapshots.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+
+
+# Один кэш на процесс (бот или воркер)
+stock_summary_cache = StockSummaryCache()
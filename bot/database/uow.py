@@ -1,3 +1,6 @@
+from functools import cached_property
+from typing import Callable
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .repositories.wb_repo import WBRepository
@@ -7,6 +10,7 @@ from .repositories.subscription import SubscriptionRepository
 from .repositories.api_key import WbApiKeyRepository
 from .repositories.employee import EmployeeRepository
 from .repositories.task_status import TaskStatusRepository
+from .repositories.preload import PreloadChunkRepository
 from .models import (
     EmployeeInvite, OrdersWB, Payment, Employee,
     SalesWB, StocksWB, TaskStatus
@@ -15,39 +19,99 @@ from bot.core.logging import db_logger
 
 
 class UnitOfWork:
-    def __init__(self, session: AsyncSession):
-        self.session = session
+    """
+    Unit of Work с ленивой инициализацией.
+
+    Сессия создается при первом обращении к репозиторию (или к session),
+    репозитории — при первом обращении к атрибуту. Если обработчику
+    база не понадобилась, сессия не создается и соединение из пула не берется.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession]):
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
         self._closed = False
-        self.users = UserRepository(session)
-        self.api_keys = WbApiKeyRepository(session)
-        self.subscriptions = SubscriptionRepository(session)
-        self.wb_orders = WBRepository(session, OrdersWB)
-        self.wb_sales = WBRepository(session, SalesWB)
-        self.wb_stocks = WBRepository(session, StocksWB)
-        self.employee = EmployeeRepository(session, Employee)
-        self.employee_invites = EmployeeRepository(session, EmployeeInvite)
-        self.task_status = TaskStatusRepository(session, TaskStatus)
-
-        self.payments = SQLAlchemyRepository[Payment](session, Payment)
+        # Сервисы, привязанные к этому UoW (заполняет DependencyContainer)
+        self.services: dict[type, object] = {}
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            if self._closed:
+                raise RuntimeError("UnitOfWork is already closed")
+            self._session = self._session_factory()
+        return self._session
+
+    @property
+    def is_started(self) -> bool:
+        """Была ли уже создана сессия."""
+        return self._session is not None
+
+    @cached_property
+    def users(self) -> UserRepository:
+        return UserRepository(self.session)
+
+    @cached_property
+    def api_keys(self) -> WbApiKeyRepository:
+        return WbApiKeyRepository(self.session)
+
+    @cached_property
+    def subscriptions(self) -> SubscriptionRepository:
+        return SubscriptionRepository(self.session)
+
+    @cached_property
+    def wb_orders(self) -> WBRepository:
+        return WBRepository(self.session, OrdersWB)
+
+    @cached_property
+    def wb_sales(self) -> WBRepository:
+        return WBRepository(self.session, SalesWB)
+
+    @cached_property
+    def wb_stocks(self) -> WBRepository:
+        return WBRepository(self.session, StocksWB)
+
+    @cached_property
+    def employee(self) -> EmployeeRepository:
+        return EmployeeRepository(self.session, Employee)
+
+    @cached_property
+    def employee_invites(self) -> EmployeeRepository:
+        return EmployeeRepository(self.session, EmployeeInvite)
+
+    @cached_property
+    def task_status(self) -> TaskStatusRepository:
+        return TaskStatusRepository(self.session, TaskStatus)
+
+    @cached_property
+    def preload_chunks(self) -> PreloadChunkRepository:
+        return PreloadChunkRepository(self.session)
+
+    @cached_property
+    def payments(self) -> SQLAlchemyRepository[Payment]:
+        return SQLAlchemyRepository[Payment](self.session, Payment)
 
     async def commit(self):
         """Коммит транзакции."""
-        if not self._closed and self.session.is_active:
-            await self.session.commit()
+        if self._session is not None and not self._closed and self._session.is_active:
+            await self._session.commit()
             db_logger.debug("Transaction committed")
 
     async def rollback(self):
         """Откат транзакции."""
-        if not self._closed and self.session.is_active:
-            await self.session.rollback()
+        if self._session is not None and not self._closed and self._session.is_active:
+            await self._session.rollback()
             db_logger.debug("Transaction rolled back")
 
     async def close(self):
         """Закрытие сессии."""
         if not self._closed:
-            await self.session.close()
+            if self._session is not None:
+                await self._session.close()
+                db_logger.debug("Session closed")
             self._closed = True
-            db_logger.debug("Session closed")
+            # Разрываем ссылки uow <-> сервисы, чтобы не ждать сборщик циклов
+            self.services.clear()
 
     async def __aenter__(self):
         """Вход в контекстный менеджер."""
@@ -72,6 +136,20 @@ class UnitOfWork:
         finally:
             await self.close()
 
+
+class ReadOnlyUnitOfWork(UnitOfWork):
+    """
+    UoW для чтения (может работать через реплику).
+
+    Ничего не коммитит: транзакция завершается при закрытии сессии,
+    поэтому случайная запись через такой UoW не будет сохранена.
+    Объекты не экспайрятся и остаются доступны после выхода из контекста.
+    """
+
+    async def commit(self):
+        db_logger.debug("Read-only UoW: commit skipped")
+
+
 if __name__ == '__main__':
     print(f'{__name__} Запущен самостоятельно')
 else:
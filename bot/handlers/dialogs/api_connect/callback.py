@@ -8,7 +8,7 @@ from bot.database.uow import UnitOfWork
 from bot.core.dependency.container import DependencyContainer
 from bot.core.logging import app_logger
 from bot.handlers.states import ApiPanel
-from broker import load_info
+from broker import check_api_key
 
 
 async def api_key_input(
@@ -25,43 +25,31 @@ async def api_key_input(
 
     try:
         async with await container.create_uow() as uow:
-            subscription_service = container.get_subscription_service(uow)
             api_key_service = container.get_api_key_service(uow)
             if not await api_key_service.validate_wb_api_key(raw_key):
                 await message.answer(i18n.get("api-key-invalid"))
                 return
 
-            if not await api_key_service.check_request_to_wb(raw_key):
-                await message.answer(i18n.get("api-key-invalid-request"))
-                return
-
-            status = await api_key_service.set_api_key_with_subscription_check(
+            key = await api_key_service.save_pending_key(
                 telegram_id=user.id,
                 title="wb_stats",
                 raw_key=raw_key,
-                subscription_service=subscription_service,
             )
+            key_id, key_version = key.id, key.version
+            # Задача должна увидеть ключ; UoW не пробрасывает ошибку коммита
+            await uow.commit()
 
-        if status == "active":
-            await message.answer(i18n.get("api-key-success"))
-            await dialog_manager.switch_to(ApiPanel.start)
-            app_logger.info("API Key saved successfully", user_id=user.id)
-        elif status == "trial_activated":
-            await message.answer(i18n.get("subscribe-trial-activeated"))
-            await dialog_manager.switch_to(ApiPanel.start)
-            app_logger.info("Trial activated", user_id=user.id)
-        else:
-            await message.answer(
-                i18n.get("subscribe-to-activate-key")
-            )
-            await dialog_manager.switch_to(ApiPanel.start)
-
-        await message.answer(i18n.get("api-key-pre-load"))
-        await load_info.kiq(telegram_id=user.id)
+        # Проверка в WB и активация — в воркере (check_api_key): запрос к WB
+        # может идти дольше блокировки чата, результат придет сообщением
+        await check_api_key.kiq(key_id, key_version)
+        await message.answer(i18n.get("api-key-checking"))
+        # Ключ неактивен до проверки: в меню снова доступен ввод ключа
+        await dialog_manager.switch_to(ApiPanel.start)
+        app_logger.info("API Key saved for check", user_id=user.id, key_id=key_id)
     except Exception as e:
         app_logger.exception("API Key save failed",
                              error=str(e), user_id=user.id)
-        await message.answer('Непредвиденная ошибка')
+        await message.answer(i18n.get('unexpected-error'))
     finally:
         await message.delete()
 
@@ -84,4 +72,4 @@ async def delete_api_key(
     except Exception as e:
         app_logger.exception("API Key delete failed",
                              error=str(e), user_id=user.id)
-        await message.answer('Непредвиденная ошибка')
+        await message.answer(i18n.get('unexpected-error'))
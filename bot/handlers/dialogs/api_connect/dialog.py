@@ -16,6 +16,7 @@ from .callback import api_key_input, delete_api_key
 api_connect = Dialog(
     Window(
         Format('{api_key_text}'),
+        Format('{preload_progress}', when='preload_running'),
         Group(
             Column(
                 Next(
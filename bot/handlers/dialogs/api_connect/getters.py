@@ -19,8 +19,22 @@ async def api_start(
     has_key = key is not None
     status = "delete" if has_key else "set"
 
+    # Прогресс первичной загрузки заказов по чекпоинтам
+    preload_progress = ''
+    if has_key:
+        progress = await container.get_wb_service(uow).get_preload_progress(key.user_id)
+        if progress.total and not progress.finished:
+            preload_progress = i18n.get(
+                'api-key-preload-progress',
+                percent=progress.percent,
+                done=progress.done,
+                total=progress.total
+            )
+
     return {
         'api_key_text': i18n.get('api-key-text', has_key=str(has_key).lower()),
+        'preload_progress': preload_progress,
+        'preload_running': bool(preload_progress),
         'api_key_btn': i18n.get('api-key-btn', status=status),
         'back': i18n.get('back-btn'),
         'active': not has_key,
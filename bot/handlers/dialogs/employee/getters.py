@@ -11,11 +11,12 @@ async def employee_start(
     i18n: TranslatorRunner,
     event_from_user: User,
     container: DependencyContainer,
-    uow: UnitOfWork,
     **kwargs
 ) -> dict:
-    user_service = container.get_user_service(uow)
-    employees = await user_service.get_active_employees(event_from_user.id)
+    # Только чтение — можно через реплику
+    async with await container.create_read_uow() as uow:
+        user_service = container.get_user_service(uow)
+        employees = await user_service.get_active_employees(event_from_user.id)
     count_employees = len(employees)
 
     return {
@@ -36,6 +37,7 @@ async def employee_delete(
     uow: UnitOfWork,
     **kwargs
 ):
+    # Перерисовывается в том же апдейте, что и удаление, — читаем с primary
     user_service = container.get_user_service(uow)
     employees = await user_service.get_active_employees(event_from_user.id)
     employee_choices = [(emp.username, emp.id) for emp in employees]
@@ -1,7 +1,7 @@
 from aiogram.types import User
 from aiogram_dialog import DialogManager
 from fluentogram import TranslatorRunner
-from bot.database.uow import UnitOfWork
+from bot.core.dependency.container import DependencyContainer
 
 
 async def is_admin(dialog_manager: DialogManager, event_from_user: User, **kwargs):
@@ -14,10 +14,16 @@ async def lk_start(
     dialog_manager: DialogManager,
     i18n: TranslatorRunner,
     event_from_user: User,
+    container: DependencyContainer,
     **kwargs
 ) -> dict:
-    uow: UnitOfWork = dialog_manager.middleware_data.get('uow')
-    user: User = await uow.users.get_by_tg_id(event_from_user.id)
+    # Только чтение — через реплику; id пользователя не меняется, но только
+    # что созданного в /start пользователя отстающая реплика еще не видит
+    async with await container.create_read_uow() as uow:
+        user: User = await uow.users.get_by_tg_id(event_from_user.id)
+    if user is None:
+        async with await container.create_uow() as uow:
+            user = await uow.users.get_by_tg_id(event_from_user.id)
     return {
         'lk_start': i18n.get('lk-start', id=user.id),
         'lk_settings': i18n.get('lk-settings-btn'),
@@ -77,11 +77,14 @@ api-key-input = Введите API-ключ "статистика":
 api-key-deleted = API-ключ удален
 
 api-key-invalid = Неверный формат API-ключа.
-api-key-invalid-request = API-ключ не прошёл проверку — он не работает.
+api-key-checking = Проверяем API-ключ, ответ придет следующим сообщением.
+unexpected-error = Непредвиденная ошибка
+api-key-invalid-request = API-ключ не прошёл проверку — он не работает. Введите другой ключ в меню API-подключения.
 api-key-success = API-ключ успешно сохранён и активирован! Вы будете получать уведомления.
 api-key-trial-expired = Пробный период уже использован. Требуется подписка.
 api-key-pre-load = Загружаем историю заказов. Это займет некоторое время.
-    После загрузки начнут приходить уведомления о заказах.
+    Уведомления о новых заказах начнут приходить через несколько минут.
+api-key-preload-progress = ⏳ История заказов загружена на {$percent}% ({$done} из {$total} дн.)
 
 api-key-deactivated = ⚠️ <b>Внимание!</b>
     Ваш API ключ от Wildberries стал неактивным и был отключен.
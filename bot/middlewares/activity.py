@@ -0,0 +1,41 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+from cachetools import TTLCache
+
+from bot.core.activity import ActivityBuffer
+from bot.core.logging import app_logger
+
+
+class UserActivityMiddleware(BaseMiddleware):
+    """
+    Отмечает обращение пользователя к боту (users.last_interaction_at).
+
+    Планировщик после обращения опрашивает заказы пользователя чаще.
+    Отметка пишется в буфер Redis не чаще раза в throttle секунд на
+    пользователя и не трогает БД: ленивый UoW не открывает сессию ради
+    нее. В users ее переносит воркер (flush_user_activity).
+    """
+
+    def __init__(self, buffer: ActivityBuffer, throttle: int = 60, maxsize: int = 100_000):
+        self._buffer = buffer
+        self._seen: TTLCache = TTLCache(maxsize=maxsize, ttl=throttle)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any]
+    ) -> Any:
+        user: User | None = data.get('event_from_user')
+
+        if user is not None and user.id not in self._seen:
+            self._seen[user.id] = True
+            try:
+                await self._buffer.touch(user.id)
+            except Exception as e:
+                # Отметка активности не должна мешать обработке апдейта
+                app_logger.warning("Failed to record user activity", user_id=user.id, error=str(e))
+
+        return await handler(event, data)
@@ -18,16 +18,16 @@ class UnitOfWorkMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: dict[str, Any]
     ) -> Any:
-        async with self.session_pool() as session:
-            uow = UnitOfWork(session)
-            try:
-                data["uow"] = uow
-                result = await handler(event, data)
-                await uow.commit()
-                return result
-            except Exception as e:
-                await uow.rollback()
-                db_logger.error(f"UnitOfWorkMiddleware: {e}")
-                raise
-            finally:
-                await uow.close()
+        # Сессия откроется только при первом обращении обработчика к UoW
+        uow = UnitOfWork(self.session_pool)
+        try:
+            data["uow"] = uow
+            result = await handler(event, data)
+            await uow.commit()
+            return result
+        except Exception as e:
+            await uow.rollback()
+            db_logger.error(f"UnitOfWorkMiddleware: {e}")
+            raise
+        finally:
+            await uow.close()
@@ -56,6 +56,7 @@ class NotifOrder(OrderWBCreate):
     stocks: str | None = None
 
 class SalesWBCreate(BaseModel):
+    user_id: int
     date: datetime
     last_change_date: datetime = Field(..., alias="lastChangeDate")
     warehouse_name: str = Field(..., alias="warehouseName")
@@ -83,7 +84,6 @@ class SalesWBCreate(BaseModel):
     sale_id: str = Field(..., alias="saleID")
     sticker: str
     g_number: str = Field(..., alias="gNumber")
-    is_cancel: bool = Field(..., alias="isCancel")
     srid: Optional[str] = None
     warehouse_type: Optional[str] = Field(None, alias="warehouseType")
 
@@ -125,3 +125,5 @@ class ApiKeyWithTelegramDTO(BaseModel):
     key_encrypted: str
     is_active: bool
     telegram_id: int
+    version: int = 1
+    locale: str = "ru"
@@ -1,7 +1,12 @@
 from cryptography.fernet import Fernet, InvalidToken
 
+from bot.api.registry import wb_clients
 from bot.api.wb import WBAPIClient
 from bot.database.models import ApiKey
+from bot.database.repositories.api_key import WbApiKeyRepository
+from bot.database.repositories.employee import EmployeeRepository
+from bot.database.repositories.task_status import TaskStatusRepository
+from bot.database.repositories.user import UserRepository
 from bot.database.uow import UnitOfWork
 from bot.schemas.wb import ApiKeyWithTelegramDTO
 from bot.services.subscription import SubscriptionService
@@ -15,12 +20,25 @@ class ApiKeyDecryptionError(Exception):
 class ApiKeyService:
     def __init__(self, uow: UnitOfWork, fernet: Fernet):
         self.uow = uow
-        self.api_key = uow.api_keys
-        self.users = uow.users
-        self.employee = uow.employee
-        self.task_status = uow.task_status
         self.fernet = fernet
 
+    # Репозитории берутся из UoW при обращении: создание сервиса не открывает сессию
+    @property
+    def api_key(self) -> WbApiKeyRepository:
+        return self.uow.api_keys
+
+    @property
+    def users(self) -> UserRepository:
+        return self.uow.users
+
+    @property
+    def employee(self) -> EmployeeRepository:
+        return self.uow.employee
+
+    @property
+    def task_status(self) -> TaskStatusRepository:
+        return self.uow.task_status
+
     async def get_user_key(self, telegram_id: int) -> ApiKeyWithTelegramDTO:
         user = await self.users.get_by_tg_id(telegram_id)
         if not user:
@@ -54,6 +72,14 @@ class ApiKeyService:
 
         return keys
 
+    async def resolve_key(self, key_id: int, version: int) -> ApiKeyWithTelegramDTO | None:
+        """Активный ключ по ссылке из задачи брокера или None, если ключ отключен."""
+        key = await self.api_key.resolve_active_key(key_id, version)
+        if key is None:
+            app_logger.info("API key is no longer active",
+                            key_id=key_id, version=version)
+        return key
+
     async def add_encrypt_key(self, telegram_id: int, raw_key: str, title: str = "API Key") -> ApiKey:
         user = await self.users.get_by_tg_id(telegram_id)
         if not user:
@@ -85,7 +111,8 @@ class ApiKeyService:
         user = await self.users.get_by_tg_id(telegram_id)
         if not user:
             raise ValueError("User not found")
-        await self.api_key.delete_user_keys(user.id)
+        deleted_ids = await self.api_key.delete_user_keys(user.id)
+        wb_clients.invalidate(user.id, deleted_ids)
         # Подумать над правильным удалением сотрудников
         await self.employee.delete_all_employees(user.id)
         await self.task_status.delete_all_tasks(user.id)
@@ -106,37 +133,62 @@ class ApiKeyService:
             # Логировать можно здесь, если хочешь
             return False
 
-    async def set_api_key_with_subscription_check(
-        self,
-        telegram_id: int,
-        title: str,
-        raw_key: str,
-        subscription_service: SubscriptionService,
-    ) -> tuple[bool, str]:
+    async def save_pending_key(self, telegram_id: int, title: str, raw_key: str) -> ApiKey:
         """
-        Сохраняет ключ API с учётом подписки.
-        Возвращает:
-        - is_active: bool — активен ли ключ.
-        - status: str — один из: "active", "trial_activated", "inactive".
+        Сохранить ключ неактивным до проверки в WB.
+
+        Проверку и активацию выполняет задача check_api_key в воркере
+        по (id, version) сохраненного ключа.
         """
         user = await self.users.get_by_tg_id(telegram_id)
         if not user:
             raise ValueError("User not found")
+        encrypted = self.fernet.encrypt(raw_key.encode()).decode()
+        return await self.api_key.upsert_key(user.id, title, encrypted, is_active=False)
+
+    async def get_pending_key(self, key_id: int, version: int) -> ApiKeyWithTelegramDTO | None:
+        """Сохраненный ключ для проверки или None, если его с тех пор сменили или удалили."""
+        key = await self.api_key.get_with_user(key_id)
+        if key is None or key.version != version:
+            return None
+        return key
+
+    async def activate_checked_key(
+        self,
+        key_id: int,
+        version: int,
+        subscription_service: SubscriptionService,
+    ) -> str | None:
+        """
+        Активирует проверенный ключ с учётом подписки.
+        Возвращает:
+        - status: str — один из: "active", "trial_activated", "inactive";
+        - None — ключ сменили или удалили, пока шла проверка.
+        """
+        key = await self.api_key.get_one(key_id)
+        if key is None or key.version != version:
+            return None
         # Проверка на активную подписку
-        if await subscription_service.has_active_subscription(user.id):
-            await self.set_key(user.id, title, raw_key, is_active=True)
+        if await subscription_service.has_active_subscription(key.user_id):
+            key.is_active = True
             return "active"
 
         # Можно ли дать пробную подписку?
-        if await subscription_service.check_trial(user.id):
-            await subscription_service.create_subscription(user.id, plan="trial")
-            await self.set_key(user.id, title, raw_key, is_active=True)
+        if await subscription_service.check_trial(key.user_id):
+            await subscription_service.create_subscription(key.user_id, plan="trial")
+            key.is_active = True
             return "trial_activated"
 
-        # Иначе сохраняем неактивный ключ
-        await self.set_key(user.id, title, raw_key, is_active=False)
+        # Иначе ключ остается неактивным
         return "inactive"
 
+    async def discard_unchecked_key(self, user_id: int, key_id: int, version: int) -> bool:
+        """Удалить ключ, не прошедший проверку в WB (если его не сменили)."""
+        if not await self.api_key.delete_version(key_id, version):
+            return False
+        wb_clients.invalidate(user_id, [key_id])
+        return True
+
     async def handle_unauthorized_key(self, user_id: int) -> bool:
         """
         Обрабатывает случай неактивного API ключа (401 ошибка).
@@ -151,6 +203,8 @@ class ApiKeyService:
         try:
             # Деактивируем API ключ в базе данных
             deactivated = await self.api_key.deactivate_key_by_user_id(user_id)
+            # Сбрасываем клиента и расшифрованный ключ этого процесса
+            wb_clients.invalidate(user_id, deactivated)
 
             if deactivated:
                 app_logger.info(f"API key deactivated for user {user_id}")
@@ -1,8 +1,11 @@
+import time
+
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError
-from fluentogram import TranslatorHub
 from bot.database.uow import UnitOfWork
 from bot.core.logging import app_logger
+from bot.core.metrics import order_delivery_latency, order_pipeline_stage
+from bot.utils.i18n import TranslatorRegistry
 from aiolimiter import AsyncLimiter
 
 # 1 запрос в секунду на пользователя
@@ -20,40 +23,66 @@ class NotificationService:
     def __init__(
             self,
             uow: UnitOfWork,
-            i18n: TranslatorHub,
+            translators: TranslatorRegistry,
             bot: Bot
     ):
         self.uow = uow
         self.bot = bot
-        self.i18n = i18n.get_translator_by_locale('ru')
+        self.translators = translators
 
     async def send_message(
             self,
             telegram_id: int,
             texts: list[dict],
+            observe_latency: bool = True,
     ) -> None:
+        """
+        Отправить уведомления о заказах.
+
+        observe_latency — учитывать доставку в order_delivery_latency; только
+        для владельца, копии сотрудникам не добавляют заказу лишних замеров.
+        """
         limiter = get_user_limiter(telegram_id)
         for text in texts:
             try:
                 app_logger.info("Sending notification", user_id=telegram_id)
                 async with limiter:
-                    await self.bot.send_photo(
-                        chat_id=telegram_id,
-                        photo=text.get('photo'),
-                        caption=text.get('text'), parse_mode="HTML"
-                    )
+                    with order_pipeline_stage.labels(stage="send").time():
+                        await self.bot.send_photo(
+                            chat_id=telegram_id,
+                            photo=text.get('photo'),
+                            caption=text.get('text'), parse_mode="HTML"
+                        )
+                ordered_at = text.get('ordered_at')
+                if observe_latency and ordered_at is not None:
+                    order_delivery_latency.observe(max(time.time() - ordered_at, 0))
             except TelegramForbiddenError as e:
                 await self.uow.users.block_user(telegram_id)
                 raise e
             except Exception as e:
                 print(e)
 
-    async def notify_api_key_deactivated(self, telegram_id: int) -> None:
+    async def send_replies(self, telegram_id: int, keys: list[str], locale: str | None = None) -> None:
+        """
+        Ответы на действие пользователя, выполненное в воркере.
+
+        Args:
+            telegram_id: Telegram ID пользователя
+            keys: Ключи переводов, по сообщению на ключ
+            locale: Локаль пользователя (User.locale)
+        """
+        i18n = self.translators.get(locale)
+        for key in keys:
+            await self.bot.send_message(
+                chat_id=telegram_id, text=i18n.get(key), parse_mode="HTML")
+
+    async def notify_api_key_deactivated(self, telegram_id: int, locale: str | None = None) -> None:
         """
         Отправляет уведомление пользователю о деактивации API ключа.
 
         Args:
             telegram_id: Telegram ID пользователя
+            locale: Локаль пользователя (User.locale)
         """
         try:
             app_logger.info(
@@ -63,7 +92,7 @@ class NotificationService:
             async with limiter:
                 await self.bot.send_message(
                     chat_id=telegram_id,
-                    text=self.i18n.get('api-key-deactivated'),
+                    text=self.translators.get(locale).get('api-key-deactivated'),
                     parse_mode="HTML"
                 )
 
@@ -1,5 +1,6 @@
 from bot.database.models import Subscription
 from datetime import datetime, timedelta
+from bot.database.repositories.subscription import SubscriptionRepository
 from bot.database.uow import UnitOfWork
 from bot.core.config import settings
 
@@ -9,7 +10,12 @@ from datetime import datetime
 
 class SubscriptionService:
     def __init__(self, uow: UnitOfWork):
-        self.repo = uow.subscriptions
+        self.uow = uow
+
+    @property
+    def repo(self) -> SubscriptionRepository:
+        # Репозиторий из UoW при обращении: создание сервиса не открывает сессию
+        return self.uow.subscriptions
 
     async def check_trial(self, user_id: int) -> bool:
         """Проверка, доступен ли пробный период для пользователя."""
@@ -1,8 +1,9 @@
 from typing import Optional, Any
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 from bot.database.uow import UnitOfWork
+from bot.services.wb_service import ORDERS_POLL_DAYS, PRELOAD_CLAIM_TIMEOUT
 from bot.core.logging import app_logger, log_error_with_metrics
 
 
@@ -11,6 +12,7 @@ class TaskName(Enum):
     PRE_LOAD_INFO = "pre_load_info"
     START_NOTIF_PIPELINE = "start_notif_pipeline"
     LOAD_STOCKS = "load_stocks"
+    LOAD_SALES = "load_sales"
 
 
 class TaskControlService:
@@ -18,8 +20,11 @@ class TaskControlService:
 
     # Определяем зависимости между задачами
     TASK_CONFLICTS = {
-        TaskName.START_NOTIF_PIPELINE: [TaskName.PRE_LOAD_INFO, TaskName.START_NOTIF_PIPELINE],
+        # Первичная загрузка не блокирует уведомления целиком: они ждут только
+        # дни окна опроса (см. _waiting_for_preload), история грузится параллельно
+        TaskName.START_NOTIF_PIPELINE: [TaskName.START_NOTIF_PIPELINE],
         TaskName.LOAD_STOCKS: [TaskName.LOAD_STOCKS],
+        TaskName.LOAD_SALES: [TaskName.LOAD_SALES],
     }
 
     def __init__(self, uow: UnitOfWork):
@@ -69,6 +74,14 @@ class TaskControlService:
                 )
                 return False
 
+        if task_name == TaskName.START_NOTIF_PIPELINE and await self._waiting_for_preload([user_id]):
+            app_logger.info(
+                f"Task {task_name.value} waits for recent days of pre-load for user {user_id}",
+                user_id=user_id,
+                task_name=task_name.value
+            )
+            return False
+
         return True
 
     async def start_task(
@@ -170,6 +183,23 @@ class TaskControlService:
             )
             raise
 
+    async def _waiting_for_preload(self, user_ids: list[int]) -> set[int]:
+        """
+        Пользователи, у которых первичная загрузка еще не дошла до конца окна
+        опроса заказов. Пайплайн уведомлений для них не запускается: заказы
+        этих дней он сохранил бы как новые и прислал бы уведомлениями.
+        Свежие дни загружаются первыми, поэтому ожидание — пара чанков.
+        """
+        since = date.today() - timedelta(days=ORDERS_POLL_DAYS)
+        return await self.uow.preload_chunks.users_with_pending_days(
+            user_ids, since, lease=PRELOAD_CLAIM_TIMEOUT)
+
+    def _blocking_task_names(self, task_name: TaskName) -> list[str]:
+        """Задачи, при активности которых task_name запускать нельзя (включая ее саму)."""
+        names = {task_name.value}
+        names.update(task.value for task in self.TASK_CONFLICTS.get(task_name, []))
+        return list(names)
+
     async def get_available_users_for_task(
         self,
         all_user_ids: list[int],
@@ -177,6 +207,7 @@ class TaskControlService:
     ) -> list[int]:
         """
         Получить список пользователей, для которых можно запустить задачу.
+        Проверка выполняется одним запросом на всех пользователей.
 
         Args:
             all_user_ids: Список всех пользователей
@@ -185,11 +216,12 @@ class TaskControlService:
         Returns:
             Список user_id пользователей, доступных для задачи
         """
-        available_users = []
-
-        for user_id in all_user_ids:
-            if await self.can_start_task(user_id, task_name):
-                available_users.append(user_id)
+        busy_users = await self.uow.task_status.get_busy_users(
+            all_user_ids, self._blocking_task_names(task_name))
+        if task_name == TaskName.START_NOTIF_PIPELINE:
+            busy_users |= await self._waiting_for_preload(all_user_ids)
+        available_users = [
+            user_id for user_id in all_user_ids if user_id not in busy_users]
 
         app_logger.info(
             f"Available users for task {task_name.value}: {len(available_users)}/{len(all_user_ids)}",
@@ -200,6 +232,22 @@ class TaskControlService:
 
         return available_users
 
+    async def start_tasks(self, user_ids: list[int], task_name: TaskName) -> list[int]:
+        """
+        Зарегистрировать начало задачи сразу для многих пользователей.
+
+        Свободные пользователи определяются одним запросом, записи
+        создаются одной вставкой. Чтобы задачи брокера увидели записи,
+        транзакцию нужно закоммитить до отправки задач.
+
+        Returns:
+            Список user_id, для которых задача зарегистрирована
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        available = await self.get_available_users_for_task(user_ids, task_name)
+        await self.uow.task_status.create_tasks_bulk(available, task_name.value)
+        return available
+
     async def get_users_with_active_tasks(self, task_names: list[TaskName]) -> list[int]:
         """
         Получить список пользователей с активными задачами.
@@ -300,16 +348,25 @@ class TaskControlService:
             )
             raise
 
-    async def recover_all_running_tasks(self) -> int:
+    async def heartbeat(self, user_id: int, task_name: TaskName) -> None:
+        """Продлить выполняющуюся задачу, чтобы cleanup_hanging_tasks не счел ее зависшей."""
+        await self.uow.task_status.touch_task(user_id, task_name.value)
+
+    async def recover_all_running_tasks(self, exclude: Optional[list[TaskName]] = None) -> int:
         """
         Восстановить все задачи в статусе 'running' как 'failed'.
         Используется при запуске приложения.
 
+        Args:
+            exclude: Задачи, которые переживают перезапуск (возобновляются
+                повторной доставкой сообщения)
+
         Returns:
             Количество восстановленных задач
         """
         try:
-            running_tasks = await self.uow.task_status.get_all_running_tasks()
+            running_tasks = await self.uow.task_status.get_all_running_tasks(
+                exclude=[task.value for task in exclude or []])
             count = 0
             
             for task in running_tasks:
@@ -1,5 +1,8 @@
 import secrets
+from datetime import datetime, timedelta
 from bot.database.models import Employee, EmployeeInvite, User
+from bot.database.repositories.employee import EmployeeRepository
+from bot.database.repositories.user import UserRepository
 from bot.database.uow import UnitOfWork
 from bot.core.logging import app_logger
 from bot.core.config import settings
@@ -11,13 +14,32 @@ class UserService:
             uow: UnitOfWork,
     ):
         self.uow = uow
-        self.employee = uow.employee
-        self.employee_invite = uow.employee_invites
-        self.users = uow.users
+
+    # Репозитории берутся из UoW при обращении: создание сервиса не открывает сессию
+    @property
+    def employee(self) -> EmployeeRepository:
+        return self.uow.employee
+
+    @property
+    def employee_invite(self) -> EmployeeRepository:
+        return self.uow.employee_invites
+
+    @property
+    def users(self) -> UserRepository:
+        return self.uow.users
 
     async def get_by_user_id(self, user_id: int) -> User | None:
         return await self.users.get_by_user_id(user_id)
 
+    async def record_interactions(self, interactions: dict[int, datetime]) -> None:
+        """Сохранить время последнего обращения пользователей к боту (telegram_id -> время)."""
+        await self.users.set_interactions(interactions)
+
+    async def get_recently_active_ids(self, minutes: int) -> set[int]:
+        """Пользователи, обращавшиеся к боту за последние minutes минут."""
+        since = datetime.now() - timedelta(minutes=minutes)
+        return await self.users.get_recently_active_ids(since)
+
     async def generate_employee_invite(self, telegram_id: int) -> str:
         token = secrets.token_hex(16)
         owner = await self.users.get_by_tg_id(telegram_id)
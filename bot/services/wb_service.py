@@ -1,12 +1,17 @@
-from datetime import datetime, timedelta
-from fluentogram import TranslatorHub
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
-from bot.api.wb import WBAPIClient
+from bot.api.registry import wb_clients
 from bot.api.base_api_client import UnauthorizedUser
-from bot.schemas.wb import NotifOrder
+from bot.schemas.wb import ApiKeyWithTelegramDTO, NotifOrder
 from bot.services.api_key import ApiKeyService
 from bot.database.uow import UnitOfWork
+from bot.database.repositories.preload import PreloadProgress
+from bot.core.config import settings
 from bot.core.logging import app_logger
+from bot.core.metrics import order_detect_latency, order_pipeline_stage
+from bot.utils.captions import order_captions
+from bot.utils.i18n import DEFAULT_LOCALE, TranslatorRegistry
 from ..services.notifications import NotificationService
 
 
@@ -16,31 +21,61 @@ BASKET_THRESHOLDS = [
     3485, 3701, 3917, 4133, 4349, 4565
 ]
 
+# Глубина первичной загрузки продаж и максимальный размер страницы API статистики
+SALES_INITIAL_DAYS = 90
+SALES_PAGE_LIMIT = 80_000
+
+# Время в ответах API статистики WB — московское, без указания зоны
+WB_TIMEZONE = ZoneInfo("Europe/Moscow")
+
+
+def wb_aware(value: datetime) -> datetime:
+    """Момент из API WB с зоной: наивное время считается московским."""
+    return value.replace(tzinfo=WB_TIMEZONE) if value.tzinfo is None else value
+
+
+# Окно опроса новых заказов: дни до сегодняшнего (dateFrom пайплайна уведомлений)
+ORDERS_POLL_DAYS = 1
+
+# Первичная загрузка заказов: глубина в днях (один чанк — один день)
+# и число попыток на чанк
+PRELOAD_DAYS = 90
+PRELOAD_MAX_ATTEMPTS = 3
+# Сколько взятый чанк закреплен за задачей; дольше — задача считается
+# упавшей, день достается снова. Больше ack_wait брокера (5 мин) и
+# ожиданий повторов запроса заказов на 429 (до 7,5 мин)
+PRELOAD_CLAIM_TIMEOUT = timedelta(minutes=15)
+
 
 class WBService:
     def __init__(
             self,
             uow: UnitOfWork,
-            i18n: TranslatorHub,
+            translators: TranslatorRegistry,
             notification_service: NotificationService,
             api_key_service: ApiKeyService
     ):
         self.uow = uow
         self.api_key_service = api_key_service
         self.notification_service = notification_service
-        self.i18n = i18n.get_translator_by_locale('ru')
+        self.translators = translators
 
-    async def fetch_and_save_orders(self, user_id: int, api_key: str) -> list[str] | None:
+    async def fetch_and_save_orders(self, user_id: int, api_key: ApiKeyWithTelegramDTO) -> list[str] | None:
         try:
-            api_client = WBAPIClient(token=api_key)
-            date_from = (datetime.now() - timedelta(days=1)
+            api_client = wb_clients.get(api_key)
+            date_from = (datetime.now() - timedelta(days=ORDERS_POLL_DAYS)
                          ).strftime("%Y-%m-%d")
-            orders = await api_client.get_orders(user_id, date_from)
+            with order_pipeline_stage.labels(stage="fetch").time():
+                orders_data = await api_client.get_orders_raw(date_from)
 
-            if not orders:
+            if not orders_data:
                 return
 
-            new_orders = await self.uow.wb_orders.add_orders_bulk(orders=orders)
+            with order_pipeline_stage.labels(stage="validate").time():
+                orders = api_client.parse_orders(user_id, orders_data)
+
+            with order_pipeline_stage.labels(stage="upsert").time():
+                new_orders = await self.uow.wb_orders.add_orders_bulk(orders=orders)
             app_logger.info(
                 f"{len(new_orders)} new orders added for {user_id} ")
 
@@ -48,13 +83,20 @@ class WBService:
                 app_logger.info(f"No new orders for {user_id}")
                 return
 
-            await self._get_stats(self.uow, user_id, new_orders)
+            # Процесс может работать не в московской зоне (контейнер в UTC)
+            detected_at = datetime.now(timezone.utc)
+            for order in new_orders:
+                order_detect_latency.observe(
+                    max((detected_at - wb_aware(order.date)).total_seconds(), 0))
+
+            with order_pipeline_stage.labels(stage="stats").time():
+                await self._get_stats(self.uow, user_id, new_orders)
 
             # Сортируем заказы
             new_orders = sorted(new_orders, key=lambda x: x.counter)
 
             # Генерируем тексты на основе обновлённых заказов
-            texts = await self._generate_texts(orders=new_orders)
+            texts = await self._generate_texts(orders=new_orders, locale=api_key.locale)
 
             return texts
 
@@ -69,32 +111,74 @@ class WBService:
             user = await self.uow.users.get_by_user_id(user_id)
             if user:
                 # Отправляем уведомление пользователю
-                await self.notification_service.notify_api_key_deactivated(user.telegram_id)
+                await self.notification_service.notify_api_key_deactivated(
+                    user.telegram_id, user.locale)
 
             # Повторно выбрасываем исключение для обработки на верхнем уровне
             raise
 
-    async def pre_load_orders(self, user_id: int, api_key: str) -> None:
-        try:
-            api_client = WBAPIClient(token=api_key)
-            date_from = datetime.now() - timedelta(days=90)
-            orders = await api_client.get_orders(user_id, date_from)
-
-            await self.uow.wb_orders.add_orders_bulk(orders=orders)
-            app_logger.info(
-                f"Pre-loaded orders: {user_id} {len(orders)} ")
+    async def plan_preload(self, user_id: int) -> None:
+        """Разбить первичную загрузку заказов на дневные чанки (чекпоинты)."""
+        today = date.today()
+        days = [today - timedelta(days=offset) for offset in range(PRELOAD_DAYS)]
+        await self.uow.preload_chunks.plan(user_id, days)
+
+    async def preload_orders_chunk(self, user_id: int, api_key: ApiKeyWithTelegramDTO) -> bool:
+        """
+        Загрузить один день первичной загрузки заказов.
+
+        Чанк берется короткой транзакцией и коммитится сразу: запрос к WB
+        (с ожиданием на 429) не держит соединение с БД открытой
+        транзакцией. Результат чанка коммитится вместе с задачей, поэтому
+        в памяти всегда не больше одного дня заказов, а после сбоя загрузка
+        продолжается с первого необработанного дня. Ошибка API
+        засчитывается как попытка чанка, день будет повторен позже.
+
+        :return: False, если свободных чанков нет.
+        """
+        chunk = await self.uow.preload_chunks.claim_next(
+            user_id, lease=PRELOAD_CLAIM_TIMEOUT)
+        await self.uow.commit()
+        if chunk is None:
+            return False
 
+        try:
+            api_client = wb_clients.get(api_key)
+            # flag=1 — заказы ровно за день dateFrom
+            orders = await api_client.get_orders(user_id, chunk.day.isoformat(), flag=1)
         except UnauthorizedUser as e:
             app_logger.warning(
                 f"API key unauthorized during pre-load for user {user_id}: {e.message}")
             await self.api_key_service.handle_unauthorized_key(user_id)
-
-    async def load_stocks(self, user_id: int, api_key: str) -> None:
+            raise
+        except Exception as e:
+            app_logger.error(
+                f"Failed to pre-load orders for user {user_id} on {chunk.day}: {e}")
+            await self.uow.preload_chunks.mark_failed(
+                chunk.id, str(e), max_attempts=PRELOAD_MAX_ATTEMPTS)
+            return True
+
+        await self.uow.wb_orders.add_orders_bulk(orders=orders)
+        await self.uow.preload_chunks.mark_done(chunk.id, rows=len(orders))
+        app_logger.info(
+            f"Pre-loaded orders: {user_id} {chunk.day} {len(orders)} ")
+        return True
+
+    async def get_preload_progress(self, user_id: int) -> PreloadProgress:
+        return await self.uow.preload_chunks.get_progress(user_id)
+
+    async def count_recent_orders(self, days: int) -> dict[int, int]:
+        """Число заказов каждого продавца за последние days дней."""
+        since = datetime.now() - timedelta(days=days)
+        return await self.uow.wb_orders.count_orders_by_user(since)
+
+    async def load_stocks(self, user_id: int, api_key: ApiKeyWithTelegramDTO) -> None:
         try:
-            api_client = WBAPIClient(token=api_key)
+            api_client = wb_clients.get(api_key)
             stocks = await api_client.get_stocks(user_id)
 
             await self.uow.wb_stocks.add_stocks_bulk(stocks=stocks)
+            # Снимок сводок обновляет вызывающий после коммита (refresh_stock_summaries)
             app_logger.info(f"Loaded stocks: {user_id} {len(stocks)} ")
 
         except UnauthorizedUser as e:
@@ -103,48 +187,69 @@ class WBService:
             await self.api_key_service.handle_unauthorized_key(user_id)
             raise
 
-    async def _generate_texts(self, orders: list[NotifOrder]) -> list[dict]:
+    async def refresh_stock_summaries(self, user_id: int) -> None:
+        """Пересчитать снимок сводок остатков; вызывать после коммита загрузки."""
+        await self.uow.wb_stocks.refresh_stock_summaries(user_id)
+
+    async def load_sales(self, user_id: int, api_key: ApiKeyWithTelegramDTO) -> int:
+        """
+        Дельта-загрузка продаж по курсору lastChangeDate.
+
+        Курсор — максимальная дата изменения уже загруженных продаж;
+        при первом запуске берется глубина SALES_INITIAL_DAYS.
+        """
+        try:
+            api_client = wb_clients.get(api_key)
+            cursor = await self.uow.wb_sales.get_sales_cursor(user_id)
+            if cursor is None:
+                cursor = datetime.now() - timedelta(days=SALES_INITIAL_DAYS)
+
+            total = 0
+            while True:
+                sales = await api_client.get_sales(
+                    user_id, cursor.strftime("%Y-%m-%dT%H:%M:%S"))
+                if not sales:
+                    break
+
+                total += await self.uow.wb_sales.add_sales_bulk(sales)
+
+                next_cursor = max(sale.last_change_date for sale in sales)
+                # Неполная страница — дошли до конца; курсор не сдвинулся — защита от цикла
+                if len(sales) < SALES_PAGE_LIMIT or next_cursor <= cursor:
+                    break
+                cursor = next_cursor
+
+            app_logger.info(f"Loaded sales: {user_id} {total} ")
+            return total
+
+        except UnauthorizedUser as e:
+            app_logger.warning(
+                f"API key unauthorized during sales loading for user {user_id}: {e.message}")
+            await self.api_key_service.handle_unauthorized_key(user_id)
+            raise
+
+    async def _generate_texts(self, orders: list[NotifOrder], locale: str = DEFAULT_LOCALE) -> list[dict]:
+        # Подписи рендерятся одной пачкой, фото подбираются по каждому товару
+        with order_pipeline_stage.labels(stage="render").time():
+            texts = order_captions.render_batch(orders, locale=locale)
+
         result = []
+        with order_pipeline_stage.labels(stage="photo").time():
+            for order, text in zip(orders, texts):
+                photo = await self._get_photo(order.nm_id)
 
-        for order in orders:
-            total_price = round(order.total_price *
-                                (1 - order.discount_percent / 100))
+                # Создаем словарь с текстом и фото
+                order_data = {
+                    "text": text,
+                    "photo": photo,  # может быть None, если фото нет
+                    # Время заказа — для метрики сквозной задержки доставки
+                    "ordered_at": wb_aware(order.date).timestamp(),
+                }
 
-            text = self.i18n.get(
-                "order-text",
-                date=order.date.strftime("%Y-%m-%d %H:%M"),
-                counter=order.counter,
-                total_price=total_price,
-                amount=order.amount,
-                nm_id=order.nm_id,
-                discount=order.discount_percent,
-                category=order.category,
-                subject=order.subject,
-                brand=order.brand,
-                article=order.supplier_article,
-                total_today=order.total_today,
-                total_yesterday=order.total_yesterday,
-                logistic=f"{order.warehouse_name}➡{order.region_name}",
-                warehouse_text=order.stocks,
-            )
-            clean_text = await self._clean_text(text)
-
-            photo = await self._get_photo(order.nm_id)
-
-            # Создаем словарь с текстом и фото
-            order_data = {
-                "text": clean_text,
-                "photo": photo  # может быть None, если фото нет
-            }
-
-            result.append(order_data)
+                result.append(order_data)
 
         return result
 
-    async def _clean_text(self, text: str) -> str:
-        # Удаляем управляющие символы \u2068 (LRI) и \u2069 (PDI). Для переменных Fluenta
-        return text.replace('\u2068', '').replace('\u2069', '').replace('\xa0', '')
-
     async def _get_stats(self, uow: UnitOfWork,  user_id: int, orders: list[NotifOrder]):
         # Получаем все нужные данные для каждого заказа
         for order in orders:
@@ -166,12 +271,12 @@ class WBService:
         return photo_url
 
     async def _get_working_photo_url(self, nm_id: int) -> str:
-        api_client = WBAPIClient()
+        api_client = wb_clients.public
         estimated = int(await self._get_estimated_basket(nm_id))
 
         for basket in range(estimated, 31):  # Проверяем с "предположенного" до 30
             url = await self._build_url(nm_id, f"{basket:02}")
-            response = await api_client.head_request(url)
+            response = await api_client.head_request(url, caller="photo_lookup")
             if response:
                 return url
         return None
@@ -185,4 +290,5 @@ class WBService:
 
     async def _build_url(self, nm_id: int, basket: str) -> str:
         short_id = nm_id // 100000
-        return f"https://basket-{basket}.wbbasket.ru/vol{short_id}/part{nm_id // 1000}/{nm_id}/images/big/1.webp"
+        host = settings.wb.basket_url.format(basket=basket)
+        return f"{host}/vol{short_id}/part{nm_id // 1000}/{nm_id}/images/big/1.webp"
@@ -0,0 +1,97 @@
+from types import TracebackType
+
+from bot.api.base_api_client import UnauthorizedUser
+from bot.core.dependency.container import DependencyContainer
+from bot.core.logging import app_logger
+from bot.database.uow import UnitOfWork
+from bot.services.task_control import TaskName
+
+
+class TaskLifecycle:
+    """
+    Тело задачи брокера и запись ее итога в TaskStatus в одной транзакции.
+
+    Запись о запуске (блокировку) создает тот, кто ставит задачу в очередь
+    (cron пачкой через start_tasks или короткой транзакцией, как load_info),
+    здесь она только завершается:
+
+    - без исключения — completed (или failed, если вызван fail());
+    - ожидаемое исключение из handled (401 от WB и т.п.) — изменения тела
+      сохраняются (например, деактивация ключа), задача failed, исключение
+      не пробрасывается;
+    - любое другое исключение — изменения тела откатываются, задача failed,
+      исключение пробрасывается дальше.
+
+    Использование:
+        async with TaskLifecycle(container, user_id, TaskName.LOAD_STOCKS) as run:
+            await container.get_wb_service(run.uow).load_stocks(user_id, api_key)
+    """
+
+    def __init__(
+        self,
+        container: DependencyContainer,
+        user_id: int,
+        task_name: TaskName,
+        handled: tuple[type[BaseException], ...] = (UnauthorizedUser,),
+    ) -> None:
+        self._container = container
+        self.user_id = user_id
+        self.task_name = task_name
+        self._handled = handled
+        self._deferred = False
+        self._error_message: str | None = None
+        self.uow: UnitOfWork | None = None
+
+    def defer(self) -> None:
+        """Итог запишет следующая задача пайплайна."""
+        self._deferred = True
+
+    def fail(self, error_message: str) -> None:
+        """Завершить задачу неуспешно без исключения."""
+        self._error_message = error_message
+
+    async def __aenter__(self) -> "TaskLifecycle":
+        self.uow = await self._container.create_uow()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> bool:
+        try:
+            if exc is None:
+                if not self._deferred:
+                    await self._complete(
+                        success=self._error_message is None,
+                        error_message=self._error_message)
+                await self.uow.commit()
+                return False
+
+            handled = isinstance(exc, self._handled)
+            error_message = getattr(exc, "message", None) or str(exc)
+            if handled:
+                app_logger.warning(
+                    f"Task {self.task_name.value} stopped for user {self.user_id}: {error_message}")
+            else:
+                app_logger.error(
+                    f"Task {self.task_name.value} failed for user {self.user_id}: {error_message}")
+                # Частичные изменения тела не сохраняем
+                await self.uow.rollback()
+
+            try:
+                await self._complete(success=False, error_message=error_message)
+                await self.uow.commit()
+            except Exception as e:
+                # Не подменяем исходную ошибку; зависшую запись закроет cleanup_hanging_tasks
+                app_logger.error(
+                    f"Failed to record {self.task_name.value} failure for user {self.user_id}: {e}")
+            return handled
+        finally:
+            await self.uow.close()
+
+    async def _complete(self, success: bool, error_message: str | None) -> None:
+        task_control = self._container.get_task_control_service(self.uow)
+        await task_control.complete_task(
+            self.user_id, self.task_name, success=success, error_message=error_message)
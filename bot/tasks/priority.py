@@ -0,0 +1,162 @@
+import asyncio
+import itertools
+import time
+from enum import Enum
+from typing import Any, AsyncGenerator
+
+from nats.aio.msg import Msg as NatsMessage
+from nats.errors import TimeoutError as NatsTimeoutError
+from nats.js.api import ConsumerConfig
+from nats.js.errors import BadRequestError
+from taskiq import AckableMessage, AsyncBroker, BrokerMessage
+from taskiq_nats import PullBasedJetStreamBroker
+
+from bot.core.logging import app_logger
+from bot.core.metrics import task_queue_wait
+
+
+# Метка задачи с классом приоритета: @broker.task(priority=TaskPriority.NOTIFY.value)
+PRIORITY_LABEL = "priority"
+# Заголовок NATS со временем постановки в очередь (для метрики ожидания)
+ENQUEUED_AT_HEADER = "Enqueued-At"
+
+
+class TaskPriority(str, Enum):
+    """Классы приоритета; порядок объявления — порядок выдачи воркеру."""
+    NOTIFY = "notify"
+    DEFAULT = "default"
+    BACKFILL = "backfill"
+
+
+# Сколько неподтвержденных сообщений каждого класса может быть в работе.
+# У уведомлений собственный резерв: долгие загрузки его не занимают.
+PRIORITY_SLOTS = {
+    TaskPriority.NOTIFY: 3,
+    TaskPriority.DEFAULT: 2,
+    TaskPriority.BACKFILL: 1,
+}
+
+_PRIORITY_RANK = {priority: rank for rank, priority in enumerate(TaskPriority)}
+
+
+class PriorityJetStreamBroker(PullBasedJetStreamBroker):
+    """
+    JetStream брокер с классами приоритета.
+
+    Каждый класс публикуется в свой subject ({subject}.{priority}, DEFAULT —
+    в прежний {subject}) и читается своим durable pull-консьюмером с
+    отдельным max_ack_pending, поэтому уведомления не стоят в очереди за
+    предзагрузкой 90 дней. Сообщения, выбранные из всех консьюмеров,
+    отдаются воркеру в порядке приоритета. Задачи без метки идут в DEFAULT.
+    """
+
+    def __init__(self, *args: Any, consumer_config: ConsumerConfig | None = None, **kwargs: Any):
+        super().__init__(*args, consumer_config=consumer_config, **kwargs)
+        self._base_consumer_config = consumer_config or ConsumerConfig()
+        self._subscriptions: dict[TaskPriority, Any] = {}
+
+    def subject_for(self, priority: TaskPriority) -> str:
+        # DEFAULT остается в старом subject: накопленные сообщения дочитываются
+        if priority is TaskPriority.DEFAULT:
+            return self.subject
+        return f"{self.subject}.{priority.value}"
+
+    @staticmethod
+    def priority_of(labels: dict[str, Any]) -> TaskPriority:
+        try:
+            return TaskPriority(labels.get(PRIORITY_LABEL, TaskPriority.DEFAULT.value))
+        except ValueError:
+            return TaskPriority.DEFAULT
+
+    async def startup(self) -> None:
+        # Повторяет BaseJetStreamBroker.startup, но стрим мог быть создан
+        # раньше с одним subject: add_stream тогда падает и нужен update_stream
+        await AsyncBroker.startup(self)
+        await self.client.connect(self.servers, **self.connection_kwargs)
+        self.js = self.client.jetstream()
+        if self.stream_config.name is None:
+            self.stream_config.name = self.stream_name
+        self.stream_config.subjects = [
+            self.subject_for(priority) for priority in TaskPriority]
+        try:
+            await self.js.add_stream(config=self.stream_config)
+        except BadRequestError:
+            await self.js.update_stream(config=self.stream_config)
+        await self._startup_consumer()
+
+    async def _startup_consumer(self) -> None:
+        stream = self.stream_config.name or self.stream_name
+
+        for priority in TaskPriority:
+            durable = f"{self.durable}_{priority.value}"
+            config = ConsumerConfig(
+                durable_name=durable,
+                ack_wait=self._base_consumer_config.ack_wait,
+                max_deliver=self._base_consumer_config.max_deliver,
+                max_ack_pending=PRIORITY_SLOTS[priority],
+                filter_subject=self.subject_for(priority),
+            )
+            await self.js.add_consumer(stream=stream, config=config)
+            self._subscriptions[priority] = await self.js.pull_subscribe_bind(
+                consumer=durable, stream=stream)
+
+    async def kick(self, message: BrokerMessage) -> None:
+        priority = self.priority_of(message.labels)
+        await self.js.publish(
+            self.subject_for(priority),
+            payload=message.message,
+            headers={**message.labels, ENQUEUED_AT_HEADER: str(time.time())},
+        )
+
+    async def listen(self) -> AsyncGenerator[AckableMessage, None]:
+        ready: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        sequence = itertools.count()
+        pumps = [
+            asyncio.create_task(self._pump(priority, subscription, ready, sequence))
+            for priority, subscription in self._subscriptions.items()
+        ]
+        try:
+            while True:
+                _, _, priority, nats_message = await ready.get()
+                self._observe_wait(priority, nats_message)
+                yield AckableMessage(data=nats_message.data, ack=nats_message.ack)
+        finally:
+            for pump in pumps:
+                pump.cancel()
+
+    async def _pump(
+        self,
+        priority: TaskPriority,
+        subscription: Any,
+        ready: asyncio.PriorityQueue,
+        sequence: itertools.count,
+    ) -> None:
+        """Выбирает сообщения класса; число выданных ограничено max_ack_pending консьюмера."""
+        rank = _PRIORITY_RANK[priority]
+        while True:
+            try:
+                messages: list[NatsMessage] = await subscription.fetch(
+                    batch=self.pull_consume_batch,
+                    timeout=self.pull_consume_timeout or 5,
+                )
+            except NatsTimeoutError:
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"Failed to fetch {priority.value} tasks: {e}")
+                await asyncio.sleep(1)
+                continue
+            for nats_message in messages:
+                await ready.put((rank, next(sequence), priority, nats_message))
+
+    @staticmethod
+    def _observe_wait(priority: TaskPriority, nats_message: NatsMessage) -> None:
+        enqueued_at = (nats_message.headers or {}).get(ENQUEUED_AT_HEADER)
+        if enqueued_at is None:
+            return
+        try:
+            task_queue_wait.labels(priority=priority.value).observe(
+                max(time.time() - float(enqueued_at), 0.0))
+        except ValueError:
+            return
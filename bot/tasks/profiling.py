@@ -0,0 +1,140 @@
+import asyncio
+import cProfile
+import inspect
+import os
+import pstats
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+import taskiq
+from taskiq import TaskiqMessage, TaskiqMiddleware, TaskiqResult
+
+from bot.core.logging import app_logger
+
+
+def _short_name(task_name: str) -> str:
+    # "broker:fetch_and_save_orders_for_key" -> "fetch_and_save_orders_for_key"
+    return task_name.rsplit(":", 1)[-1]
+
+
+# Цикл событий и приемник taskiq есть в каждом профиле и наверху по суммарному времени
+_LOOP_FRAMES = (os.path.dirname(asyncio.__file__), os.path.dirname(taskiq.__file__))
+
+
+def top_frames(stats: pstats.Stats, limit: int) -> list[str]:
+    """Самые дорогие функции по суммарному времени (с вложенными вызовами), без цикла событий."""
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    frames = []
+    for func in stats.fcn_list:
+        if len(frames) >= limit:
+            break
+        filename, line, name = func
+        if filename.startswith(_LOOP_FRAMES) or "_contextvars" in name:
+            continue
+        _, ncalls, tottime, cumtime, _ = stats.stats[func]
+        frames.append(
+            f"{cumtime:.3f}s cum {tottime:.3f}s own {ncalls} calls "
+            f"{Path(filename).name}:{line}({name})"
+        )
+    return frames
+
+
+class ProfilingMiddleware(TaskiqMiddleware):
+    """
+    Выборочное профилирование задач воркера через cProfile.
+
+    Профилируются задачи из tasks и/или пользователей из user_ids
+    (если заданы оба фильтра — нужны оба), остальные — с вероятностью
+    sample_rate. Профиль сохраняется в output_dir/<task>-<task_id>.prof
+    (смотреть: python -m pstats, snakeviz), топ функций пишется в лог.
+
+    cProfile видит весь поток, поэтому в профиль попадают и корутины
+    других задач, выполнявшихся параллельно, а профилировщик в процессе
+    может быть только один: пока идет профиль, следующие задачи не
+    профилируются. Выключенное профилирование не добавляет middleware
+    в брокер вовсе.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        sample_rate: float = 0.0,
+        tasks: list[str] | None = None,
+        user_ids: list[int] | None = None,
+        top: int = 20,
+    ) -> None:
+        super().__init__()
+        self._output_dir = Path(output_dir)
+        self._sample_rate = sample_rate
+        self._tasks = {_short_name(name) for name in tasks or ()}
+        self._user_ids = set(user_ids or ())
+        self._top = top
+        # Позиция аргумента user_id по задаче (None — аргумента нет)
+        self._user_id_positions: dict[str, int | None] = {}
+        self._active: tuple[str, cProfile.Profile, float] | None = None
+
+    def _user_id_of(self, message: TaskiqMessage) -> Any:
+        if "user_id" in message.kwargs:
+            return message.kwargs["user_id"]
+        if message.task_name not in self._user_id_positions:
+            task = self.broker.find_task(message.task_name)
+            position = None
+            if task is not None:
+                params = list(inspect.signature(task.original_func).parameters)
+                if "user_id" in params:
+                    position = params.index("user_id")
+            self._user_id_positions[message.task_name] = position
+        position = self._user_id_positions[message.task_name]
+        if position is None or position >= len(message.args):
+            return None
+        return message.args[position]
+
+    def _should_profile(self, message: TaskiqMessage) -> bool:
+        if self._tasks or self._user_ids:
+            task_matches = not self._tasks or _short_name(message.task_name) in self._tasks
+            user_matches = not self._user_ids or self._user_id_of(message) in self._user_ids
+            if task_matches and user_matches:
+                return True
+        return self._sample_rate > 0 and random.random() < self._sample_rate
+
+    def pre_execute(self, message: TaskiqMessage) -> TaskiqMessage:
+        if self._active is not None or not self._should_profile(message):
+            return message
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В процессе уже работает другой профилировщик
+            return message
+        self._active = (message.task_id, profiler, time.perf_counter())
+        return message
+
+    async def post_execute(self, message: TaskiqMessage, result: TaskiqResult[Any]) -> None:
+        if self._active is None or self._active[0] != message.task_id:
+            return
+        _, profiler, started = self._active
+        profiler.disable()
+        self._active = None
+        duration = time.perf_counter() - started
+
+        path = self._output_dir / f"{_short_name(message.task_name)}-{message.task_id}.prof"
+        try:
+            # Сериализация и сортировка статистики — не в цикле событий
+            frames = await asyncio.to_thread(self._save, profiler, path)
+        except Exception as e:
+            app_logger.warning(f"Failed to save task profile {path}: {e}")
+            return
+        app_logger.info(
+            f"Task {message.task_name} profiled in {duration:.3f}s",
+            task_id=message.task_id,
+            is_err=result.is_err,
+            path=str(path),
+            top=frames,
+        )
+
+    def _save(self, profiler: cProfile.Profile, path: Path) -> list[str]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        return top_frames(pstats.Stats(profiler), self._top)
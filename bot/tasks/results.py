@@ -0,0 +1,83 @@
+from typing import Any
+
+from nats.js.errors import NotFoundError
+from taskiq import TaskiqMessage, TaskiqResult
+from taskiq.compat import model_dump
+from taskiq.middlewares.prometheus_middleware import PrometheusMiddleware
+from taskiq_nats import NATSObjectStoreResultBackend
+
+from bot.core.logging import app_logger
+
+
+# Метка задачи: store_result=False — результат не пишется в object store
+STORE_RESULT_LABEL = "store_result"
+
+
+def stores_result(labels: dict[str, Any]) -> bool:
+    """Сохраняется ли результат задачи с такими метками (после сериализации — строки)."""
+    return labels.get(STORE_RESULT_LABEL, True) not in (False, "False", "false", "0")
+
+
+class PolicyResultBackend(NATSObjectStoreResultBackend):
+    """
+    Object store для результатов задач с политикой хранения.
+
+    - результаты живут не дольше ttl (max_age стрима бакета);
+    - результаты больше max_size не сохраняются целиком: пишется
+      результат без return_value, чтобы wait_result не зависал;
+    - задачи с меткой store_result=False пропускаются: метки задачи
+      приходят вместе с результатом (TaskiqResult.labels).
+    """
+
+    def __init__(
+        self,
+        servers: str | list[str],
+        ttl: int,
+        max_size: int,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(servers, **kwargs)
+        self.ttl = ttl
+        self.max_size = max_size
+
+    async def startup(self) -> None:
+        await super().startup()
+        await self._apply_ttl()
+
+    async def _apply_ttl(self) -> None:
+        # Бакет мог быть создан раньше без TTL — обновляем конфиг его стрима
+        stream_name = f"OBJ_{self.bucket_name}"
+        try:
+            info = await self.nats_jetstream.stream_info(stream_name)
+        except NotFoundError:
+            return
+        if info.config.max_age != self.ttl:
+            info.config.max_age = self.ttl
+            await self.nats_jetstream.update_stream(info.config)
+            app_logger.info(
+                "Task result TTL applied", bucket=self.bucket_name, ttl=self.ttl)
+
+    async def set_result(self, task_id: str, result: TaskiqResult[Any]) -> None:
+        if not stores_result(result.labels):
+            return
+
+        data = self.serializer.dumpb(model_dump(result))
+        if len(data) > self.max_size:
+            app_logger.warning(
+                "Task result is too large, return value dropped",
+                task_id=task_id, size=len(data), max_size=self.max_size)
+            result.return_value = None
+            data = self.serializer.dumpb(model_dump(result))
+
+        await self.object_store.put(name=task_id, data=data)
+
+
+class ResultPolicyPrometheusMiddleware(PrometheusMiddleware):
+    """
+    PrometheusMiddleware, в котором saved_results считает только записанные
+    результаты: post_save вызывается и для пропущенных бэкендом задач.
+    """
+
+    def post_save(self, message: TaskiqMessage, result: TaskiqResult[Any]) -> None:
+        if stores_result(message.labels):
+            super().post_save(message, result)
@@ -0,0 +1,87 @@
+import math
+import time
+import zlib
+
+
+def current_slot() -> int:
+    """Номер текущей минуты (общий отсчет для всех периодов)."""
+    return int(time.time() // 60)
+
+
+def phase_offset(user_id: int, period: int, salt: str) -> int:
+    """
+    Стабильный сдвиг пользователя внутри периода, в минутах.
+
+    Хэш не зависит от процесса (в отличие от hash()), поэтому у
+    пользователя всегда один и тот же слот, а соль разводит слоты
+    разных задач одного пользователя.
+    """
+    return zlib.crc32(f"{salt}:{user_id}".encode()) % period
+
+
+class PhaseScheduler:
+    """
+    Решает, чья очередь в текущую минуту.
+
+    Диспетчер запускается каждую минуту и берет только пользователей,
+    чей сдвиг совпал с минутой: каждый опрашивается раз в period минут,
+    но одновременно — лишь ~1/period всех пользователей. Без spread
+    сдвиг у всех нулевой, то есть поведение обычного cron.
+    """
+
+    def __init__(self, spread: bool = True) -> None:
+        self.spread = spread
+
+    def is_due(self, user_id: int, period: int, salt: str, slot: int) -> bool:
+        if period <= 1:
+            return True
+        offset = phase_offset(user_id, period, salt) if self.spread else 0
+        return (slot - offset) % period == 0
+
+
+class AdaptivePollingPolicy:
+    """
+    Интервал опроса заказов продавца по его частоте заказов.
+
+    Интервал обратно пропорционален корню из частоты (base_interval минут
+    при одном заказе в час): при том же числе опросов такое распределение
+    дает меньшую среднюю задержку уведомления, чем пропорциональное.
+    Интервал ограничивается [min_interval, max_interval].
+    После обращения к боту пользователь опрашивается с min_interval.
+    Частоты (заказов в час за окно) пересчитываются раз в refresh_interval.
+    """
+
+    def __init__(
+        self,
+        min_interval: int = 2,
+        max_interval: int = 60,
+        base_interval: float = 8,
+        window_days: int = 7,
+        refresh_interval: float = 15 * 60,
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base_interval = base_interval
+        self.window_days = window_days
+        self._refresh_interval = refresh_interval
+        self._rates: dict[int, float] = {}
+        self._loaded_at: float | None = None
+
+    def needs_refresh(self) -> bool:
+        return (self._loaded_at is None
+                or time.monotonic() - self._loaded_at > self._refresh_interval)
+
+    def set_order_counts(self, counts: dict[int, int]) -> None:
+        """Заменить частоты: число заказов каждого пользователя за окно."""
+        hours = self.window_days * 24
+        self._rates = {user_id: count / hours for user_id, count in counts.items()}
+        self._loaded_at = time.monotonic()
+
+    def interval_for(self, user_id: int, boosted: bool = False) -> int:
+        if boosted:
+            return self.min_interval
+        rate = self._rates.get(user_id, 0.0)
+        if rate <= 0:
+            return self.max_interval
+        interval = round(self.base_interval / math.sqrt(rate))
+        return max(self.min_interval, min(self.max_interval, interval))
@@ -1,6 +1,23 @@
 from fluent_compiler.bundle import FluentBundle
 
-from fluentogram import FluentTranslator, TranslatorHub
+from fluentogram import FluentTranslator, TranslatorHub, TranslatorRunner
+
+
+DEFAULT_LOCALE = "ru"
+
+# Локаль бота -> (локаль Fluent, файлы переводов)
+LOCALES = {
+    "ru": ("ru-RU", ["bot/locales/ru/LC_MESSAGES/txt.ftl"]),
+    "en": ("en-US", ["bot/locales/en/LC_MESSAGES/txt.ftl"]),
+}
+
+
+def create_bundle(locale: str, use_isolating: bool = True) -> FluentBundle:
+    fluent_locale, filenames = LOCALES[locale]
+    return FluentBundle.from_files(
+        locale=fluent_locale,
+        filenames=filenames,
+        use_isolating=use_isolating)
 
 
 def create_translator_hub() -> TranslatorHub:
@@ -12,14 +29,45 @@ def create_translator_hub() -> TranslatorHub:
         [
             FluentTranslator(
                 locale="ru",
-                translator=FluentBundle.from_files(
-                    locale="ru-RU",
-                    filenames=["bot/locales/ru/LC_MESSAGES/txt.ftl"])),
+                translator=create_bundle("ru")),
             FluentTranslator(
                 locale="en",
-                translator=FluentBundle.from_files(
-                    locale="en-US",
-                    filenames=["bot/locales/en/LC_MESSAGES/txt.ftl"]))
+                translator=create_bundle("en"))
         ],
     )
-    return translator_hub
\ No newline at end of file
+    return translator_hub
+
+
+class TranslatorRegistry:
+    """
+    Один TranslatorRunner на локаль в процессе (по User.locale).
+
+    Раннеры общие, поэтому в сервисах используем только i18n.get(...):
+    доступ через атрибуты (i18n.some.key()) хранит состояние в раннере.
+    Неизвестная локаль отдает раннер локали по умолчанию.
+    """
+
+    def __init__(self, hub: TranslatorHub, default_locale: str = DEFAULT_LOCALE):
+        self._hub = hub
+        self._default_locale = default_locale
+        self._runners: dict[str | None, TranslatorRunner] = {}
+
+    @property
+    def hub(self) -> TranslatorHub:
+        return self._hub
+
+    def get(self, locale: str | None = None) -> TranslatorRunner:
+        runner = self._runners.get(locale)
+        if runner is None:
+            resolved = locale if locale in LOCALES else self._default_locale
+            runner = self._runners.get(resolved)
+            if runner is None:
+                runner = self._hub.get_translator_by_locale(resolved)
+                self._runners[resolved] = runner
+            self._runners[locale] = runner
+        return runner
+
+    def warm_up(self) -> None:
+        """Создать раннеры всех локалей заранее (старт воркера)."""
+        for locale in LOCALES:
+            self.get(locale)
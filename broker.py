@@ -1,36 +1,52 @@
 import asyncio
+import time
 import taskiq_aiogram
 from aiogram.exceptions import TelegramForbiddenError
 
-from typing import Annotated
+from typing import Annotated, Callable
 from taskiq import Context, TaskiqDepends, TaskiqEvents, TaskiqScheduler, TaskiqState
 from taskiq.schedule_sources import LabelScheduleSource
-from taskiq.middlewares.prometheus_middleware import PrometheusMiddleware
-from taskiq_nats import PullBasedJetStreamBroker, NATSObjectStoreResultBackend
 from nats.js.api import ConsumerConfig
 
+from bot.core.activity import activity_buffer
 from bot.core.config import settings
 from bot.core.dependency.container import DependencyContainer
 from bot.core.dependency.container_init import init_container
+from bot.database.engine import ProcessRole
 from bot.services.task_control import TaskName
-from bot.api.base_api_client import UnauthorizedUser
-from bot.core.logging import app_logger
-
-
-# Разделение стримов для ручных задач и задач, запускаемых по расписанию
-broker = PullBasedJetStreamBroker(
+from bot.core.logging import app_logger, setup_logging
+from bot.core.metrics import order_pipeline_stage
+from bot.core.loop_monitor import loop_monitor
+from bot.schemas.wb import ApiKeyWithTelegramDTO
+from bot.tasks.lifecycle import TaskLifecycle
+from bot.tasks.priority import PriorityJetStreamBroker, TaskPriority
+from bot.tasks.profiling import ProfilingMiddleware
+from bot.tasks.results import PolicyResultBackend, ResultPolicyPrometheusMiddleware
+from bot.tasks.schedule import AdaptivePollingPolicy, PhaseScheduler, current_slot
+from bot.utils.captions import ORDER_TEXT_ID, order_captions
+from bot.utils.i18n import DEFAULT_LOCALE, LOCALES
+
+
+# Классы приоритета: уведомления, обычные задачи и долгие загрузки
+# читаются разными консьюмерами (см. PriorityJetStreamBroker)
+broker = PriorityJetStreamBroker(
     settings.nats.url,
     stream_name="taskiq_jetstream",
     durable="wb_tasks",
     consumer_config=ConsumerConfig(
         ack_wait=60 * 5,  # Уменьшаем время ожидания до 5 минут
         max_deliver=2,
-        max_ack_pending=3
     ),
-).with_result_backend(NATSObjectStoreResultBackend(settings.nats.url))
+).with_result_backend(PolicyResultBackend(
+    settings.nats.url,
+    ttl=settings.nats.result_ttl,
+    max_size=settings.nats.result_max_size,
+))
 
 broker.add_middlewares(
-    PrometheusMiddleware(
+    # saved_results не считает результаты fire-and-forget задач
+    # (store_result=False), их PolicyResultBackend не сохраняет
+    ResultPolicyPrometheusMiddleware(
         server_addr="0.0.0.0",
         server_port=9000,
         # Путь для хранения метрик в многопроцессной среде
@@ -38,6 +54,15 @@ broker.add_middlewares(
     ),
 )
 
+if settings.profiling.enabled:
+    broker.add_middlewares(ProfilingMiddleware(
+        output_dir=settings.profiling.output_dir,
+        sample_rate=settings.profiling.sample_rate,
+        tasks=settings.profiling.tasks,
+        user_ids=settings.profiling.user_ids,
+        top=settings.profiling.top,
+    ))
+
 taskiq_aiogram.init(
     broker,
     "main:dp",
@@ -49,34 +74,80 @@ scheduler = TaskiqScheduler(
     sources=[LabelScheduleSource(broker)]
 )
 
+# Сдвиг пользователей внутри интервала: нет пиков в :00 и :30
+phase_scheduler = PhaseScheduler(spread=settings.scheduler.spread)
+# Интервал уведомлений продавца по частоте его заказов
+polling_policy = AdaptivePollingPolicy(
+    min_interval=settings.scheduler.notif_min_interval,
+    max_interval=settings.scheduler.notif_max_interval,
+    base_interval=settings.scheduler.notif_base_interval,
+    window_days=settings.scheduler.velocity_window_days,
+    refresh_interval=settings.scheduler.velocity_refresh * 60,
+)
+
 
 @broker.on_event(TaskiqEvents.WORKER_STARTUP)
 async def startup(state: TaskiqState) -> None:
-    container = init_container()
+    # Заменяет basicConfig воркера taskiq на неблокирующую запись через очередь
+    setup_logging()
+    # Лаг цикла воркера отдается тем же сервером метрик на порту 9000
+    if settings.loop_monitor.enabled:
+        loop_monitor.start(
+            ProcessRole.WORKER.value,
+            interval=settings.loop_monitor.interval,
+            slow_threshold=settings.loop_monitor.slow_threshold,
+            debug=settings.loop_monitor.debug,
+        )
+    container = init_container(ProcessRole.WORKER)
     state.container = container
 
+    # Прогрев: раннеры переводчика и шаблоны подписей компилируются до первой задачи
+    container.translators.warm_up()
+    fallback = order_captions.warm_up(*LOCALES)
+    if fallback:
+        app_logger.warning(f"No {ORDER_TEXT_ID} in locales {fallback}, using {DEFAULT_LOCALE}")
+
     # КРИТИЧЕСКИ ВАЖНО: восстанавливаем состояние после перезапуска контейнеров
     async with await container.create_uow() as uow:
         task_control = container.get_task_control_service(uow)
 
-        # Помечаем ВСЕ задачи в статусе 'running' как failed
-        # так как после перезапуска контейнеров мы не можем знать их реальное состояние
-        recovered_count = await task_control.recover_all_running_tasks()
+        # Помечаем задачи в статусе 'running' как failed
+        # так как после перезапуска контейнеров мы не можем знать их реальное состояние.
+        # Первичная загрузка продолжается по чекпоинтам повторной доставкой звена
+        recovered_count = await task_control.recover_all_running_tasks(
+            exclude=[TaskName.PRE_LOAD_INFO])
 
         app_logger.info(
             f"Container restart: recovered {recovered_count} running tasks")
 
 
+@broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def shutdown(state: TaskiqState) -> None:
+    await loop_monitor.stop()
+
+
 def container_dep(context: Annotated[Context, TaskiqDepends()]) -> DependencyContainer:
     return context.state.container
 
 
-@broker.task()
+async def _refresh_stock_summaries(container: DependencyContainer, user_id: int) -> None:
+    """
+    Снимок сводок остатков по уже закоммиченной загрузке.
+
+    Отдельная короткая транзакция после TaskLifecycle: откаченная
+    загрузка не попадает в кэш.
+    """
+    async with await container.create_uow() as uow:
+        await container.get_wb_service(uow).refresh_stock_summaries(user_id)
+
+
+@broker.task(priority=TaskPriority.BACKFILL.value)
 async def load_info(
     telegram_id: int,
     container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
 ):
-    # Первая транзакция: получаем данные и регистрируем начало задачи
+    # Короткая транзакция: находим ключ, регистрируем начало задачи
+    # и планируем дневные чанки загрузки заказов
     async with await container.create_uow() as uow:
         api_service = container.get_api_key_service(uow)
         task_control = container.get_task_control_service(uow)
@@ -89,220 +160,338 @@ async def load_info(
             if not await task_control.start_task(user_id, TaskName.PRE_LOAD_INFO):
                 app_logger.info(f'Pre-load orders task blocked for user {user_id}')
                 return
-            
-            # Транзакция автоматически коммитится при выходе из контекста
+
+            await container.get_wb_service(uow).plan_preload(user_id)
             app_logger.info(f'Task PRE_LOAD_INFO started for user {user_id}')
-            
+
         except Exception as e:
             app_logger.error(f'Failed to start PRE_LOAD_INFO task for telegram_id {telegram_id}: {e}')
             return
 
-    # Вторая транзакция: выполняем основную работу
+    started = False
+    async with TaskLifecycle(container, user_id, TaskName.PRE_LOAD_INFO) as run:
+        await container.get_wb_service(run.uow).load_stocks(user_id, api_key)
+        # Задачу завершит последний чанк загрузки заказов
+        run.defer()
+        started = True
+
+    if started:
+        await _refresh_stock_summaries(container, user_id)
+        app_logger.info(f'Pre-loaded info for {telegram_id}')
+        await preload_orders_chunk.kiq(user_id, api_key.id, api_key.version)
+
+
+@broker.task(store_result=False)
+async def check_api_key(
+    key_id: int,
+    key_version: int,
+    container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
+):
+    """
+    Проверка сохраненного ключа запросом к WB и активация с учетом подписки.
+
+    Обработчик диалога сохраняет ключ неактивным и ставит задачу со
+    ссылкой на него. Запрос к WB идет вне транзакции: ключ читается,
+    затем активируется или удаляется двумя короткими транзакциями.
+    Ответ приходит сообщением на языке пользователя (User.locale).
+    """
+    async with await container.create_uow() as uow:
+        api_key_service = container.get_api_key_service(uow)
+        key = await api_key_service.get_pending_key(key_id, key_version)
+        if key is None:
+            app_logger.info("API key changed before check", key_id=key_id, version=key_version)
+            return
+        raw_key = await api_key_service.decrypt_key(key.key_encrypted)
+
+    # Сессия уже закрыта: запрос к WB не держит соединение с БД
+    valid = await api_key_service.check_request_to_wb(raw_key)
+
     try:
         async with await container.create_uow() as uow:
-            wb_service = container.get_wb_service(uow)
-            
-            app_logger.info(f'Pre-loaded info for {telegram_id}')
-            await wb_service.pre_load_orders(user_id, api_key.key_encrypted)
-            await wb_service.load_stocks(user_id, api_key.key_encrypted)
-
-    except UnauthorizedUser as e:
-        # Третья транзакция: завершаем задачу с ошибкой
-        async with await container.create_uow() as uow:
-            task_control = container.get_task_control_service(uow)
-            await task_control.complete_task(
-                user_id, TaskName.PRE_LOAD_INFO, success=False,
-                error_message=f"{e.message}")
-        return
-
+            api_key_service = container.get_api_key_service(uow)
+            if valid:
+                status = await api_key_service.activate_checked_key(
+                    key_id, key_version, container.get_subscription_service(uow))
+            elif await api_key_service.discard_unchecked_key(key.user_id, key_id, key_version):
+                status = "invalid"
+            else:
+                status = None
+            # Явный коммит: UoW не пробрасывает ошибку коммита
+            await uow.commit()
     except Exception as e:
-        app_logger.error(f'PRE_LOAD_INFO failed for telegram_id {telegram_id}: {e}')
-        # Третья транзакция: завершаем задачу с ошибкой
-        async with await container.create_uow() as uow:
-            task_control = container.get_task_control_service(uow)
-            await task_control.complete_task(
-                user_id, TaskName.PRE_LOAD_INFO, success=False, error_message=str(e))
-        raise
+        app_logger.exception("API Key save failed", error=str(e), user_id=key.user_id)
+        status = "error"
 
-    # Третья транзакция: завершаем задачу успешно
+    if status is None:
+        app_logger.info("API key changed during check", key_id=key_id, version=key_version)
+        return
+    app_logger.info("API Key checked", user_id=key.user_id, status=status)
+
+    replies = {
+        "active": ["api-key-success", "api-key-pre-load"],
+        "trial_activated": ["subscribe-trial-activeated", "api-key-pre-load"],
+        "inactive": ["subscribe-to-activate-key"],
+        "invalid": ["api-key-invalid-request"],
+        "error": ["unexpected-error"],
+    }[status]
     async with await container.create_uow() as uow:
-        task_control = container.get_task_control_service(uow)
-        await task_control.complete_task(user_id, TaskName.PRE_LOAD_INFO, success=True)
+        await container.get_notification_service(uow).send_replies(
+            key.telegram_id, replies, key.locale)
+    if "api-key-pre-load" in replies:
+        await load_info.kiq(telegram_id=key.telegram_id)
 
 
-@broker.task(schedule=[{"cron": "*/30 * * * *"}])
-async def cron_load_stocks(
+@broker.task(store_result=False, priority=TaskPriority.BACKFILL.value)
+async def preload_orders_chunk(
+    user_id: int,
+    api_key_id: int,
+    key_version: int,
     container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
 ):
+    """
+    Одно звено цепочки первичной загрузки: один день заказов.
+
+    Звенья идут последовательно (API заказов ограничен по частоте),
+    каждое коммитит свой чанк. Повторная доставка после перезапуска
+    продолжает цепочку с первого необработанного дня.
+    """
+    has_next = False
+    async with TaskLifecycle(container, user_id, TaskName.PRE_LOAD_INFO) as run:
+        api_key = await container.get_api_key_service(
+            run.uow).resolve_key(api_key_id, key_version)
+        if api_key is None:
+            run.fail("API key is inactive")
+            return
+
+        wb_service = container.get_wb_service(run.uow)
+        claimed = await wb_service.preload_orders_chunk(user_id, api_key)
+        progress = await wb_service.get_preload_progress(user_id)
+
+        if not progress.finished:
+            run.defer()
+            await container.get_task_control_service(
+                run.uow).heartbeat(user_id, TaskName.PRE_LOAD_INFO)
+            # Если чанк не достался, день грузит параллельная доставка — она и продолжит
+            has_next = claimed
+            return
+
+        app_logger.info(
+            f'Pre-load orders finished for user {user_id}',
+            done=progress.done, failed=progress.failed, total=progress.total)
+        if progress.failed:
+            run.fail(f"{progress.failed}/{progress.total} days failed to load")
+
+    if has_next:
+        await preload_orders_chunk.kiq(user_id, api_key_id, key_version)
+
+
+async def _start_for_active_keys(
+    container: DependencyContainer,
+    task_name: TaskName,
+    period: int | Callable[[int], int] = 1
+) -> list[ApiKeyWithTelegramDTO]:
+    """
+    Регистрирует задачу пачкой для активных ключей, чья очередь в текущую
+    минуту (см. PhaseScheduler), и возвращает ключи, для которых она
+    запущена. period — минуты или функция user_id -> минуты.
+    Транзакция коммитится до отправки задач в брокер, чтобы
+    задачи увидели свои записи TaskStatus.
+    """
+    slot = current_slot()
+    period_for = period if callable(period) else (lambda _: period)
+    # Скан ключей только читает — можно через реплику
+    async with await container.create_read_uow() as read_uow:
+        api_keys = await container.get_api_key_service(
+            read_uow).get_all_decrypted_keys()
+
+    due_keys = [
+        key for key in api_keys
+        if phase_scheduler.is_due(
+            key.user_id, period_for(key.user_id), task_name.value, slot)
+    ]
+    if not due_keys:
+        return []
+
     async with await container.create_uow() as uow:
-        api_service = container.get_api_key_service(uow)
         task_control = container.get_task_control_service(uow)
+        started_user_ids = set(await task_control.start_tasks(
+            [key.user_id for key in due_keys], task_name))
 
-        api_keys = await api_service.get_all_decrypted_keys()
-        api_user_ids = [key.user_id for key in api_keys]
-        available_user_ids = await task_control.get_available_users_for_task(
-            api_user_ids,
-            TaskName.LOAD_STOCKS
-        )
-        # Фильтруем ключи по доступным пользователям
-        available_keys = [
-            key for key in api_keys if key.user_id in available_user_ids]
+    started_keys = [key for key in due_keys if key.user_id in started_user_ids]
+    app_logger.info(
+        f'{task_name.value} started for {len(started_keys)}/{len(due_keys)} users',
+        started_count=len(started_keys),
+        due_count=len(due_keys),
+        total_count=len(api_keys)
+    )
+    return started_keys
 
-        for key in available_keys:
-            if await task_control.start_task(key.user_id, TaskName.LOAD_STOCKS):
-                await load_stocks.kiq(key.user_id, key.key_encrypted)
-            else:
-                app_logger.info(f'LOAD_STOCKS blocked for user {key.user_id}')
 
-        app_logger.info(f'Loaded stocks for {len(api_keys)} users')
+# Диспетчеры запускаются каждую минуту и берут только пользователей своего слота
+@broker.task(schedule=[{"cron": "* * * * *"}], store_result=False)
+async def cron_load_stocks(
+    container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
+):
+    for key in await _start_for_active_keys(
+            container, TaskName.LOAD_STOCKS, settings.scheduler.stocks_interval):
+        await load_stocks.kiq(key.user_id, key.id, key.version)
 
 
-@broker.task
+@broker.task(store_result=False)
 async def load_stocks(
     user_id: int,
-    api_key: str,
+    api_key_id: int,
+    key_version: int,
     container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
 ):
-    async with await container.create_uow() as uow:
-        wb_service = container.get_wb_service(uow)
-        task_control = container.get_task_control_service(uow)
+    loaded = False
+    async with TaskLifecycle(container, user_id, TaskName.LOAD_STOCKS) as run:
+        api_key = await container.get_api_key_service(
+            run.uow).resolve_key(api_key_id, key_version)
+        if api_key is None:
+            run.fail("API key is inactive")
+            return
+        await container.get_wb_service(run.uow).load_stocks(user_id, api_key)
+        loaded = True
 
-        try:
-            await wb_service.load_stocks(user_id, api_key)
-            await task_control.complete_task(user_id, TaskName.LOAD_STOCKS, success=True)
+    if loaded:
+        await _refresh_stock_summaries(container, user_id)
+
+
+# Смещено относительно остатков, чтобы не бить в API статистики одновременно
+@broker.task(schedule=[{"cron": "15,45 * * * *"}], store_result=False)
+async def cron_load_sales(
+    container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
+):
+    for key in await _start_for_active_keys(container, TaskName.LOAD_SALES):
+        await load_sales.kiq(key.user_id, key.id, key.version)
 
-        except UnauthorizedUser as e:
-            await task_control.complete_task(
-                user_id, TaskName.LOAD_STOCKS, success=False,
-                error_message=f"{e.message}")
+
+@broker.task(store_result=False, priority=TaskPriority.BACKFILL.value)
+async def load_sales(
+    user_id: int,
+    api_key_id: int,
+    key_version: int,
+    container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
+):
+    async with TaskLifecycle(container, user_id, TaskName.LOAD_SALES) as run:
+        api_key = await container.get_api_key_service(
+            run.uow).resolve_key(api_key_id, key_version)
+        if api_key is None:
+            run.fail("API key is inactive")
             return
-        except Exception as e:
-            app_logger.error(f'Load stocks failed for user {user_id}: {e}')
-            await task_control.complete_task(
-                user_id, TaskName.LOAD_STOCKS, success=False, error_message=str(e))
-            raise
+        await container.get_wb_service(run.uow).load_sales(user_id, api_key)
 
 
-@broker.task(schedule=[{"cron": "*/10 * * * *"}])
-async def start_orders_notif(
+@broker.task(schedule=[{"cron": "* * * * *"}], store_result=False)
+async def flush_user_activity(
     container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
 ) -> None:
-    async with await container.create_uow() as uow:
-        api_service = container.get_api_key_service(uow)
-        task_control = container.get_task_control_service(uow)
+    """Перенос отметок активности из буфера бота в users.last_interaction_at."""
+    interactions = await activity_buffer.drain()
+    if not interactions:
+        return
+    try:
+        async with await container.create_uow() as uow:
+            await container.get_user_service(uow).record_interactions(interactions)
+            # Явный коммит: ошибка выхода из UoW только логируется, а отметки надо вернуть
+            await uow.commit()
+    except Exception as e:
+        app_logger.error(f"Failed to flush user activity: {e}", users=len(interactions))
+        await activity_buffer.restore(interactions)
 
-        # Получаем все ключи
-        api_keys = await api_service.get_all_decrypted_keys()
-        all_user_ids = [key.user_id for key in api_keys]
 
-        # Получаем пользователей, для которых можно запустить пайплайн уведомлений
-        available_user_ids = await task_control.get_available_users_for_task(
-            all_user_ids,
-            TaskName.START_NOTIF_PIPELINE
-        )
+async def _notif_period(container: DependencyContainer) -> int | Callable[[int], int]:
+    """Интервал уведомлений (минуты): по частоте заказов продавца или общий."""
+    if not settings.scheduler.adaptive:
+        return settings.scheduler.notif_interval
 
-        # Фильтруем ключи по доступным пользователям
-        available_keys = [
-            key for key in api_keys if key.user_id in available_user_ids]
-
-        # Запускаем пайплайн для каждого доступного пользователя
-        started_pipelines = 0
-        for key in available_keys:
-            # Регистрируем начало пайплайна для пользователя
-            if await task_control.start_task(key.user_id, TaskName.START_NOTIF_PIPELINE):
-                await fetch_and_save_orders_for_key.kiq(
-                    user_id=key.user_id,
-                    api_key=key.key_encrypted,
-                    telegram_id=key.telegram_id,
-                )
-                started_pipelines += 1
-            else:
-                app_logger.info(
-                    f'START_NOTIF_PIPELINE blocked for user {key.user_id}')
+    async with await container.create_read_uow() as read_uow:
+        if polling_policy.needs_refresh():
+            polling_policy.set_order_counts(
+                await container.get_wb_service(read_uow).count_recent_orders(
+                    polling_policy.window_days))
+        boosted = await container.get_user_service(
+            read_uow).get_recently_active_ids(settings.scheduler.boost_minutes)
 
-        app_logger.info(
-            f'Пайплайны уведомлений запущены для {started_pipelines}/{len(api_keys)} пользователей',
-            started_count=started_pipelines,
-            total_count=len(api_keys)
+    return lambda user_id: polling_policy.interval_for(user_id, user_id in boosted)
+
+
+@broker.task(schedule=[{"cron": "* * * * *"}], store_result=False, priority=TaskPriority.NOTIFY.value)
+async def start_orders_notif(
+    container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
+) -> None:
+    # Пайплайн уведомлений для пользователей текущего слота, у которых он не запущен
+    for key in await _start_for_active_keys(
+            container, TaskName.START_NOTIF_PIPELINE, await _notif_period(container)):
+        await fetch_and_save_orders_for_key.kiq(
+            user_id=key.user_id,
+            api_key_id=key.id,
+            key_version=key.version,
+            telegram_id=key.telegram_id,
         )
 
 
-@broker.task
+@broker.task(store_result=False, priority=TaskPriority.NOTIFY.value)
 async def fetch_and_save_orders_for_key(
     user_id: int,
     telegram_id: int,
-    api_key: str,
+    api_key_id: int,
+    key_version: int,
     container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
 ):
-    try:
-        async with await container.create_uow() as uow:
-            service = container.get_wb_service(uow)
-            task_control = container.get_task_control_service(uow)
-            try:
-                texts = await service.fetch_and_save_orders(api_key=api_key, user_id=user_id)
-            except UnauthorizedUser as e:
-                await task_control.complete_task(
-                    user_id, TaskName.START_NOTIF_PIPELINE, success=False,
-                    error_message=f"{e.message}")
-                return
+    texts = None
+    async with TaskLifecycle(container, user_id, TaskName.START_NOTIF_PIPELINE) as run:
+        api_key = await container.get_api_key_service(
+            run.uow).resolve_key(api_key_id, key_version)
+        if api_key is None:
+            run.fail("API key is inactive")
+            return
 
-        if not texts:
+        texts = await container.get_wb_service(run.uow).fetch_and_save_orders(
+            api_key=api_key, user_id=user_id)
+        if texts:
+            # Пайплайн завершит notify_user_about_orders
+            run.defer()
+        else:
             app_logger.info(
                 f'No new orders for user {user_id}, completing pipeline')
-            # Завершаем пайплайн, так как нет новых заказов
-            async with await container.create_uow() as uow:
-                task_control = container.get_task_control_service(uow)
-                await task_control.complete_task(user_id, TaskName.START_NOTIF_PIPELINE, success=True)
-                return
 
-        if texts:
-            await notify_user_about_orders.kiq(telegram_id, texts, user_id)
-
-    except Exception as e:
-        app_logger.error(
-            f'Fetch and save orders failed for user {user_id}: {e}')
-        await task_control.complete_task(
-            user_id, TaskName.START_NOTIF_PIPELINE, success=False, error_message=str(e))
-        raise
+    # Отправляем после коммита, чтобы уведомление не обогнало сохранение заказов
+    if texts:
+        await notify_user_about_orders.kiq(
+            telegram_id, texts, user_id, enqueued_at=time.time())
 
 
-@broker.task()
+@broker.task(store_result=False, priority=TaskPriority.NOTIFY.value)
 async def notify_user_about_orders(
     telegram_id: int,
     texts: list[dict],
     user_id: int,
-    container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
+    container: Annotated[DependencyContainer, TaskiqDepends(container_dep)],
+    enqueued_at: float | None = None
 ):
-    async with await container.create_uow() as uow:
-        notify = container.get_notification_service(uow)
-        task_control = container.get_task_control_service(uow)
-        employee_service = container.get_user_service(uow)
+    if enqueued_at is not None:
+        order_pipeline_stage.labels(stage="queue_wait").observe(
+            max(time.time() - enqueued_at, 0))
+
+    async with TaskLifecycle(
+        container, user_id, TaskName.START_NOTIF_PIPELINE,
+        handled=(TelegramForbiddenError,)
+    ) as run:
+        notify = container.get_notification_service(run.uow)
+        employee_service = container.get_user_service(run.uow)
         employees = await employee_service.get_active_employees(telegram_id)
-        all_telegram_ids = [employee.telegram_id for employee in employees]
-
-        for telegram_id in all_telegram_ids:
-            await notify_employee.kiq(telegram_id, texts)
-
-        try:
-            await notify.send_message(telegram_id, texts)
-            # Завершаем пайплайн после успешной отправки всех сообщений
-            await task_control.complete_task(user_id, TaskName.START_NOTIF_PIPELINE, success=True)
-            app_logger.info(
-                f'Pipeline completed successfully for user {user_id}')
 
-        except TelegramForbiddenError as e:
-            await task_control.complete_task(
-                user_id, TaskName.START_NOTIF_PIPELINE, success=False, error_message=f"{e.message}")
-            return
+        for employee in employees:
+            await notify_employee.kiq(employee.telegram_id, texts)
 
-        except Exception as e:
-            app_logger.error(f'Notification failed for user {user_id}: {e}')
-            await task_control.complete_task(
-                user_id, TaskName.START_NOTIF_PIPELINE, success=False, error_message=str(e))
-            raise
+        await notify.send_message(telegram_id, texts)
+        app_logger.info(
+            f'Pipeline completed successfully for user {user_id}')
 
 
-@broker.task()
+@broker.task(store_result=False, priority=TaskPriority.NOTIFY.value)
 async def notify_employee(
     telegram_id: int,
     texts: list[dict],
@@ -311,7 +500,7 @@ async def notify_employee(
     async with await container.create_uow() as uow:
         notify = container.get_notification_service(uow)
         try:
-            await notify.send_message(telegram_id, texts)
+            await notify.send_message(telegram_id, texts, observe_latency=False)
             app_logger.info(
                 f'Notification sent to employee {telegram_id}')
         except TelegramForbiddenError as e:
@@ -323,7 +512,7 @@ async def notify_employee(
                 f"Failed to send message to {telegram_id}: {e}")
 
 
-@broker.task(schedule=[{"cron": "0 2 * * *"}])  # Каждый день в 2:00
+@broker.task(schedule=[{"cron": "0 2 * * *"}], store_result=False)  # Каждый день в 2:00
 async def cleanup_old_tasks(
     container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
 ) -> None:
@@ -334,7 +523,7 @@ async def cleanup_old_tasks(
         app_logger.info(f'Cleaned up {cleaned_count} old task records')
 
 
-@broker.task(schedule=[{"cron": "*/30 * * * *"}])  # Каждые 30 минут
+@broker.task(schedule=[{"cron": "*/30 * * * *"}], store_result=False)  # Каждые 30 минут
 async def cleanup_hanging_tasks(
     container: Annotated[DependencyContainer, TaskiqDepends(container_dep)]
 ) -> None:
@@ -2,6 +2,8 @@ import asyncio
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
 from aiogram.fsm.storage.memory import MemoryStorage
@@ -12,17 +14,21 @@ from fluentogram import TranslatorHub
 from redis.asyncio.client import Redis
 from redis.exceptions import ConnectionError
 
+from bot.core.activity import activity_buffer
 from bot.core.config import settings
 from bot.core.dependency.container_init import init_container
 from bot.core.logging import setup_logging, app_logger
+from bot.core.metrics import start_metrics_server
+from bot.core.loop_monitor import loop_monitor
+from bot.core.webhook import run_webhook
 from bot.handlers.dialogs.main_menu.dialog import user_panel
 from bot.handlers.dialogs.api_connect.dialog import api_connect
 from bot.handlers.dialogs.employee.dialog import employee
 
-from bot.database.engine import async_session_maker, engine
+from bot.database.engine import ProcessRole
 from bot.middlewares.uow import UnitOfWorkMiddleware
 from bot.middlewares.i18n import TranslatorRunnerMiddleware
-from bot.utils.i18n import create_translator_hub
+from bot.middlewares.activity import UserActivityMiddleware
 from bot.handlers import get_routers
 from broker import broker
 
@@ -56,19 +62,33 @@ def create_storage():
 
 
 storage = create_storage()
-container = init_container()
-
-# Create a dispatcher with the chosen storage
-dp = Dispatcher(db_engine=engine, storage=storage, container=container)
+# В воркере main импортируется через taskiq_aiogram — берем пул воркера
+container = init_container(
+    ProcessRole.WORKER if broker.is_worker_process else ProcessRole.BOT)
+
+# Create a dispatcher with the chosen storage.
+# В режиме вебхука апдейты одного чата на разных репликах обрабатываются
+# по очереди (блокировка в Redis), иначе они перезаписывают друг другу
+# состояние FSM и стек диалогов
+dp = Dispatcher(
+    storage=storage,
+    events_isolation=storage.create_isolation()
+    if settings.bot.mode == "webhook" and isinstance(storage, RedisStorage) else None,
+    container=container,
+)
 dp.update.outer_middleware(UnitOfWorkMiddleware(
-    session_pool=async_session_maker))
+    session_pool=container.session_maker))
 dp.update.middleware(TranslatorRunnerMiddleware())
+dp.update.middleware(UserActivityMiddleware(activity_buffer))
 
 bot: Bot = Bot(
     token=settings.bot.token.get_secret_value(),
     default=DefaultBotProperties(
         parse_mode=ParseMode.HTML
-    )
+    ),
+    # Свой сервер Bot API (BOT__API_SERVER), иначе api.telegram.org
+    session=AiohttpSession(api=TelegramAPIServer.from_base(settings.bot.api_server))
+    if settings.bot.api_server else None
 )
 
 
@@ -112,7 +132,16 @@ async def setup_bot(dp: Dispatcher) -> Bot:
 async def main():
     setup_logging()
     app_logger.info('Starting bot...', context='init')
-    translator_hub: TranslatorHub = create_translator_hub()
+    start_metrics_server(settings.metrics_port)
+    if settings.loop_monitor.enabled:
+        loop_monitor.start(
+            ProcessRole.BOT.value,
+            interval=settings.loop_monitor.interval,
+            slow_threshold=settings.loop_monitor.slow_threshold,
+            debug=settings.loop_monitor.debug,
+        )
+    # Хаб переводчика общий с контейнером, второй раз файлы не компилируем
+    translator_hub: TranslatorHub = container.translators.hub
 
     # Set up the bot with the provided token and default properties
     bot: Bot = await setup_bot(dp)
@@ -122,14 +151,17 @@ async def main():
     except Exception as e:
         print(e)
 
-    await bot.delete_webhook(drop_pending_updates=True)
     try:
-        await asyncio.gather(
-            dp.start_polling(
-                bot,
-                _translator_hub=translator_hub
-            ),
-        )
+        if settings.bot.mode == "webhook":
+            await run_webhook(dp, bot, settings.bot, _translator_hub=translator_hub)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await asyncio.gather(
+                dp.start_polling(
+                    bot,
+                    _translator_hub=translator_hub
+                ),
+            )
     except Exception as e:
         app_logger.error(e)
     finally: